@@ -0,0 +1,173 @@
+import json
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.parse import parse_qs, urlparse
+
+
+class SyntheticVacancies:
+    """
+    Генератор исходных вакансий hh и sj любого объема на основе сохраненных ответов API (hh_Python.json,
+    sj_Python.json). Вакансия с номером N всегда одна и та же: id, название, зарплата и дата публикации
+    получаются из шаблона и номера, поэтому результаты замеров повторяемы
+    """
+
+    # слова, добавляемые к названиям шаблонов, чтобы названия вакансий различались
+    WORDS = ('', 'Senior', 'Junior', 'Middle', 'Lead', 'Backend', 'Data', 'ML', 'DevOps', 'QA', 'удаленно',
+             'стажер', 'ведущий', 'старший', 'младший')
+
+    def __init__(self, hh_seeds: list[dict], sj_seeds: list[dict]):
+        """
+        Инициализатор класса
+        :param hh_seeds: вакансии hh (шаблоны)
+        :param sj_seeds: вакансии sj (шаблоны)
+        """
+        self.hh_seeds = hh_seeds
+        self.sj_seeds = sj_seeds
+        self.__hh_published = [datetime.strptime(vacancy['published_at'], '%Y-%m-%dT%H:%M:%S%z') for vacancy in hh_seeds]
+
+    @classmethod
+    def from_files(cls, hh_path: str = 'hh_Python.json', sj_path: str = 'sj_Python.json') -> 'SyntheticVacancies':
+        """Генератор на основе файлов с сохраненными ответами API"""
+        with open(hh_path, 'r', encoding='UTF-8') as hh_file, open(sj_path, 'r', encoding='UTF-8') as sj_file:
+            return cls(json.load(hh_file), json.load(sj_file))
+
+    def __variation(self, number: int, seeds_count: int) -> tuple[str, float, int]:
+        """Добавка к названию, множитель зарплаты и сдвиг даты публикации (в секундах) для вакансии с номером"""
+        word = self.WORDS[number // seeds_count % len(self.WORDS)]
+        factor = 0.8 + number * 7919 % 41 / 100
+        return word, factor, number * 37
+
+    def hh(self, number: int) -> dict:
+        """Вакансия hh с номером number"""
+        seed = self.hh_seeds[number % len(self.hh_seeds)]
+        word, factor, shift = self.__variation(number, len(self.hh_seeds))
+        salary = dict(seed['salary'])
+        for field in ('from', 'to'):
+            if salary[field]:
+                salary[field] = int(salary[field] * factor)
+        published_at = self.__hh_published[number % len(self.hh_seeds)] - timedelta(seconds=shift)
+        return {**seed, 'id': str(10 ** 9 + number), 'name': f'{seed["name"]} {word}'.rstrip(),
+                'salary': salary, 'published_at': published_at.isoformat()}
+
+    def sj(self, number: int) -> dict:
+        """Вакансия sj с номером number"""
+        seed = self.sj_seeds[number % len(self.sj_seeds)]
+        word, factor, shift = self.__variation(number, len(self.sj_seeds))
+        return {**seed, 'id': 10 ** 9 + number, 'profession': f'{seed["profession"]} {word}'.rstrip(),
+                'payment_from': int(seed['payment_from'] * factor), 'payment_to': int(seed['payment_to'] * factor),
+                'date_published': seed['date_published'] - shift}
+
+    def iter_hh(self, count: int, start: int = 0):
+        """Генератор вакансий hh с номерами от start до start + count"""
+        return map(self.hh, range(start, start + count))
+
+    def iter_sj(self, count: int, start: int = 0):
+        """Генератор вакансий sj с номерами от start до start + count"""
+        return map(self.sj, range(start, start + count))
+
+
+class FixtureServer:
+    """
+    Локальный сервер, заменяющий API hh и sj при замерах без сети: отдает страницы синтетических вакансий
+    (SyntheticVacancies) и справочник курсов валют. Запускается в отдельном потоке на свободном порту
+    """
+
+    # курсы валют для справочника /dictionaries (количество единиц валюты за 1 рубль)
+    RATES = {'RUR': 1.0, 'USD': 0.0125, 'EUR': 0.0115, 'KZT': 5.6, 'UAH': 0.45}
+
+    def __init__(self, vacancies: SyntheticVacancies, total: int = 100000, latency: float = 0.0):
+        """
+        Инициализатор класса
+        :param vacancies: генератор вакансий
+        :param total: количество вакансий, найденных по запросу (на каждой платформе)
+        :param latency: искусственная задержка ответа в секундах
+        """
+        self.vacancies = vacancies
+        self.total = total
+        self.latency = latency
+        self.requests = 0
+        self.__server = None
+        self.__thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def hh_url(self) -> str:
+        return f'{self.url}/vacancies'
+
+    @property
+    def sj_url(self) -> str:
+        return f'{self.url}/2.0/vacancies/'
+
+    @property
+    def dictionaries_url(self) -> str:
+        return f'{self.url}/dictionaries'
+
+    def get_page(self, path: str, params: dict) -> dict | None:
+        """
+        Ответ API для адреса и параметров запроса
+        :return: словарь для ответа в формате json или None для неизвестного адреса
+        """
+        if path == '/vacancies':
+            per_page = int(params.get('per_page', 20))
+            start = int(params.get('page', 0)) * per_page
+            count = max(0, min(per_page, self.total - start))
+            return {'items': list(self.vacancies.iter_hh(count, start)), 'found': self.total}
+        if path == '/2.0/vacancies/':
+            per_page = int(params.get('count', 20))
+            start = (int(params.get('page', 1)) - 1) * per_page
+            count = max(0, min(per_page, self.total - start))
+            return {'objects': list(self.vacancies.iter_sj(count, start)), 'total': self.total,
+                    'more': start + count < self.total}
+        if path == '/dictionaries':
+            return {'currency': [{'code': code, 'rate': rate} for code, rate in self.RATES.items()]}
+        return None
+
+    def start(self) -> 'FixtureServer':
+        """Запуск сервера в фоновом потоке"""
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, как у настоящих API
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                fixture.requests += 1
+                if fixture.latency:
+                    time.sleep(fixture.latency)
+                data = fixture.get_page(url.path, params)
+                body = json.dumps(data if data is not None else {'error': 'not found'}, ensure_ascii=False)
+                body = body.encode('UTF-8')
+                self.send_response(200 if data is not None else 404)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.__server.daemon_threads = True
+        self.__thread = Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Остановка сервера"""
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+    def __enter__(self) -> 'FixtureServer':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
@@ -0,0 +1,254 @@
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.fixture_server_class import FixtureServer, SyntheticVacancies
+from classes.exchange_rates_class import ExchangeRates
+from classes.hh_sj_classes import Engine, HeadHunterAPI, SuperJobAPI
+from classes.json_saver_class import JSONSaver
+from utils import utils
+
+
+class PipelineBenchmark:
+    """
+    Замеры скорости этапов загрузка -> сохранение -> чтение -> фильтрация -> сортировка без сети:
+    загрузка идет с локального сервера FixtureServer, остальные этапы - на синтетических вакансиях заданного объема.
+    Для каждого этапа считаются пропускная способность, процентили длительности и пиковый расход памяти
+    """
+
+    STAGES = ('fetch', 'store', 'select', 'filter', 'sort', 'top')
+    # отклонение времени от базового замера, после которого этап считается замедлившимся
+    THRESHOLD = 0.2
+
+    def __init__(self, vacancies: SyntheticVacancies, sizes=(1000, 10000, 100000), repeats: int = 5,
+                 pages: int = 5, storage: str = 'json', filter_word: str = 'python', top_n: int = 100,
+                 memory: bool = True):
+        """
+        Инициализатор класса
+        :param vacancies: генератор синтетических вакансий
+        :param sizes: объемы данных (общее количество вакансий hh и sj) для этапов после загрузки
+        :param repeats: количество повторов каждого этапа
+        :param pages: количество страниц для этапа загрузки (для sj не больше 5)
+        :param storage: json (JSONSaver.add_vacancies) или jsonl (потоковый JSONSaver, дозапись по страницам)
+        :param filter_word: слово для этапа фильтрации
+        :param top_n: количество вакансий для этапа отбора топ N
+        :param memory: замерять пиковый расход памяти (отдельным запуском этапа под tracemalloc)
+        """
+        self.vacancies = vacancies
+        self.sizes = sizes
+        self.repeats = repeats
+        self.pages = pages
+        self.storage = storage
+        self.filter_word = filter_word
+        self.top_n = top_n
+        self.memory = memory
+
+    @staticmethod
+    def percentile(values: list[float], percent: float) -> float:
+        """Процентиль с линейной интерполяцией"""
+        values = sorted(values)
+        position = (len(values) - 1) * percent / 100
+        lower = int(position)
+        upper = min(lower + 1, len(values) - 1)
+        return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+    def summarize(self, durations: list[float], items: int, peak: int | None = None) -> dict:
+        """
+        Итоги замеров этапа
+        :param durations: длительности запусков в секундах
+        :param items: количество обработанных вакансий за один запуск
+        :param peak: пиковый расход памяти в байтах
+        :return: словарь с результатами (время в миллисекундах)
+        """
+        mean = sum(durations) / len(durations)
+        return {'items': items,
+                'runs': len(durations),
+                'mean_ms': round(mean * 1000, 3),
+                'p50_ms': round(self.percentile(durations, 50) * 1000, 3),
+                'p95_ms': round(self.percentile(durations, 95) * 1000, 3),
+                'p99_ms': round(self.percentile(durations, 99) * 1000, 3),
+                'items_per_s': round(items / mean, 1) if mean else None,
+                'peak_mb': None if peak is None else round(peak / 2 ** 20, 2)}
+
+    def measure(self, func, setup=None) -> tuple[list[float], int | None, object]:
+        """
+        Повторные запуски функции
+        :param func: замеряемая функция
+        :param setup: функция, вызываемая перед каждым запуском (не входит в замер)
+        :return: (длительности запусков, пиковый расход памяти или None, результат последнего запуска)
+        """
+        durations, result = [], None
+        for _ in range(self.repeats):
+            if setup is not None:
+                setup()
+            result = None
+            gc.collect()
+            started = time.perf_counter()
+            result = func()
+            durations.append(time.perf_counter() - started)
+
+        peak = None
+        if self.memory:
+            if setup is not None:
+                setup()
+            result = None
+            gc.collect()
+            tracemalloc.start()
+            try:
+                result = func()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        return durations, peak, result
+
+    def run_fetch(self) -> dict:
+        """
+        Замер загрузки страниц с обеих платформ (utils.parse) с локального сервера.
+        Кроме длительности всего этапа считаются процентили длительности запроса одной страницы
+        """
+        latencies = []
+
+        def timed(engine_class):
+            class ReplayEngine(engine_class):
+                URL = server.hh_url if engine_class is HeadHunterAPI else server.sj_url
+
+                def get_request(self, *args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return super().get_request(*args, **kwargs)
+                    finally:
+                        latencies.append(time.perf_counter() - started)
+
+            return ReplayEngine()
+
+        with FixtureServer(self.vacancies) as server:
+            hh_api, sj_api = timed(HeadHunterAPI), timed(SuperJobAPI)
+            durations, peak, result = self.measure(lambda: utils.parse(hh_api, sj_api, 'python', self.pages))
+
+        stats = self.summarize(durations, sum(len(vacancies) for vacancies in result), peak)
+        for percent in (50, 95, 99):
+            stats[f'request_p{percent}_ms'] = round(self.percentile(latencies, percent) * 1000, 3)
+        stats['requests'] = len(latencies)
+        return stats
+
+    def run_size(self, size: int) -> dict:
+        """
+        Замеры этапов после загрузки на size вакансиях (поровну hh и sj)
+        :return: словарь {этап: результаты}
+        """
+        hh_count, sj_count = size - size // 2, size // 2
+        saver = JSONSaver('benchmark', streaming=self.storage == 'jsonl')
+        results = {}
+
+        if self.storage == 'jsonl':
+            page = 100
+
+            # страницы создаются во время записи, как при потоковой загрузке (их создание входит в замер)
+            def store():
+                for start in range(0, max(hh_count, sj_count), page):
+                    saver.append_vacancies(list(self.vacancies.iter_hh(max(0, min(page, hh_count - start)), start)),
+                                           list(self.vacancies.iter_sj(max(0, min(page, sj_count - start)), start)))
+
+            durations, peak, _ = self.measure(store, setup=saver.clear)
+        else:
+            hh_vacancies = list(self.vacancies.iter_hh(hh_count))
+            sj_vacancies = list(self.vacancies.iter_sj(sj_count))
+            durations, peak, _ = self.measure(lambda: saver.add_vacancies(hh_vacancies, sj_vacancies))
+            del hh_vacancies, sj_vacancies
+        results['store'] = self.summarize(durations, size, peak)
+
+        durations, peak, vacancies = self.measure(lambda: list(saver.select()))
+        results['select'] = self.summarize(durations, size, peak)
+
+        durations, peak, _ = self.measure(lambda: utils.filter_vacancies(self.filter_word, vacancies))
+        results['filter'] = self.summarize(durations, size, peak)
+
+        durations, peak, _ = self.measure(lambda: utils.sort_vacancies(vacancies))
+        results['sort'] = self.summarize(durations, size, peak)
+
+        durations, peak, _ = self.measure(lambda: utils.get_top_vacancies(vacancies, self.top_n))
+        results['top'] = self.summarize(durations, size, peak)
+        return results
+
+    def run(self, fetch: bool = True) -> dict:
+        """
+        Все замеры во временной папке (файлы вакансий и курсы валют не попадают в рабочую папку)
+        :param fetch: замерять загрузку с локального сервера
+        :return: отчет {'meta': параметры запуска, 'results': {объем: {этап: результаты}}}
+        """
+        # курсы валют задаются заранее, чтобы движки не обращались к настоящему API hh
+        ExchangeRates.get_default().update(FixtureServer.RATES)
+        Engine.reset_stats()
+
+        report = {'meta': {'date': datetime.now().isoformat(timespec='seconds'),
+                           'python': sys.version.split()[0],
+                           'platform': platform.platform(),
+                           'sizes': list(self.sizes),
+                           'repeats': self.repeats,
+                           'pages': self.pages,
+                           'storage': self.storage,
+                           'memory': self.memory},
+                  'results': {}}
+        if fetch:
+            report['results']['fetch'] = {'fetch': self.run_fetch()}
+        for size in self.sizes:
+            report['results'][str(size)] = self.run_size(size)
+        return report
+
+    @staticmethod
+    def save_report(report: dict, path: str) -> None:
+        """Сохранение отчета (или базового замера) в json файл"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='UTF-8') as report_file:
+            json.dump(report, report_file, indent=4, ensure_ascii=False)
+
+    @staticmethod
+    def load_report(path: str) -> dict:
+        """Загрузка отчета из json файла"""
+        with open(path, 'r', encoding='UTF-8') as report_file:
+            return json.load(report_file)
+
+    @classmethod
+    def compare(cls, report: dict, baseline: dict, threshold: float | None = None) -> list[dict]:
+        """
+        Сравнение отчета с базовым замером по среднему времени этапов
+        :param report: текущий отчет
+        :param baseline: базовый отчет
+        :param threshold: допустимое замедление (доля), по умолчанию THRESHOLD
+        :return: список {size, stage, baseline_ms, current_ms, change, regression} по этапам из обоих отчетов
+        """
+        threshold = cls.THRESHOLD if threshold is None else threshold
+        rows = []
+        for size, stages in report['results'].items():
+            for stage, stats in stages.items():
+                old = baseline['results'].get(size, {}).get(stage)
+                if not old or not old['mean_ms']:
+                    continue
+                change = (stats['mean_ms'] - old['mean_ms']) / old['mean_ms']
+                rows.append({'size': size, 'stage': stage, 'baseline_ms': old['mean_ms'],
+                             'current_ms': stats['mean_ms'], 'change': round(change, 3),
+                             'regression': change > threshold})
+        return rows
+
+    @staticmethod
+    def format_report(report: dict) -> str:
+        """Таблица результатов для вывода в консоль"""
+        lines = [f'{"объем":>8} {"этап":<7} {"вакансий":>9} {"среднее мс":>11} {"p50 мс":>10} {"p95 мс":>10} '
+                 f'{"p99 мс":>10} {"вакансий/с":>12} {"память МБ":>10}']
+        for size, stages in report['results'].items():
+            for stage, stats in stages.items():
+                peak = '-' if stats['peak_mb'] is None else stats['peak_mb']
+                lines.append(f'{size:>8} {stage:<7} {stats["items"]:>9} {stats["mean_ms"]:>11} {stats["p50_ms"]:>10} '
+                             f'{stats["p95_ms"]:>10} {stats["p99_ms"]:>10} {stats["items_per_s"]:>12} {peak:>10}')
+                if 'requests' in stats:
+                    lines.append(f'{"":>8} {"":<7} запросов {stats["requests"]}, длительность запроса: '
+                                 f'p50 {stats["request_p50_ms"]} мс, p95 {stats["request_p95_ms"]} мс, '
+                                 f'p99 {stats["request_p99_ms"]} мс')
+        return '\n'.join(lines)
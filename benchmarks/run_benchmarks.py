@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import tempfile
+
+from benchmarks.fixture_server_class import SyntheticVacancies
+from benchmarks.pipeline_benchmark_class import PipelineBenchmark
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINES = os.path.join(ROOT, 'benchmarks', 'baselines')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Параметры командной строки для замеров"""
+    parser = argparse.ArgumentParser(
+        description='Замеры скорости загрузки, сохранения, чтения, фильтрации и сортировки вакансий без сети')
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='объемы данных через запятую (например 1000,100000,1000000)')
+    parser.add_argument('--repeats', type=int, default=5, help='количество повторов каждого этапа')
+    parser.add_argument('--pages', type=int, default=5, help='количество страниц для этапа загрузки')
+    parser.add_argument('--storage', choices=('json', 'jsonl'), default='json', help='формат файлов вакансий')
+    parser.add_argument('--filter', dest='filter_word', default='python', help='слово для этапа фильтрации')
+    parser.add_argument('--no-fetch', dest='fetch', action='store_false', help='не замерять загрузку')
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help='не замерять расход памяти (быстрее на больших объемах)')
+    parser.add_argument('--output', help='сохранить отчет в json файл')
+    parser.add_argument('--save-baseline', metavar='NAME', help='сохранить отчет как базовый замер NAME')
+    parser.add_argument('--compare', metavar='NAME', help='сравнить с базовым замером NAME')
+    parser.add_argument('--threshold', type=float, default=PipelineBenchmark.THRESHOLD,
+                        help='допустимое замедление относительно базового замера (доля)')
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Запуск замеров. Код возврата 1, если при сравнении с базовым замером найдено замедление"""
+    args = build_parser().parse_args(argv)
+    vacancies = SyntheticVacancies.from_files(os.path.join(ROOT, 'hh_Python.json'),
+                                              os.path.join(ROOT, 'sj_Python.json'))
+    benchmark = PipelineBenchmark(vacancies, [int(size) for size in args.sizes.split(',')], args.repeats,
+                                  args.pages, args.storage, args.filter_word, memory=args.memory)
+    baseline = PipelineBenchmark.load_report(os.path.join(BASELINES, f'{args.compare}.json')) \
+        if args.compare else None
+    output = os.path.abspath(args.output) if args.output else None
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            report = benchmark.run(fetch=args.fetch)
+        finally:
+            os.chdir(cwd)
+
+    print(PipelineBenchmark.format_report(report))
+    if output:
+        PipelineBenchmark.save_report(report, output)
+    if args.save_baseline:
+        PipelineBenchmark.save_report(report, os.path.join(BASELINES, f'{args.save_baseline}.json'))
+
+    if baseline is None:
+        return 0
+    rows = PipelineBenchmark.compare(report, baseline, args.threshold)
+    print(f'\nСравнение с базовым замером {args.compare}:')
+    for name in ('storage', 'pages', 'python'):
+        if baseline['meta'].get(name) != report['meta'][name]:
+            print(f'Внимание: параметр {name} отличается ({baseline["meta"].get(name)} -> {report["meta"][name]})')
+    for row in rows:
+        mark = '  ЗАМЕДЛЕНИЕ' if row['regression'] else ''
+        print(f'{row["size"]:>8} {row["stage"]:<7} {row["baseline_ms"]:>11} -> {row["current_ms"]:>11} мс '
+              f'({row["change"]:+.1%}){mark}')
+    return 1 if any(row['regression'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
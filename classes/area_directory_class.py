@@ -0,0 +1,163 @@
+import json
+import os
+import time
+from bisect import bisect_left
+from threading import Lock
+
+
+class AreaDirectory:
+    """Справочник регионов headhunter с сохранением на диск и индексами для быстрого поиска id региона"""
+
+    URL = 'https://api.hh.ru/areas'
+    # интервал обновления справочника (в секундах) - 7 дней
+    REFRESH_INTERVAL = 7 * 24 * 60 * 60
+    # через сколько повторить загрузку с API, если он был недоступен и используется устаревший справочник
+    RETRY_INTERVAL = 60 * 60
+
+    def __init__(self, engine, path: str = '.cache/hh_areas.json', refresh_interval: int | None = None):
+        """
+        Инициализатор класса
+        :param engine: экземпляр класса платформы (с методом get_json) для загрузки справочника
+        :param path: файл для хранения справочника
+        :param refresh_interval: интервал обновления справочника в секундах (по умолчанию REFRESH_INTERVAL)
+        """
+        self.engine = engine
+        self.path = path
+        self.refresh_interval = self.REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+        self.__lock = Lock()
+        self.__expires_at = None  # время, после которого справочник нужно загрузить заново
+        self.__names = {}  # id -> название региона
+        self.__parents = {}  # id -> id родительского региона
+        self.__children = {}  # id -> список id вложенных регионов
+        self.__by_name = {}  # нормализованное название -> список id
+        self.__sorted_names = []  # отсортированные нормализованные названия для поиска по префиксу
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        """Приведение названия региона к виду для поиска"""
+        return ' '.join(name.lower().replace('ё', 'е').split())
+
+    def __read(self) -> dict | None:
+        try:
+            with open(self.path, 'r', encoding='UTF-8') as areas_file:
+                return json.load(areas_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def __write(self, data: dict) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='UTF-8') as areas_file:
+            json.dump(data, areas_file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def load(self, force: bool = False) -> None:
+        """
+        Загрузка справочника: с диска, если он не устарел, иначе с API.
+        Если API недоступен, используется сохраненная ранее версия, а загрузка с API повторяется
+        не раньше чем через RETRY_INTERVAL
+        :param force: принудительно загрузить справочник с API
+        """
+        with self.__lock:
+            data = None if force else self.__read()
+            expires_at = None if data is None else data['fetched_at'] + self.refresh_interval
+            if expires_at is None or time.time() > expires_at:
+                try:
+                    data = {'fetched_at': time.time(), 'areas': self.engine.get_json(self.URL)}
+                    self.__write(data)
+                    expires_at = data['fetched_at'] + self.refresh_interval
+                except Exception:
+                    data = data or self.__read()
+                    if data is None:
+                        raise
+                    expires_at = time.time() + self.RETRY_INTERVAL
+            self.__build(data['areas'])
+            self.__expires_at = expires_at
+
+    def __build(self, tree: list) -> None:
+        names, parents, children, by_name = {}, {}, {}, {}
+        stack = [(area, None) for area in tree]
+        while stack:
+            area, parent_id = stack.pop()
+            names[area['id']] = area['name']
+            parents[area['id']] = parent_id
+            children[area['id']] = [child['id'] for child in area.get('areas') or []]
+            by_name.setdefault(self.normalize(area['name']), []).append(area['id'])
+            stack.extend((child, area['id']) for child in area.get('areas') or [])
+
+        self.__names, self.__parents, self.__children, self.__by_name = names, parents, children, by_name
+        self.__sorted_names = sorted(by_name)
+
+    def __ensure_loaded(self) -> None:
+        if self.__expires_at is None or time.time() > self.__expires_at:
+            self.load()
+
+    def get_name(self, area_id: str) -> str | None:
+        """Название региона по его id"""
+        self.__ensure_loaded()
+        return self.__names.get(str(area_id))
+
+    def get_parents(self, area_id: str) -> list[str]:
+        """
+        Цепочка родительских регионов
+        :param area_id: id региона
+        :return: список id от ближайшего родителя до страны
+        """
+        self.__ensure_loaded()
+        chain = []
+        parent_id = self.__parents.get(str(area_id))
+        while parent_id is not None:
+            chain.append(parent_id)
+            parent_id = self.__parents.get(parent_id)
+        return chain
+
+    def get_children(self, area_id: str) -> list[str]:
+        """Список id регионов, непосредственно входящих в регион (пустой для городов и неизвестных id)"""
+        self.__ensure_loaded()
+        return list(self.__children.get(str(area_id), []))
+
+    def find(self, name: str, parent: str | None = None) -> list[str]:
+        """
+        Поиск id регионов по точному названию
+        :param name: название региона или города
+        :param parent: название или id региона, внутри которого ведется поиск
+        :return: список id найденных регионов
+        """
+        self.__ensure_loaded()
+        ids = self.__by_name.get(self.normalize(name), [])
+        if parent is None:
+            return list(ids)
+
+        parent_ids = {str(parent)} if str(parent) in self.__names else set(self.find(parent))
+        return [area_id for area_id in ids if parent_ids.intersection(self.get_parents(area_id))]
+
+    def search(self, prefix: str, limit: int = 10) -> list[tuple[str, str]]:
+        """
+        Поиск регионов по началу названия
+        :param prefix: начало названия
+        :param limit: максимальное количество результатов
+        :return: список кортежей (id, название)
+        """
+        self.__ensure_loaded()
+        prefix = self.normalize(prefix)
+        result = []
+        for name in self.__sorted_names[bisect_left(self.__sorted_names, prefix):]:
+            if not name.startswith(prefix) or len(result) >= limit:
+                break
+            result.extend((area_id, self.__names[area_id]) for area_id in self.__by_name[name])
+        return result[:limit]
+
+    def get_id(self, region: str, town: str | None = None) -> str | None:
+        """
+        Получение id региона (или города внутри региона) для параметра area метода get_vacancies
+        :param region: название региона
+        :param town: название города
+        :return: id города, если он задан, иначе id региона; None если ничего не найдено
+        """
+        if town:
+            ids = self.find(town, parent=region)
+        else:
+            ids = self.find(region) or [area_id for area_id, _ in self.search(region, limit=1)]
+        return ids[0] if ids else None
@@ -0,0 +1,181 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from classes.hh_sj_classes import HeadHunterAPI, SuperJobAPI
+from classes.json_saver_class import JSONSaver
+from classes.response_cache_class import ResponseCache
+from classes.salary_analytics_class import SalaryAnalytics
+from classes.sqlite_saver_class import SQLiteSaver
+from classes.vacancy_exporter_class import VacancyExporter
+from classes.vacancy_query_class import VacancyQuery
+from classes.vacancy_store_class import VacancyStore
+from classes.vacansy_class import Vacancy
+from utils import utils
+
+
+class BatchRunner:
+    """
+    Класс для пакетного (без вызовов input) парсинга и фильтрации вакансий по списку ключевых слов.
+    Сессия, кэш ответов API и хранилище вакансий общие для всех запросов пакета
+    """
+
+    PLATFORMS = ('hh', 'sj')
+    STORAGES = ('json', 'jsonl', 'store', 'sqlite')
+
+    def __init__(self, platforms=PLATFORMS, pages: int | None = 1, area: int | str | None = None, storage: str = 'json',
+                 cache: ResponseCache | None = None, max_workers: int | None = None, max_keywords: int = 4,
+                 dedup: bool = True):
+        """
+        Инициализатор класса
+        :param platforms: платформы для парсинга ('hh', 'sj')
+        :param pages: количество страниц для каждого ключевого слова (1 страница - 100 вакансий), None - все
+        найденные вакансии (запрос делится на части, см. CrawlPlanner)
+        :param area: регион hh: id из справочника или название (по умолчанию вся Россия)
+        :param storage: способ хранения вакансий: json, jsonl (потоковый JSONSaver), store (VacancyStore без
+        дублей) или sqlite (SQLiteSaver)
+        :param cache: кэш ответов API (общий для всех ключевых слов)
+        :param max_workers: ограничение на количество одновременных запросов к каждой платформе
+        :param max_keywords: количество ключевых слов, обрабатываемых одновременно
+        :param dedup: объединять одинаковые вакансии с разных платформ (см. utils.deduplicate_vacancies)
+        """
+        if storage not in self.STORAGES:
+            raise ValueError(f'Способ хранения должен быть одним из: {", ".join(self.STORAGES)}')
+
+        self.pages = pages
+        self.storage = storage
+        self.max_keywords = max_keywords
+        self.dedup = dedup
+        self.cache = cache
+        self.hh_api = HeadHunterAPI(max_workers=max_workers, cache=cache) if 'hh' in platforms else None
+        self.sj_api = SuperJobAPI(max_workers=max_workers, cache=cache) if 'sj' in platforms else None
+        self.store = VacancyStore() if storage == 'store' else None
+        self.__savers = {}  # ключевое слово -> SQLiteSaver (одно соединение с базой на ключевое слово)
+        self.__savers_lock = Lock()
+
+        if area is not None and not str(area).isdigit():
+            area_id = HeadHunterAPI.get_region_id(str(area))
+            if area_id is None:
+                raise ValueError(f'Регион {area} не найден в справочнике hh')
+            area = area_id
+        self.area = area
+
+    def get_saver(self, keyword: str) -> JSONSaver | SQLiteSaver:
+        """Хранилище вакансий для ключевого слова (соединения SQLite создаются один раз и закрываются в close)"""
+        if self.storage == 'sqlite':
+            with self.__savers_lock:
+                if keyword not in self.__savers:
+                    self.__savers[keyword] = SQLiteSaver(keyword)
+                return self.__savers[keyword]
+        return JSONSaver(keyword, streaming=self.storage == 'jsonl', store=self.store)
+
+    def close(self) -> None:
+        """Закрытие соединений с базой SQLite и сохранение кэша ответов API"""
+        with self.__savers_lock:
+            for saver in self.__savers.values():
+                saver.close()
+            self.__savers.clear()
+        if self.cache is not None:
+            self.cache.close()
+
+    def run_query(self, keyword: str, filter_word: str | None = None, salary: str | None = None,
+                  region: str | None = None, without_experience: bool = False, top_n: int | None = None,
+                  sort_key: str = 'salary_min', save: bool = False, fmt: str = 'json',
+                  compression: str | None = None) -> list[Vacancy]:
+        """
+        Парсинг и фильтрация вакансий по одному ключевому слову
+        :param keyword: поисковый запрос
+        :param filter_word: запрос для поиска в описании вакансий (см. utils.filter_vacancies)
+        :param salary: фильтр по зарплате, например 50000-70000 или 80000
+        :param region: фильтр по региону вакансии
+        :param without_experience: только вакансии без опыта или с опытом от 1 года
+        :param top_n: количество вакансий с самой большой зарплатой (по убыванию)
+        :param sort_key: поле сортировки и отбора топ N (см. utils.SORT_KEYS)
+        :param save: сохранить результат в файл result_<Keyword>.<fmt>
+        :param fmt: формат файла результатов: json, jsonl, csv или bin (см. VacancyExporter)
+        :param compression: сжатие файла результатов: gzip или zstd
+        :return: список отфильтрованных вакансий
+        """
+        saver = self.get_saver(keyword)
+        if self.storage == 'json':
+            hh_vacancies, sj_vacancies = utils.parse(self.hh_api, self.sj_api, keyword, self.pages, self.area)
+            saver.add_vacancies(hh_vacancies, sj_vacancies)
+        else:
+            utils.parse_to_storage(self.hh_api, self.sj_api, keyword, self.pages, saver, self.area)
+
+        # все условия проверяются за один проход (для SQLite - запросом к базе)
+        vacancy_query = VacancyQuery()
+        if filter_word:
+            index = saver.load_search_index() if isinstance(saver, JSONSaver) else None
+            vacancy_query.keyword(filter_word, index)
+        if salary:
+            vacancy_query.salary(salary)
+        if region:
+            vacancy_query.region(region)
+        if without_experience:
+            vacancy_query.without_experience()
+        # дубликаты удаляются до фильтрации; для SQLite - после выборки из базы, чтобы условия выполнялись в базе
+        dedup = self.dedup and self.hh_api is not None and self.sj_api is not None
+        if isinstance(saver, SQLiteSaver):
+            vacancies = vacancy_query.run(saver)
+            if dedup:
+                vacancies = utils.deduplicate_vacancies(vacancies)
+        else:
+            vacancies = vacancy_query.run(utils.deduplicate_vacancies(saver.select()) if dedup else saver.select())
+
+        if top_n:
+            vacancies = utils.get_top_vacancies(vacancies, top_n, sort_key)
+        else:
+            vacancies = utils.sort_vacancies(vacancies, sort_key)
+
+        if save:
+            saver.save_results_to_json(vacancies, fmt, compression)
+        return vacancies
+
+    def analyze(self, keyword: str, period: str = 'week', saver=None) -> SalaryAnalytics:
+        """
+        Статистика зарплат по всем сохраненным вакансиям ключевого слова (без фильтров run_query).
+        Для неизменившегося хранилища берется рассчитанная ранее статистика
+        :param keyword: поисковый запрос
+        :param period: период динамики по дате публикации: day, week или month
+        :param saver: хранилище, в которое загружались вакансии (по умолчанию get_saver(keyword)), например
+        хранилище IncrementalCrawler.saver_factory после загрузки новых вакансий
+        :return: экземпляр класса SalaryAnalytics
+        """
+        saver = saver or self.get_saver(keyword)
+        return SalaryAnalytics.from_snapshot(saver.get_snapshot(), saver.select, period=period)
+
+    def run(self, keywords, **options) -> dict[str, list[Vacancy]]:
+        """
+        Обработка пакета ключевых слов (одновременно до max_keywords слов)
+        :param keywords: список поисковых запросов
+        :param options: параметры фильтрации и сохранения (см. run_query)
+        :return: словарь {ключевое слово: список вакансий}
+        """
+        keywords = list(dict.fromkeys(keywords))
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_keywords, len(keywords)))) as executor:
+            futures = {keyword: executor.submit(self.run_query, keyword, **options) for keyword in keywords}
+
+        results = {}
+        for keyword, future in futures.items():
+            try:
+                results[keyword] = future.result()
+            except Exception as error:
+                print(f'Не удалось обработать запрос {keyword} ({error})', file=sys.stderr)
+        return results
+
+    @staticmethod
+    def write_results(results: dict[str, list[Vacancy]], path: str = '-', fmt: str = 'jsonl',
+                      compression: str | None = None) -> int:
+        """
+        Потоковый вывод результатов (по одной вакансии с ключевым словом запроса)
+        :param results: результат метода run
+        :param path: файл для вывода или '-' для консоли
+        :param fmt: формат: json, jsonl, csv или bin (см. VacancyExporter)
+        :param compression: сжатие gzip или zstd
+        :return: количество выведенных вакансий
+        """
+        with VacancyExporter(path, fmt, compression, extra_fields=('keyword',)) as exporter:
+            for keyword, vacancies in results.items():
+                exporter.write_many(vacancies, keyword)
+        return exporter.count
@@ -0,0 +1,165 @@
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from classes.metrics_class import Metrics
+
+
+class CrawlPlanner:
+    """
+    Загрузка всех вакансий по запросу без ограничения API на глубину выдачи (hh - 20 страниц, sj - 5 страниц).
+    Запрос делится на непересекающиеся подзапросы по периодам публикации, регионам (hh) и диапазонам оклада (sj),
+    пока каждый подзапрос не поместится в ограничение. Подзапросы выполняются одновременно, вакансии
+    из разных подзапросов объединяются без повторов
+    """
+
+    # период публикации, на который отделяются вакансии от конца открытого слева периода (в секундах) - 7 дней
+    DATE_SPAN = 7 * 24 * 60 * 60
+    # самые старые вакансии, для которых период публикации делится дальше (в секундах) - 365 дней
+    MAX_AGE = 365 * 24 * 60 * 60
+    # минимальная длина периода публикации (в секундах)
+    MIN_WINDOW = 60
+    # границы диапазонов оклада при первом делении и минимальная ширина диапазона
+    SALARY_BANDS = (0, 30000, 50000, 70000, 100000, 150000, 200000, 300000)
+    MIN_SALARY_STEP = 5000
+    # ограничение на количество подзапросов одного запроса
+    MAX_SLICES = 2000
+
+    def __init__(self, engine, max_workers: int | None = None):
+        """
+        Инициализатор класса
+        :param engine: экземпляр класса платформы (HeadHunterAPI или SuperJobAPI)
+        :param max_workers: количество одновременных запросов (по умолчанию как у платформы)
+        """
+        self.engine = engine
+        self.max_workers = max_workers or engine.max_workers
+        self.capacity = engine.MAX_PAGES * engine.PER_PAGE
+        self.started = 0
+        self.slices = 0
+        self.truncated = 0
+        self.failed = 0
+
+    def split(self, part: dict) -> list[dict]:
+        """
+        Деление подзапроса на части по первому подходящему признаку из SPLIT_FIELDS платформы
+        :param part: подзапрос {area, date_from, date_to, salary_from, salary_to}
+        :return: список подзапросов или пустой список, если делить дальше нельзя
+        """
+        for field in self.engine.SPLIT_FIELDS:
+            if field == 'date':
+                parts = self.split_dates(part)
+            elif field == 'area':
+                parts = [{**part, 'area': area} for area in self.engine.get_subareas(part['area'])]
+            else:
+                parts = self.split_salary(part)
+            if parts:
+                return parts
+        return []
+
+    def split_dates(self, part: dict) -> list[dict]:
+        """Деление периода публикации пополам (открытый слева период - по DATE_SPAN от его конца)"""
+        date_from, date_to = part['date_from'], part['date_to']
+        if date_from is None:
+            if date_to < self.started - self.MAX_AGE:
+                return []
+            middle = date_to - self.DATE_SPAN
+        elif date_to - date_from >= 2 * self.MIN_WINDOW:
+            middle = (date_from + date_to) // 2
+        else:
+            return []
+        return [{**part, 'date_from': middle + 1}, {**part, 'date_to': middle}]
+
+    def split_salary(self, part: dict) -> list[dict]:
+        """Деление диапазона оклада: сначала по границам SALARY_BANDS, затем пополам"""
+        salary_from, salary_to = part['salary_from'], part['salary_to']
+        if salary_from is None and salary_to is None:
+            bounds = [*self.SALARY_BANDS, None]
+            return [{**part, 'salary_from': low, 'salary_to': None if high is None else high - 1}
+                    for low, high in zip(bounds, bounds[1:])]
+        if salary_to is None:
+            # открытый сверху диапазон: отделяется диапазон такой же ширины, как от нуля до его начала
+            return [{**part, 'salary_to': 2 * salary_from - 1}, {**part, 'salary_from': 2 * salary_from}]
+        if salary_to - salary_from < 2 * self.MIN_SALARY_STEP:
+            return []
+        middle = (salary_from + salary_to) // 2
+        return [{**part, 'salary_to': middle}, {**part, 'salary_from': middle + 1}]
+
+    def request(self, keyword: str, part: dict, page: int) -> dict:
+        """Запрос одной страницы подзапроса"""
+        filters = {field: part[field] for field in ('date_from', 'date_to', 'salary_from', 'salary_to')
+                   if part[field] is not None}
+        return self.engine.get_response(keyword, page, part['area'], self.engine.PER_PAGE, **filters)
+
+    def iter_pages(self, keyword: str, area=None, date_from: int | None = None, limit: int | None = None):
+        """
+        Загрузка вакансий со всех подзапросов. Первая страница подзапроса служит и для подсчета найденных вакансий:
+        если они помещаются в ограничение API, загружаются остальные страницы, иначе подзапрос делится дальше
+        :param keyword: ключевое слово (название вакансии)
+        :param area: id региона (по умолчанию регион платформы по умолчанию)
+        :param date_from: только вакансии, опубликованные не раньше этого момента (unixtime)
+        :param limit: максимальное количество вакансий (по умолчанию все найденные)
+        :return: генератор списков вакансий в порядке загрузки страниц, без повторов
+        """
+        engine = self.engine
+        metrics = Metrics.get_default()
+        engine.update_exchange_rates()
+        self.started = int(time.time())
+        self.slices = self.truncated = self.failed = 0
+        area = engine.DEFAULT_AREA if area is None else area
+        root = {'area': area, 'date_from': date_from, 'date_to': self.started, 'salary_from': None, 'salary_to': None}
+        seen, count = set(), 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+
+            def probe(part):
+                self.slices += 1
+                futures[executor.submit(self.request, keyword, part, engine.FIRST_PAGE)] = (part, engine.FIRST_PAGE)
+
+            probe(root)
+            try:
+                while futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        part, page = futures.pop(future)
+                        try:
+                            response = future.result()
+                        except Exception as error:
+                            self.failed += 1
+                            print(f'{engine.__class__.__name__}: не удалось загрузить страницу {page} подзапроса '
+                                  f'{part} ({error})', file=sys.stderr)
+                            continue
+
+                        if page == engine.FIRST_PAGE:
+                            found = engine.get_found(response)
+                            parts = self.split(part) if found > self.capacity else []
+                            if parts and self.slices + len(parts) <= self.MAX_SLICES:
+                                metrics.inc('crawl.splits', platform=engine.PLATFORM)
+                                for child in parts:
+                                    probe(child)
+                                continue
+                            if found > self.capacity:
+                                self.truncated += 1
+                                print(f'{engine.__class__.__name__}: подзапрос {part} не делится дальше, будут '
+                                      f'загружены {self.capacity} из {found} вакансий', file=sys.stderr)
+                            pages = min(engine.MAX_PAGES, -(-found // engine.PER_PAGE))
+                            for next_page in range(engine.FIRST_PAGE + 1, engine.FIRST_PAGE + pages):
+                                futures[executor.submit(self.request, keyword, part, next_page)] = (part, next_page)
+
+                        vacancies = []
+                        for vacancy in response[engine.ITEMS_FIELD]:
+                            vacancy_id = str(vacancy['id'])
+                            if vacancy_id not in seen:
+                                seen.add(vacancy_id)
+                                vacancies.append(vacancy)
+                        if limit is not None:
+                            vacancies = vacancies[:limit - count]
+                        if vacancies:
+                            count += len(vacancies)
+                            yield vacancies
+                        if limit is not None and count >= limit:
+                            return
+            finally:
+                for future in futures:
+                    future.cancel()
+                metrics.inc('crawl.slices', self.slices, platform=engine.PLATFORM)
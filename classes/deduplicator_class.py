@@ -0,0 +1,261 @@
+import random
+import re
+import zlib
+
+from classes.search_index_class import SearchIndex
+from classes.vacansy_class import Vacancy
+
+
+class Deduplicator:
+    """
+    Поиск одной и той же вакансии, опубликованной на разных платформах. Кандидаты в дубликаты отбираются
+    по MinHash-подписям названия (LSH: вакансии попадают в одну корзину, если совпадает одна из полос подписи)
+    внутри одного региона, поэтому время работы растет почти линейно, без сравнения всех пар вакансий.
+    Кандидаты проверяются по сходству названия, работодателю и вилке зарплаты; переполненные корзины
+    (много одинаковых названий в одном регионе) делятся по работодателю и зарплате (см. iter_pairs)
+    """
+
+    # количество хэш-функций MinHash и количество полос LSH (в полосе NUM_HASHES // BANDS значений)
+    NUM_HASHES = 16
+    BANDS = 8
+    # длина шингла (подстроки названия) в символах
+    SHINGLE_SIZE = 3
+    # минимальное сходство (коэффициент Жаккара) шинглов названий для дубликатов
+    TITLE_THRESHOLD = 0.6
+    # допустимое расхождение зарплат на руки в рублях (доля)
+    SALARY_TOLERANCE = 0.15
+    # организационно-правовые формы, не учитываемые при сравнении работодателей
+    LEGAL_FORMS = frozenset({'ооо', 'оао', 'зао', 'пао', 'ао', 'нко', 'ано', 'ип', 'фгуп', 'гк', 'группа',
+                             'компаний', 'llc', 'ltd', 'inc', 'gmbh', 'group'})
+    # обозначения населенных пунктов перед названием региона
+    AREA_PREFIXES = re.compile(r'^(г|гор|город|пос|пгт|с|д)\.?\s+')
+
+    # корзина LSH, в которой больше вакансий, проверяется не попарно (см. iter_pairs)
+    MAX_BUCKET = 64
+
+    PRIME = (1 << 61) - 1
+
+    def __init__(self, cross_platform: bool = True, title_threshold: float | None = None, seed: int = 1):
+        """
+        Инициализатор класса
+        :param cross_platform: искать дубликаты только среди вакансий разных платформ (на одной платформе
+        одинаковые вакансии обычно означают несколько реальных позиций)
+        :param title_threshold: минимальное сходство названий (по умолчанию TITLE_THRESHOLD)
+        :param seed: начальное значение для коэффициентов хэш-функций (результат воспроизводим между запусками)
+        """
+        self.cross_platform = cross_platform
+        self.title_threshold = self.TITLE_THRESHOLD if title_threshold is None else title_threshold
+        generator = random.Random(seed)
+        self.__hashes = [(generator.randrange(1, self.PRIME), generator.randrange(0, self.PRIME))
+                         for _ in range(self.NUM_HASHES)]
+        self.__rows = self.NUM_HASHES // self.BANDS
+
+    @staticmethod
+    def normalize_title(title: str | None) -> str:
+        """Название вакансии без разметки, регистра и окончаний слов"""
+        return ' '.join(SearchIndex.tokenize(title))
+
+    @classmethod
+    def normalize_employer(cls, employer: str | None) -> frozenset[str]:
+        """
+        Слова названия работодателя без кавычек и организационно-правовой формы
+        ('Яндекс/ООО "ЯНДЕКС"' -> {'яндекс'})
+        """
+        if not employer:
+            return frozenset()
+        return frozenset(word for word in SearchIndex.WORD_RE.findall(employer.lower().replace('ё', 'е'))
+                         if word not in cls.LEGAL_FORMS)
+
+    @classmethod
+    def normalize_area(cls, area: str | None) -> str:
+        """Название региона без регистра и обозначения населенного пункта"""
+        return cls.AREA_PREFIXES.sub('', (area or '').lower().replace('ё', 'е').strip())
+
+    def get_shingles(self, title: str) -> set[str]:
+        """Множество подстрок нормализованного названия длиной SHINGLE_SIZE"""
+        if len(title) <= self.SHINGLE_SIZE:
+            return {title}
+        return {title[position:position + self.SHINGLE_SIZE] for position in range(len(title) - self.SHINGLE_SIZE + 1)}
+
+    def get_signature(self, shingles: set[str]) -> tuple[int, ...]:
+        """
+        MinHash-подпись множества шинглов: минимум каждой хэш-функции по всем шинглам. Шинглы хэшируются crc32,
+        а не встроенным hash, который для строк меняется от запуска к запуску
+        """
+        prime = self.PRIME
+        values = [zlib.crc32(shingle.encode('UTF-8')) for shingle in shingles]
+        return tuple(min((a * value + b) % prime for value in values) for a, b in self.__hashes)
+
+    @staticmethod
+    def get_similarity(first: set, second: set) -> float:
+        """Коэффициент Жаккара двух множеств"""
+        if not first or not second:
+            return 0.0
+        return len(first & second) / len(first | second)
+
+    @classmethod
+    def is_salary_compatible(cls, first: Vacancy, second: Vacancy) -> bool:
+        """Вилки зарплат (на руки в рублях) пересекаются с учетом допуска или зарплата не указана в одной из вакансий"""
+        first_low = first.salary_min_norm or first.salary_max_norm
+        second_low = second.salary_min_norm or second.salary_max_norm
+        if not first_low or not second_low:
+            return True
+        first_high = first.salary_max_norm or first_low
+        second_high = second.salary_max_norm or second_low
+        tolerance = cls.SALARY_TOLERANCE
+        return first_low <= second_high * (1 + tolerance) and second_low <= first_high * (1 + tolerance)
+
+    def find_groups(self, vacancies: list[Vacancy]) -> list[list[int]]:
+        """
+        Поиск групп дубликатов
+        :param vacancies: список с экземплярами класса Vacancy
+        :return: списки номеров вакансий в группах из двух и более вакансий (в порядке исходного списка)
+        """
+        features = []  # (название, слова работодателя, шинглы названия) для каждой вакансии
+        keys = []  # ключи корзин вакансии по полосам
+        buckets = {}  # (регион, номер полосы, значения полосы) -> номера вакансий
+        rows = self.__rows
+        for position, vacancy in enumerate(vacancies):
+            title = self.normalize_title(vacancy.title)
+            shingles = self.get_shingles(title)
+            features.append((title, self.normalize_employer(vacancy.employer), shingles))
+
+            area = self.normalize_area(vacancy.area)
+            signature = self.get_signature(shingles)
+            vacancy_keys = [(area, band, signature[band * rows:(band + 1) * rows]) for band in range(self.BANDS)]
+            keys.append(vacancy_keys)
+            for key in vacancy_keys:
+                buckets.setdefault(key, []).append(position)
+
+        # объединение найденных пар в группы (система непересекающихся множеств)
+        parents = list(range(len(vacancies)))
+
+        def find(position):
+            while parents[position] != position:
+                parents[position] = parents[parents[position]]
+                position = parents[position]
+            return position
+
+        max_bucket = self.MAX_BUCKET
+
+        def checked_before(first, second, band):
+            """Пара уже проверялась в корзине одной из предыдущих полос"""
+            first_keys, second_keys = keys[first], keys[second]
+            return any(first_keys[previous] == second_keys[previous]
+                       and len(buckets[first_keys[previous]]) <= max_bucket for previous in range(band))
+
+        employers = [employer for _, employer, _ in features]
+        oversized = set()  # составы переполненных корзин (одинаковые названия дают одинаковые корзины во всех полосах)
+        for (_, band, _), positions in buckets.items():
+            if len(positions) < 2:
+                continue
+            if len(positions) > max_bucket:
+                members = tuple(positions)
+                if members in oversized:
+                    continue
+                oversized.add(members)
+            for first, second in self.iter_pairs(vacancies, positions, employers):
+                if find(first) == find(second) or checked_before(first, second, band):
+                    continue
+                if self.is_duplicate(vacancies[first], vacancies[second], features[first], features[second]):
+                    parents[find(second)] = find(first)
+
+        groups = {}
+        for position in range(len(vacancies)):
+            groups.setdefault(find(position), []).append(position)
+        return [group for group in groups.values() if len(group) > 1]
+
+    def iter_pairs(self, vacancies: list[Vacancy], positions: list[int], employers: list[frozenset[str]]):
+        """
+        Пары кандидатов в одной корзине. Переполненная корзина (больше MAX_BUCKET вакансий) делится по словам
+        работодателя, так как у дубликатов они пересекаются; вакансии без работодателя и слишком большие части
+        проверяются в окне соседей по зарплате (у дубликатов вилки зарплат пересекаются)
+        :param vacancies: список с экземплярами класса Vacancy
+        :param positions: номера вакансий в корзине (по возрастанию)
+        :param employers: слова работодателя для каждой вакансии
+        :return: генератор пар номеров (меньший номер первым)
+        """
+        if len(positions) <= self.MAX_BUCKET:
+            yield from self.__iter_all_pairs(vacancies, positions)
+            return
+
+        by_employer = {}
+        unknown = set()
+        for position in positions:
+            for word in employers[position]:
+                by_employer.setdefault(word, []).append(position)
+            if not employers[position]:
+                unknown.add(position)
+        for group in by_employer.values():
+            if len(group) <= self.MAX_BUCKET:
+                yield from self.__iter_all_pairs(vacancies, group)
+            else:
+                yield from self.__iter_window_pairs(vacancies, group)
+        if unknown:
+            for first, second in self.__iter_window_pairs(vacancies, positions):
+                if first in unknown or second in unknown:
+                    yield first, second
+
+    def __iter_all_pairs(self, vacancies: list[Vacancy], positions: list[int]):
+        """Все пары вакансий (при поиске между платформами - только пары вакансий разных платформ)"""
+        if not self.cross_platform:
+            for first_index, first in enumerate(positions):
+                for second in positions[first_index + 1:]:
+                    yield first, second
+            return
+        by_platform = {}
+        for position in positions:
+            by_platform.setdefault(vacancies[position].platform, []).append(position)
+        groups = list(by_platform.values())
+        for group_index, group in enumerate(groups):
+            for other in groups[group_index + 1:]:
+                for first in group:
+                    for second in other:
+                        yield (first, second) if first < second else (second, first)
+
+    def __iter_window_pairs(self, vacancies: list[Vacancy], positions: list[int]):
+        """Пары вакансий, соседних по зарплате: каждая сравнивается со следующими MAX_BUCKET вакансиями"""
+        cross_platform = self.cross_platform
+        ordered = sorted(positions, key=lambda position: vacancies[position].salary_min_norm
+                         or vacancies[position].salary_max_norm or 0)
+        for index, first in enumerate(ordered):
+            for second in ordered[index + 1:index + 1 + self.MAX_BUCKET]:
+                if cross_platform and vacancies[first].platform == vacancies[second].platform:
+                    continue
+                yield (first, second) if first < second else (second, first)
+
+    def is_duplicate(self, first: Vacancy, second: Vacancy, first_features: tuple, second_features: tuple) -> bool:
+        """
+        Проверка пары кандидатов: платформы, работодатель, зарплата и сходство названий
+        :param first: первая вакансия
+        :param second: вторая вакансия
+        :param first_features: (нормализованное название, слова работодателя, шинглы названия) первой вакансии
+        :param second_features: то же для второй вакансии
+        :return: True, если вакансии считаются дубликатами
+        """
+        first_title, first_employer, first_shingles = first_features
+        second_title, second_employer, second_shingles = second_features
+        if self.cross_platform and first.platform == second.platform:
+            return False
+        if first_employer and second_employer and not first_employer & second_employer:
+            return False
+        if not self.is_salary_compatible(first, second):
+            return False
+        return first_title == second_title or \
+            self.get_similarity(first_shingles, second_shingles) >= self.title_threshold
+
+    def collapse(self, vacancies) -> list[Vacancy]:
+        """
+        Удаление дубликатов: из каждой группы остается первая вакансия, а ссылки на остальные
+        сохраняются в ее атрибуте duplicates
+        :param vacancies: итерируемый объект с экземплярами класса Vacancy
+        :return: список вакансий без дубликатов в исходном порядке
+        """
+        vacancies = list(vacancies)
+        removed = set()
+        for group in self.find_groups(vacancies):
+            original = vacancies[group[0]]
+            original.duplicates = [{'id': vacancies[position].id, 'platform': vacancies[position].platform,
+                                    'link': vacancies[position].link} for position in group[1:]]
+            removed.update(group[1:])
+        return [vacancy for position, vacancy in enumerate(vacancies) if position not in removed]
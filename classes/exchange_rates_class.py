@@ -0,0 +1,115 @@
+import json
+import os
+import time
+from threading import Lock
+
+
+class ExchangeRates:
+    """
+    Таблица курсов валют для приведения зарплат к базовой валюте (рубли) и к сумме на руки.
+    Курсы загружаются из справочника headhunter и хранятся на диске
+    """
+
+    URL = 'https://api.hh.ru/dictionaries'
+    # базовая валюта (код headhunter)
+    BASE = 'RUR'
+    # другие обозначения валют, встречающиеся на платформах
+    ALIASES = {'RUB': 'RUR'}
+    # интервал обновления курсов (в секундах) - 1 день
+    REFRESH_INTERVAL = 24 * 60 * 60
+    # НДФЛ для пересчета зарплаты до вычета налогов в сумму на руки
+    INCOME_TAX = 0.13
+
+    __default = None
+    __default_lock = Lock()
+
+    def __init__(self, path: str = '.cache/exchange_rates.json', refresh_interval: int | None = None):
+        """
+        Инициализатор класса
+        :param path: файл для хранения курсов
+        :param refresh_interval: интервал обновления курсов в секундах (по умолчанию REFRESH_INTERVAL)
+        """
+        self.path = path
+        self.refresh_interval = self.REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+        self.rates = {self.BASE: 1.0}  # код валюты -> количество единиц валюты за 1 единицу базовой валюты
+        self.updated_at = None
+        self.__lock = Lock()
+        try:
+            with open(path, 'r', encoding='UTF-8') as rates_file:
+                data = json.load(rates_file)
+            self.rates.update(data['rates'])
+            self.updated_at = data['updated_at']
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+    @classmethod
+    def get_default(cls) -> 'ExchangeRates':
+        """Общая таблица курсов (загружается с диска при первом обращении)"""
+        with ExchangeRates.__default_lock:
+            if ExchangeRates.__default is None:
+                ExchangeRates.__default = cls()
+            return ExchangeRates.__default
+
+    def is_stale(self) -> bool:
+        """Курсы не загружались или устарели"""
+        return self.updated_at is None or time.time() - self.updated_at > self.refresh_interval
+
+    def update(self, rates: dict[str, float]) -> None:
+        """
+        Обновление курсов и сохранение на диск
+        :param rates: словарь {код валюты: количество единиц валюты за 1 единицу базовой валюты}
+        """
+        with self.__lock:
+            self.rates.update({self.get_code(code): rate for code, rate in rates.items() if rate})
+            self.updated_at = time.time()
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='UTF-8') as rates_file:
+                json.dump({'updated_at': self.updated_at, 'rates': self.rates}, rates_file, indent=4)
+            os.replace(tmp_path, self.path)
+
+    def refresh(self, engine) -> None:
+        """
+        Загрузка курсов из справочника headhunter
+        :param engine: экземпляр класса платформы (с методом get_json)
+        """
+        currencies = engine.get_json(self.URL)['currency']
+        self.update({currency['code']: currency['rate'] for currency in currencies})
+
+    @classmethod
+    def get_code(cls, currency: str | None) -> str | None:
+        """Код валюты в обозначениях headhunter ('rub' с superjob -> 'RUR')"""
+        if currency is None:
+            return None
+        code = currency.upper()
+        return cls.ALIASES.get(code, code)
+
+    def convert(self, amount: float | None, currency: str | None) -> float | None:
+        """
+        Пересчет суммы в базовую валюту
+        :param amount: сумма
+        :param currency: валюта суммы (если не указана, считается базовой)
+        :return: сумма в базовой валюте или None, если сумма не указана или курс валюты неизвестен
+        """
+        if amount is None:
+            return None
+        rate = self.rates.get(self.get_code(currency) or self.BASE)
+        return amount / rate if rate else None
+
+    def normalize(self, amount: float | None, currency: str | None, gross: bool | None = None) -> float | None:
+        """
+        Приведение зарплаты к сумме на руки в базовой валюте
+        :param amount: зарплата
+        :param currency: валюта
+        :param gross: True, если зарплата указана до вычета налогов (hh salary['gross'])
+        :return: зарплата на руки в базовой валюте или None
+        """
+        value = self.convert(amount, currency)
+        if value is None:
+            return None
+        if gross:
+            value *= 1 - self.INCOME_TAX
+        return round(value, 2)
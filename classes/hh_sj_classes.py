@@ -1,50 +1,356 @@
 import json
+import random
+import sys
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from urllib.parse import urlparse
 import requests
+from requests.adapters import HTTPAdapter
+
+from classes.area_directory_class import AreaDirectory
+from classes.crawl_planner_class import CrawlPlanner
+from classes.exchange_rates_class import ExchangeRates
+from classes.metrics_class import Metrics
+from classes.response_cache_class import ResponseCache, CacheMissError
 
 
 class Engine(ABC):
     """Абстрактный класс-родитель для классов HH и SJ"""
 
+    # максимальное количество одновременных запросов к API
+    MAX_WORKERS = 5
+    # размер пула соединений общей сессии
+    POOL_SIZE = 10
+    # таймауты на подключение и чтение ответа в секундах
+    TIMEOUT = (5, 30)
+    # количество повторных попыток и параметры экспоненциальной задержки между ними
+    RETRIES = 3
+    BACKOFF = 0.5
+    MAX_BACKOFF = 30
+    # коды ответа, при которых запрос повторяется
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    # общая для всех платформ сессия с пулом keep-alive соединений
+    __session = None
+    __session_lock = Lock()
+
+    # счетчики запросов по хостам
+    __stats = {}
+    __stats_lock = Lock()
+
+    def __init__(self, max_workers: int | None = None, pool_size: int | None = None,
+                 timeout: float | tuple | None = None, retries: int | None = None,
+                 cache: ResponseCache | None = None):
+        """
+        Инициализатор класса
+        :param max_workers: ограничение на количество одновременных запросов (по умолчанию MAX_WORKERS)
+        :param pool_size: размер пула соединений. Если задан, экземпляр использует собственную сессию,
+        иначе общую сессию класса Engine
+        :param timeout: таймаут запроса в секундах (по умолчанию TIMEOUT)
+        :param retries: количество повторных попыток (по умолчанию RETRIES)
+        :param cache: кэш ответов API на диске (по умолчанию не используется)
+        """
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self.timeout = timeout or self.TIMEOUT
+        self.retries = self.RETRIES if retries is None else retries
+        self.session = self.create_session(pool_size) if pool_size else Engine.get_session()
+        self.cache = cache
+
     @abstractmethod
     def get_request(self, *args, **qwargs):
         pass
 
+    @staticmethod
+    def create_session(pool_size: int) -> requests.Session:
+        """
+        Создание сессии с пулом соединений
+        :param pool_size: максимальное количество соединений к одному хосту
+        :return: сессия requests
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        """Общая сессия для всех экземпляров (создается при первом обращении)"""
+        with Engine.__session_lock:
+            if Engine.__session is None:
+                Engine.__session = cls.create_session(cls.POOL_SIZE)
+            return Engine.__session
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        """
+        Счетчики запросов по хостам
+        :return: словарь {хост: {requests, retries, errors, total_time, avg_latency}}
+        """
+        with Engine.__stats_lock:
+            stats = {host: dict(counters) for host, counters in Engine.__stats.items()}
+        for counters in stats.values():
+            counters['avg_latency'] = counters['total_time'] / counters['requests'] if counters['requests'] else 0
+        return stats
+
+    @classmethod
+    def reset_stats(cls) -> None:
+        """Обнуление счетчиков запросов"""
+        with Engine.__stats_lock:
+            Engine.__stats.clear()
+
+    @staticmethod
+    def _update_stats(host: str, elapsed: float, retry: bool = False, error: bool = False) -> None:
+        with Engine.__stats_lock:
+            counters = Engine.__stats.setdefault(host, {'requests': 0, 'retries': 0, 'errors': 0, 'total_time': 0.0})
+            counters['requests'] += 1
+            counters['total_time'] += elapsed
+            counters['retries'] += retry
+            counters['errors'] += error
+
+        metrics = Metrics.get_default()
+        if metrics.enabled:
+            metrics.inc('engine.requests', host=host)
+            metrics.observe('engine.request_seconds', elapsed, host=host)
+            if retry:
+                metrics.inc('engine.retries', host=host)
+            if error:
+                metrics.inc('engine.errors', host=host)
+
+    def get_delay(self, attempt: int, response: requests.Response | None = None) -> float:
+        """
+        Задержка перед повторной попыткой: значение заголовка Retry-After, если он есть,
+        иначе экспоненциальная задержка со случайным разбросом
+        :param attempt: номер попытки (начиная с 0)
+        :param response: ответ сервера (если был получен)
+        :return: задержка в секундах
+        """
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            if retry_after.isdigit():
+                return min(int(retry_after), self.MAX_BACKOFF)
+            try:
+                return min(max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0), self.MAX_BACKOFF)
+            except (TypeError, ValueError):
+                pass
+        return random.uniform(0, min(self.MAX_BACKOFF, self.BACKOFF * 2 ** attempt))
+
+    def send_request(self, url: str, params: dict | None = None, headers: dict | None = None) -> requests.Response:
+        """
+        GET-запрос через пул соединений с повторными попытками при ошибках сети, 429 и 5xx
+        :param url: адрес запроса
+        :param params: параметры запроса
+        :param headers: заголовки запроса
+        :return: успешный ответ сервера
+        """
+        host = urlparse(url).netloc
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self._update_stats(host, time.perf_counter() - start, retry=not last_attempt, error=last_attempt)
+                if last_attempt:
+                    raise
+                time.sleep(self.get_delay(attempt))
+                continue
+
+            elapsed = time.perf_counter() - start
+            if response.status_code in self.RETRY_STATUSES and not last_attempt:
+                self._update_stats(host, elapsed, retry=True)
+                time.sleep(self.get_delay(attempt, response))
+                continue
+
+            self._update_stats(host, elapsed, error=not response.ok)
+            Metrics.get_default().inc('engine.bytes', len(response.content), host=host)
+            response.raise_for_status()
+            return response
+
+    def get_json(self, url: str, params: dict | None = None, headers: dict | None = None):
+        """
+        Получение json-ответа API с использованием кэша (если он задан).
+        Устаревший ответ с ETag/Last-Modified проверяется условным запросом и при ответе 304 берется из кэша
+        :param url: адрес запроса
+        :param params: параметры запроса
+        :param headers: заголовки запроса
+        :return: json-ответ сервера
+        """
+        if self.cache is None:
+            return self.send_request(url, params=params, headers=headers).json()
+
+        metrics = Metrics.get_default()
+        key = self.cache.make_key(self.__class__.__name__, url, params)
+        cached = self.cache.lookup(key, url)
+        if cached is not None and (cached[1] or self.cache.offline):
+            metrics.inc('cache.hits', platform=self.PLATFORM)
+            return cached[0]
+        metrics.inc('cache.misses' if cached is None else 'cache.stale', platform=self.PLATFORM)
+        if self.cache.offline:
+            raise CacheMissError(f'Нет сохраненного ответа для {url} {params}')
+
+        headers = dict(headers or {})
+        if cached is not None:
+            meta = cached[2]
+            if meta['etag']:
+                headers['If-None-Match'] = meta['etag']
+            if meta['last_modified']:
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = self.send_request(url, params=params, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            metrics.inc('cache.revalidated', platform=self.PLATFORM)
+            self.cache.touch(key)
+            return cached[0]
+
+        data = response.json()
+        self.cache.store(key, data, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return data
+
+    def update_exchange_rates(self) -> ExchangeRates:
+        """
+        Обновление общей таблицы курсов валют, если она устарела. Курсы нужны до создания вакансий,
+        так как зарплата в рублях рассчитывается один раз при создании. При ошибке используются сохраненные курсы
+        :return: экземпляр класса ExchangeRates
+        """
+        rates = ExchangeRates.get_default()
+        if rates.is_stale():
+            try:
+                rates.refresh(self)
+            except Exception as error:
+                print(f'{self.__class__.__name__}: не удалось обновить курсы валют ({error})', file=sys.stderr)
+        return rates
+
+    def iter_pages(self, keyword, pages, *args):
+        """
+        Параллельная загрузка страниц с вакансиями в пуле потоков
+        :param keyword: ключевое слово (название вакансии)
+        :param pages: номера страниц для загрузки
+        :param args: параметры, передаваемые в get_request после номера страницы (регион)
+        :return: генератор списков вакансий со всех успешно загруженных страниц в порядке номеров страниц
+        """
+        pages = list(pages)
+        if not pages:
+            return
+        self.update_exchange_rates()
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pages))) as executor:
+            futures = [executor.submit(self.get_request, keyword, page, *args) for page in pages]
+
+            for page, future in zip(pages, futures):
+                # ошибка на одной странице не должна терять результаты остальных страниц
+                try:
+                    yield future.result()
+                except Exception as error:
+                    print(f'{self.__class__.__name__}: не удалось загрузить страницу {page} ({error})',
+                          file=sys.stderr)
+
+    def get_found(self, response: dict) -> int:
+        """Количество вакансий, найденных по запросу (из ответа API на запрос страницы)"""
+        return int(response.get(self.FOUND_FIELD) or 0)
+
+    def get_subareas(self, area) -> list:
+        """Регионы, на которые можно разделить запрос по региону area (по умолчанию не делится)"""
+        return []
+
+    def iter_complete_pages(self, keyword, area, limit: int | None = None):
+        """
+        Загрузка всех вакансий по запросу без ограничения API на глубину выдачи: запрос делится на
+        непересекающиеся подзапросы (см. CrawlPlanner)
+        :param keyword: ключевое слово (название вакансии)
+        :param area: id региона
+        :param limit: максимальное количество вакансий (по умолчанию все найденные)
+        :return: генератор списков вакансий без повторов
+        """
+        return CrawlPlanner(self).iter_pages(keyword, area, limit=limit)
+
+    def fetch_pages(self, keyword, pages, *args) -> list:
+        """
+        Параллельная загрузка страниц с вакансиями в пуле потоков
+        :param keyword: ключевое слово (название вакансии)
+        :param pages: номера страниц для загрузки
+        :param args: параметры, передаваемые в get_request после номера страницы (регион)
+        :return: список вакансий со всех успешно загруженных страниц в порядке номеров страниц
+        """
+        vacancies = []
+        for page in self.iter_pages(keyword, pages, *args):
+            vacancies.extend(page)
+        return vacancies
+
 
 class HeadHunterAPI(Engine):
     """Класс для работы с API сайта headhunter.ru"""
     URL = 'https://api.hh.ru/vacancies'
+    PLATFORM = 'hh'
+    # номер первой страницы и максимальное количество страниц для одного запроса
+    FIRST_PAGE = 0
+    MAX_PAGES = 20
+    PER_PAGE = 100
+    # поля ответа со списком вакансий и количеством найденных вакансий
+    ITEMS_FIELD = 'items'
+    FOUND_FIELD = 'found'
+    # признаки, по которым CrawlPlanner делит запрос (фильтр hh по зарплате не делит вакансии на непересекающиеся
+    # группы, поэтому не используется)
+    SPLIT_FIELDS = ('date', 'area')
+    # регион по умолчанию (вся Россия) и поле с датой публикации вакансии
+    DEFAULT_AREA = 113
+    PUBLISHED_FIELD = 'published_at'
 
-    @staticmethod
-    def get_region_id(region, town=None) -> str:
+    # справочник регионов, общий для всех экземпляров
+    __areas = None
+    __areas_lock = Lock()
+
+    @classmethod
+    def get_area_directory(cls) -> AreaDirectory:
+        """Справочник регионов headhunter (загружается один раз и хранится на диске)"""
+        with cls.__areas_lock:
+            if cls.__areas is None:
+                cls.__areas = AreaDirectory(cls())
+            return cls.__areas
+
+    @classmethod
+    def get_region_id(cls, region, town=None) -> str | None:
         """
         Получение ID региона по его названию
         :param region: название региона
         :param town: название города
-        :return: id региона и id города
+        :return: id города, если он задан, иначе id региона (подходит для параметра area метода get_vacancies);
+        None, если регион не найден
         """
-        regions_response = requests.get('https://api.hh.ru/areas')
-        for r in regions_response.json()[0]['areas']:
-            if region.capitalize() in r['name']:
+        return cls.get_area_directory().get_id(region, town)
 
-                # если задан город
-                if town:
-                    for t in r['areas']:
-                        if region.capitalize() in t['name']:
-                            return f"id области {region} - {r['id']}; id города {town} - {t['id']}"
-                else:
-                    return f"id региона {region} - {r['id']}"
-        return 'Некорректный запрос'
+    def get_subareas(self, area) -> list:
+        """Регионы и города, входящие в регион area (по справочнику регионов)"""
+        return self.get_area_directory().get_children(area)
 
-    def get_request(self, keyword, page, area, per_page=100):
+    def get_request(self, keyword, page, area, per_page=100, date_from: int | None = None):
         """
         Отправка запроса на API
         :param keyword: ключевое слово (название вакансии)
         :param page: номер страницы
         :param per_page: количество вакансий на одной странице
         :param area: ID региона из справочника
+        :param date_from: только вакансии, опубликованные не раньше этого момента (unixtime)
         :return: json со списком вакансий
         """
+        return self.get_response(keyword, page, area, per_page, date_from)['items']
+
+    def get_response(self, keyword, page, area, per_page=100, date_from: int | None = None,
+                     date_to: int | None = None) -> dict:
+        """
+        Отправка запроса на API
+        :param keyword: ключевое слово (название вакансии)
+        :param page: номер страницы
+        :param area: ID региона из справочника
+        :param per_page: количество вакансий на одной странице
+        :param date_from: только вакансии, опубликованные не раньше этого момента (unixtime)
+        :param date_to: только вакансии, опубликованные не позже этого момента (unixtime)
+        :return: ответ API (список вакансий items и количество найденных вакансий found)
+        """
 
         # в параметрах задана сортировка по дате и только с указанной зарплатой в рублях по России
         params = {'text': keyword,
@@ -55,9 +361,27 @@ class HeadHunterAPI(Engine):
                   'area': area,
                   'currency': 'RUR'
                   }
+        if date_from is not None:
+            params['date_from'] = datetime.fromtimestamp(date_from, timezone.utc).isoformat()
+        if date_to is not None:
+            params['date_to'] = datetime.fromtimestamp(date_to, timezone.utc).isoformat()
 
-        response = requests.get(self.URL, params=params).json()
-        return response['items']
+        with Metrics.get_default().span('engine.get_request', platform=self.PLATFORM):
+            return self.get_json(self.URL, params=params)
+
+    def iter_vacancy_pages(self, keyword: str, pages, area=113):
+        """
+        Делает запросы, изменяя номер страницы, и отдает страницы по мере загрузки
+        :param keyword: ключевое слово (название вакансии)
+        :param pages: количество страниц для парсинга (None - все найденные вакансии)
+        :param area: ID региона из справочника
+        :return: генератор списков вакансий (по одному на страницу)
+        """
+        # API отдает по одному запросу не больше 2000 вакансий, больше - через деление запроса на части
+        if pages is None or pages > self.MAX_PAGES:
+            return self.iter_complete_pages(keyword, area, None if pages is None else pages * self.PER_PAGE)
+
+        return self.iter_pages(keyword, range(pages), area)
 
     def get_vacancies(self, keyword: str, pages, area=113) -> list[json]:
         """
@@ -65,19 +389,11 @@ class HeadHunterAPI(Engine):
         :param keyword: ключевое слово (название вакансии)
         :param area: ID региона из справочника (по умолчанию 113 - Вся Россия) 1716 - Владимирская область, 1 - Москва
         2019 - Московская область, 2 - Санкт-Петербург
-        :param pages: количество страниц для парсинга
+        :param pages: количество страниц для парсинга (None - все найденные вакансии)
         :return: список с вакансиями на соответствующей странице
         """
-        # Максимальное количество вакансий для парсинга - 2000
-        if pages > 20:
-            raise ValueError('Вы превысили максимальное число вакансий, возможных для парсинга по API')
-
-        vacancies = []  # список с вакансиями
-        for page in range(pages):
-            page = self.get_request(keyword, page, area)
-            vacancies.extend(page)
-
-        return vacancies
+        with Metrics.get_default().span('engine.get_vacancies', platform=self.PLATFORM):
+            return [vacancy for page in self.iter_vacancy_pages(keyword, pages, area) for vacancy in page]
 
 
 class SuperJobAPI(Engine):
@@ -88,40 +404,85 @@ class SuperJobAPI(Engine):
                        '.c191c920c6f79710ba889d27e93e9bb87bdb1533 '
     # адрес сайта
     URL = 'https://api.superjob.ru/2.0/vacancies/'
+    PLATFORM = 'sj'
+    # номер первой страницы и максимальное количество страниц для одного запроса
+    FIRST_PAGE = 1
+    MAX_PAGES = 5
+    PER_PAGE = 100
+    # поля ответа со списком вакансий и количеством найденных вакансий
+    ITEMS_FIELD = 'objects'
+    FOUND_FIELD = 'total'
+    # признаки, по которым CrawlPlanner делит запрос
+    SPLIT_FIELDS = ('date', 'salary')
+    # регион по умолчанию (вся Россия) и поле с датой публикации вакансии
+    DEFAULT_AREA = 1
+    PUBLISHED_FIELD = 'date_published'
 
-    def get_request(self, keyword, page, region_id, count=100) -> json:
+    def get_request(self, keyword, page, region_id, count=100, date_from: int | None = None) -> json:
         """
         Метод для отправки запроса на api superjob
         :param keyword: ключевое слово (название профессии)
         :param region_id: id региона (города или области) 1-Россия
         :param page: номер страницы
         :param count: количество вакансий на странице (100 вакансий)
+        :param date_from: только вакансии, опубликованные не раньше этого момента (unixtime)
         :return: список вакансий, соответствующих требованиям в формате json
         """
+        return self.get_response(keyword, page, region_id, count, date_from)['objects']
+
+    def get_response(self, keyword, page, region_id, count=100, date_from: int | None = None,
+                     date_to: int | None = None, salary_from: int | None = None,
+                     salary_to: int | None = None) -> dict:
+        """
+        Метод для отправки запроса на api superjob
+        :param keyword: ключевое слово (название профессии)
+        :param page: номер страницы
+        :param region_id: id региона (города или области) 1-Россия
+        :param count: количество вакансий на странице (100 вакансий)
+        :param date_from: только вакансии, опубликованные не раньше этого момента (unixtime)
+        :param date_to: только вакансии, опубликованные не позже этого момента (unixtime)
+        :param salary_from: нижняя граница оклада
+        :param salary_to: верхняя граница оклада
+        :return: ответ API (список вакансий objects и количество найденных вакансий total)
+        """
         params = {'keyword': keyword,
                   'с': region_id,
                   'sort_new (unixtime)': 1,
                   'page': page,
                   'count': count,
                   'no_agreement': 1}
+        if date_from is not None:
+            params['date_published_from'] = date_from
+        if date_to is not None:
+            params['date_published_to'] = date_to
+        if salary_from is not None:
+            params['payment_from'] = salary_from
+        if salary_to is not None:
+            params['payment_to'] = salary_to
 
-        response = requests.get(self.URL, headers={'X-Api-App-Id': self.SUPER_SECRET_KEY},
-                                params=params).json()
+        with Metrics.get_default().span('engine.get_request', platform=self.PLATFORM):
+            return self.get_json(self.URL, params=params, headers={'X-Api-App-Id': self.SUPER_SECRET_KEY})
 
-        return response['objects']
+    def iter_vacancy_pages(self, keyword, pages, region_id=1):
+        """
+        Постраничная отправка запроса с выдачей страниц по мере загрузки
+        :param keyword: ключевое слово
+        :param pages: количество страниц (None - все найденные вакансии). API отдает по одному запросу не больше
+        5 страниц по 100 вакансий, больше - через деление запроса на части
+        :param region_id: id региона
+        :return: генератор списков вакансий (по одному на страницу)
+        """
+        if pages is None or pages > self.MAX_PAGES:
+            return self.iter_complete_pages(keyword, region_id, None if pages is None else pages * self.PER_PAGE)
+        return self.iter_pages(keyword, range(self.FIRST_PAGE, self.FIRST_PAGE + pages), region_id)
 
     def get_vacancies(self, keyword, pages, region_id=1):
         """
         Метод для организации постраничной отправки запроса
         :param keyword: ключевое слово
-        :param pages: количество страниц (максимальное значение для API - 5 страниц по 100 вакансий)
+        :param pages: количество страниц по 100 вакансий (None - все найденные вакансии)
         :param region_id: id региона
         :return: список вакансий, собранных с сайта superjob по ключевому слову
         """
-        if pages > 5:
-            pages = 5
-        vacancies = []
-        for page in range(pages):
-            response = self.get_request(keyword, page + 1, region_id)
-            vacancies.extend(response)
-        return vacancies
+        with Metrics.get_default().span('engine.get_vacancies', platform=self.PLATFORM):
+            return [vacancy for page in self.iter_vacancy_pages(keyword, pages, region_id) for vacancy in page]
@@ -0,0 +1,169 @@
+import json
+import os
+import sys
+import time
+from threading import Event, Lock
+
+from classes.crawl_planner_class import CrawlPlanner
+from classes.hh_sj_classes import Engine
+from classes.json_saver_class import JSONSaver
+from classes.vacancy_store_class import VacancyStore
+from classes.vacansy_class import Vacancy
+
+
+class IncrementalCrawler:
+    """
+    Класс для инкрементальной загрузки вакансий: для каждой пары (платформа, ключевое слово, регион) запоминается
+    дата публикации самой новой вакансии, и при следующем запуске загружаются только более новые вакансии
+    """
+
+    def __init__(self, engines: list[Engine], state_path: str = '.cache/sync_state.json', saver_factory=None):
+        """
+        Инициализатор класса
+        :param engines: экземпляры классов платформ (HeadHunterAPI, SuperJobAPI)
+        :param state_path: файл с датами последних загруженных вакансий
+        :param saver_factory: функция, создающая хранилище для ключевого слова (с методом append_vacancies).
+        По умолчанию JSONSaver с общим хранилищем VacancyStore
+        """
+        self.engines = [engine for engine in engines if engine is not None]
+        self.state_path = state_path
+        if saver_factory is None:
+            store = VacancyStore()
+            saver_factory = lambda keyword: JSONSaver(keyword, store=store)
+        self.saver_factory = saver_factory
+        self.__stop = Event()
+        self.__lock = Lock()
+        try:
+            with open(state_path, 'r', encoding='UTF-8') as state_file:
+                self.__state = json.load(state_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.__state = {}
+
+    @staticmethod
+    def make_key(engine: Engine, keyword: str, area) -> str:
+        """Ключ для даты последней загрузки: платформа, ключевое слово и регион"""
+        return f'{engine.PLATFORM}:{keyword.lower()}:{area}'
+
+    def get_watermark(self, engine: Engine, keyword: str, area=None) -> int | None:
+        """Дата публикации самой новой загруженной вакансии (unixtime) или None, если загрузки еще не было"""
+        area = engine.DEFAULT_AREA if area is None else area
+        state = self.__state.get(self.make_key(engine, keyword, area))
+        return state['published_at'] if state else None
+
+    def __save_state(self) -> None:
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.state_path}.tmp'
+        with open(tmp_path, 'w', encoding='UTF-8') as state_file:
+            json.dump(self.__state, state_file, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.state_path)
+
+    def sync_engine(self, engine: Engine, keyword: str, area=None, saver=None) -> int:
+        """
+        Загрузка новых вакансий с одной платформы. Страницы (от новых вакансий к старым) запрашиваются по одной,
+        пока не встретится вакансия не новее сохраненной даты. Если новых вакансий больше, чем API отдает
+        по одному запросу, остальные загружаются делением запроса на части (CrawlPlanner). Сохраненная дата
+        сдвигается, только если загружены все новые вакансии, иначе при следующем запуске загрузка повторяется
+        :param engine: экземпляр класса платформы
+        :param keyword: ключевое слово
+        :param area: id региона платформы (по умолчанию вся Россия)
+        :param saver: хранилище для новых вакансий (по умолчанию saver_factory(keyword))
+        :return: количество новых вакансий
+        """
+        engine.update_exchange_rates()
+        area = engine.DEFAULT_AREA if area is None else area
+        key = self.make_key(engine, keyword, area)
+        state = self.__state.get(key) or {'published_at': None, 'ids': []}
+        watermark, seen_ids = state['published_at'], set(state['ids'])
+        saver = saver or self.saver_factory(keyword)
+        newest, newest_ids = watermark, set(seen_ids)
+        loaded_ids = set()
+
+        def append(vacancies) -> bool:
+            """Сохранение новых вакансий страницы, возвращает True, если на странице есть уже загруженные"""
+            nonlocal newest, newest_ids
+            fresh = []
+            reached_seen = False
+            for vacancy in vacancies:
+                published_at = Vacancy.parse_published_at(vacancy[engine.PUBLISHED_FIELD])
+                vacancy_id = str(vacancy['id'])
+                # вакансии, опубликованные в ту же секунду, что и последняя загруженная, различаются по id
+                if watermark is not None and (published_at < watermark or
+                                              published_at == watermark and vacancy_id in seen_ids):
+                    reached_seen = True
+                    continue
+                if vacancy_id in loaded_ids:
+                    continue
+                loaded_ids.add(vacancy_id)
+                fresh.append(vacancy)
+                if newest is None or published_at > newest:
+                    newest, newest_ids = published_at, {vacancy_id}
+                elif published_at == newest:
+                    newest_ids.add(vacancy_id)
+            if fresh:
+                saver.append_vacancies(**{f'{engine.PLATFORM}_vacancies': fresh})
+            return reached_seen
+
+        complete = False
+        for page in range(engine.FIRST_PAGE, engine.FIRST_PAGE + engine.MAX_PAGES):
+            vacancies = engine.get_request(keyword, page, area, date_from=watermark)
+            if append(vacancies) or len(vacancies) < engine.PER_PAGE:
+                complete = True
+                break
+
+        if not complete:
+            # новых вакансий больше, чем помещается в выдачу одного запроса
+            planner = CrawlPlanner(engine)
+            for vacancies in planner.iter_pages(keyword, area, date_from=watermark):
+                append(vacancies)
+            complete = not planner.failed and not planner.truncated
+
+        if loaded_ids and complete:
+            with self.__lock:
+                self.__state[key] = {'published_at': newest, 'ids': sorted(newest_ids)}
+                self.__save_state()
+        elif not complete:
+            print(f'{engine.__class__.__name__}: загружены не все новые вакансии по запросу {keyword}, '
+                  f'загрузка повторится при следующем запуске', file=sys.stderr)
+        return len(loaded_ids)
+
+    def sync(self, keyword: str, area=None) -> dict[str, int]:
+        """
+        Загрузка новых вакансий по ключевому слову со всех платформ
+        :param keyword: ключевое слово
+        :param area: id региона hh (для остальных платформ используется регион по умолчанию)
+        :return: словарь {платформа: количество новых вакансий}
+        """
+        saver = self.saver_factory(keyword)
+        result = {}
+        for engine in self.engines:
+            engine_area = area if engine.PLATFORM == 'hh' else None
+            result[engine.PLATFORM] = self.sync_engine(engine, keyword, engine_area, saver)
+        return result
+
+    def run_forever(self, keywords: list[str], interval: float, area=None, iterations: int | None = None) -> None:
+        """
+        Периодическая загрузка новых вакансий (режим службы). Ошибка по одному ключевому слову
+        не останавливает загрузку остальных
+        :param keywords: ключевые слова
+        :param interval: интервал между запусками в секундах
+        :param area: id региона hh
+        :param iterations: количество запусков (по умолчанию - пока не будет вызван stop)
+        """
+        iteration = 0
+        while not self.__stop.is_set() and (iterations is None or iteration < iterations):
+            started = time.monotonic()
+            for keyword in keywords:
+                try:
+                    result = self.sync(keyword, area)
+                    print(f'{time.strftime("%Y-%m-%d %H:%M:%S")} {keyword}: новых вакансий {result}', file=sys.stderr)
+                except Exception as error:
+                    print(f'Не удалось обновить вакансии по запросу {keyword} ({error})', file=sys.stderr)
+            iteration += 1
+            if iterations is None or iteration < iterations:
+                self.__stop.wait(max(0.0, interval - (time.monotonic() - started)))
+
+    def stop(self) -> None:
+        """Остановка режима службы после текущей итерации"""
+        self.__stop.set()
@@ -1,98 +1,250 @@
 import json
+import os
 
+from classes.exchange_rates_class import ExchangeRates
+from classes.metrics_class import Metrics
+from classes.normalizer_class import get_normalizer, loads, normalize_chunks
+from classes.search_index_class import SearchIndex
+from classes.vacancy_exporter_class import VacancyExporter
+from classes.vacancy_store_class import VacancyStore
+from classes.vacancy_table_class import VacancyTable
 from classes.vacansy_class import Vacancy
 
 
 class JSONSaver:
     """Класс для сохранение данных о вакансиях в json файл, получения вакансий оттуда и удаления"""
 
-    def __init__(self, keyword: str):
+    # количество вакансий в одной части при чтении файлов
+    CHUNK_SIZE = 2000
+
+    def __init__(self, keyword: str, streaming: bool = False, store: VacancyStore | None = None):
         """
         инициализатор класса
         :param keyword: имя для файла
+        :param streaming: если True, вакансии хранятся построчно в формате json lines (файлы .jsonl),
+        дописываются постранично и читаются без загрузки всего файла в память
+        :param store: общее хранилище вакансий без дублей. Если задано, вакансии hh и sj сохраняются в него
+        (с пометкой ключевого слова) вместо отдельных файлов
         """
+        self.__keyword = keyword.title()
         self.__filename = f'{keyword.title()}.json'  # имя файла
+        self.__store = store
+        self.__streaming = streaming
+        extension = 'jsonl' if streaming else 'json'
+        self.__hh_path = f'hh_{keyword.title()}.{extension}'  # файл с вакансиями hh
+        self.__sj_path = f'sj_{keyword.title()}.{extension}'  # файл с вакансиями sj
 
     @property
     def filename(self):
         return self.__filename
 
+    @property
+    def streaming(self):
+        return self.__streaming
+
+    @property
+    def store(self):
+        return self.__store
+
+    @property
+    def index_filename(self):
+        return f'index_{self.__filename}'
+
+    @Metrics.timed('json_saver.add_vacancies')
     def add_vacancies(self, hh_vacancies: list | None = None, sj_vacancies: list | None = None) -> None:
         """Записывает список с вакансиями в json файлы (вакансии hh в один файл, sj в другой файл)"""
+        if self.__store is not None:
+            self.append_vacancies(hh_vacancies, sj_vacancies)
+            return
 
-        with open(f'hh_{self.__filename}', 'w', encoding='UTF-8') as hh_file, \
-                open(f'sj_{self.__filename}', 'w', encoding='UTF-8') as sj_file:
+        if self.__streaming:
+            self.clear()
+            self.append_vacancies(hh_vacancies, sj_vacancies)
+            return
+
+        with open(self.__hh_path, 'w', encoding='UTF-8') as hh_file, \
+                open(self.__sj_path, 'w', encoding='UTF-8') as sj_file:
             json.dump(hh_vacancies, hh_file, indent=4, ensure_ascii=False)
             json.dump(sj_vacancies, sj_file, indent=4, ensure_ascii=False)
+            Metrics.get_default().inc('json_saver.bytes_written', hh_file.tell() + sj_file.tell())
+
+    def clear(self) -> None:
+        """
+        Очищает файлы с вакансиями (в потоковом режиме перед дозаписью новых страниц).
+        Общее хранилище не очищается: в него вакансии добавляются с обновлением
+        """
+        if self.__store is not None:
+            return
+        for path in (self.__hh_path, self.__sj_path):
+            open(path, 'w', encoding='UTF-8').close()
+
+    @Metrics.timed('json_saver.append_vacancies')
+    def append_vacancies(self, hh_vacancies: list | None = None, sj_vacancies: list | None = None) -> None:
+        """
+        Дописывает страницу вакансий в конец файлов (только в потоковом режиме или при работе с хранилищем)
+        :param hh_vacancies: вакансии с сайта hh
+        :param sj_vacancies: вакансии с сайта sj
+        """
+        if self.__store is not None:
+            self.__store.upsert('hh', hh_vacancies, self.__keyword)
+            self.__store.upsert('sj', sj_vacancies, self.__keyword)
+            return
+
+        if not self.__streaming:
+            raise ValueError('Дозапись вакансий доступна только в потоковом режиме (streaming=True)')
 
-    def select(self) -> list[Vacancy]:
-        """Функция для чтения json файла с вакансиями и создания из него списка с экземплярами класса Vacancy"""
-        with open(f'hh_{self.__filename}', 'r', encoding='UTF-8') as hh_file, \
-                open(f'sj_{self.__filename}', 'r', encoding='UTF-8') as sj_file:
-            hh_data = json.load(hh_file)
-            sj_data = json.load(sj_file)
-
-            vacancies = []
-            if hh_data:
-                for vacancy in hh_data:
-                    salary_min = vacancy['salary']['from'] if vacancy['salary']['from'] else vacancy['salary']['to']
-                    salary_max = vacancy['salary']['to'] if vacancy['salary']['to'] else salary_min
-                    requirement = vacancy['snippet']['requirement'] if vacancy['snippet']['requirement'] \
-                        else 'Нет требований'
-                    responsibility = vacancy['snippet']['responsibility'] if vacancy['snippet']['responsibility'] \
-                        else 'Нет описания'
-
-                    vacancies.append(Vacancy(vacancy['name'],
-                                             salary_min,
-                                             salary_max,
-                                             vacancy['alternate_url'],
-                                             vacancy['salary']['currency'],
-                                             vacancy['area']['name'],
-                                             requirement,
-                                             responsibility,
-                                             vacancy['experience']['name']))
-
-            if sj_data:
-                for vacancy in sj_data:
-                    responsibility = vacancy['work'] if vacancy['work'] else 'Нет описания'
-                    requirement = vacancy['candidat'] if vacancy['candidat'] else 'Нет требований'
-                    vacancies.append(Vacancy(vacancy['profession'],
-                                             vacancy['payment_from'],
-                                             vacancy['payment_to'],
-                                             vacancy['link'],
-                                             vacancy['currency'],
-                                             vacancy['town']['title'],
-                                             requirement,
-                                             responsibility,
-                                             vacancy['experience']['title']))
-
-            return vacancies
+        written = 0
+        for path, vacancies in ((self.__hh_path, hh_vacancies), (self.__sj_path, sj_vacancies)):
+            if vacancies:
+                with open(path, 'a', encoding='UTF-8') as file:
+                    start = file.tell()
+                    file.writelines(f'{json.dumps(vacancy, ensure_ascii=False)}\n' for vacancy in vacancies)
+                    written += file.tell() - start
+        Metrics.get_default().inc('json_saver.bytes_written', written)
+
+    def __read_chunks(self, path: str, chunk_size: int):
+        """
+        Генератор частей исходных вакансий из файла: в потоковом режиме - списки строк json lines
+        (разбираются обработчиком), иначе - списки словарей
+        """
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return
+
+        with file:
+            if self.__streaming:
+                chunk = []
+                for line in file:
+                    chunk.append(line)
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+                if chunk:
+                    yield chunk
+            else:
+                raw = file.read()
+                Metrics.get_default().inc('json_saver.bytes_read', len(raw))
+                data = loads(raw) or []
+                for start in range(0, len(data), chunk_size):
+                    yield data[start:start + chunk_size]
 
     @staticmethod
+    def from_hh(vacancy: dict) -> Vacancy:
+        """Создание экземпляра класса Vacancy из вакансии hh"""
+        return get_normalizer('hh').normalize(vacancy)
+
+    @staticmethod
+    def from_sj(vacancy: dict) -> Vacancy:
+        """Создание экземпляра класса Vacancy из вакансии sj"""
+        return get_normalizer('sj').normalize(vacancy)
+
+    def select(self, workers: int | None = None):
+        """
+        Генератор для чтения json файлов с вакансиями, выдающий экземпляры класса Vacancy по одному
+        (сначала вакансии hh, затем sj)
+        :param workers: количество процессов для разбора и приведения вакансий (по умолчанию - в текущем процессе).
+        Части файлов hh и sj обрабатываются параллельно, порядок вакансий сохраняется
+        """
+        # в замер входит только чтение и разбор вакансий, без их обработки вызывающим кодом
+        return Metrics.get_default().timed_iter(self.__select(workers), 'json_saver.select')
+
+    def __select(self, workers: int | None):
+        if self.__store is not None:
+            for record in self.__store.records(self.__keyword):
+                yield get_normalizer(record['platform']).normalize(record['data'])
+            return
+
+        def tasks():
+            for platform, path in (('hh', self.__hh_path), ('sj', self.__sj_path)):
+                for chunk in self.__read_chunks(path, self.CHUNK_SIZE):
+                    yield platform, self.__streaming, chunk
+
+        yield from normalize_chunks(tasks(), workers)
+
+    def get_snapshot(self) -> str:
+        """
+        Идентификатор текущего состояния сохраненных вакансий (меняется при любой записи в файлы хранилища
+        и при обновлении курсов валют, от которых зависит зарплата в рублях)
+        """
+        paths = [self.__store.path] if self.__store is not None else [self.__hh_path, self.__sj_path]
+        parts = [self.__keyword, str(ExchangeRates.get_default().updated_at)]
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                parts.append(f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}')
+            except FileNotFoundError:
+                parts.append(f'{os.path.abspath(path)}:-')
+        return '|'.join(parts)
+
+    def load_search_index(self) -> SearchIndex:
+        """
+        Загрузка поискового индекса, сохраненного рядом с файлами вакансий. Если вакансии менялись после
+        сохранения индекса, индекс приводится к ним (новые добавляются, измененные обновляются, удаленные удаляются)
+        и сохраняется заново. Заново разбираются только новые и измененные вакансии: для общего хранилища
+        они определяются по хэшам записей без чтения файла, для файлов - по хэшу текста вакансии
+        :return: экземпляр класса SearchIndex
+        """
+        index = SearchIndex.load(self.index_filename)
+        snapshot = self.get_snapshot()
+        if index.snapshot != snapshot:
+            if self.__store is not None:
+                index.sync_digests(self.__store.get_digests(self.__keyword), self.__load_records)
+            else:
+                index.sync(self.select())
+            index.snapshot = snapshot
+            index.save(self.index_filename)
+        return index
+
+    def __load_records(self, keys: list[str]):
+        """Вакансии общего хранилища по ключам"""
+        for record in self.__store.records(self.__keyword, keys):
+            yield get_normalizer(record['platform']).normalize(record['data'])
+
+    @staticmethod
+    def parse_salary(salary: str) -> tuple[int, int | None]:
+        """
+        Разбор фильтра по зарплате
+        :param salary: минимальная з/п-максимальная з/п или одно значение минимальной з/п
+        :return: кортеж (минимальная з/п, максимальная з/п или None)
+        """
+        if '-' in salary:
+            user_min, user_max = salary.split('-')[:2]
+            if not user_min.strip().isdigit() or not user_max.strip().isdigit():
+                raise ValueError('Введите корректный фильтр по зарплате')
+            return int(user_min), int(user_max)
+
+        if not salary.strip().isdigit():
+            raise ValueError('Введите корректный фильтр по зарплате')
+        return int(salary), None
+
+    @staticmethod
+    @Metrics.timed('json_saver.get_vacancies_by_salary')
     def get_vacancies_by_salary(salary: str, vacancies: list[Vacancy]) -> list[Vacancy]:
         """
         Фильтрация вакансий по зарплате
         :param vacancies: список с экземплярами класса Vacancy
-        :param salary: параметры фильтрации в следующем формате: минимальная з/п-максимальная з/п. Можно указать одно
-        значение з/п, оно будет считаться минимальным, в фильтр попадут все вакансии с з/п больше либо равной переданной
+        :param salary: параметры фильтрации (зарплата на руки в рублях) в следующем формате: минимальная
+        з/п-максимальная з/п. Можно указать одно значение з/п, оно будет считаться минимальным, в фильтр попадут
+        все вакансии с з/п больше либо равной переданной
         :return: отфильтрованный список вакансий
         """
-        if '-' in salary:
-            user_filter = salary.split('-')
-            user_min, user_max = user_filter[0], user_filter[1]
-            if not user_min.isdigit() and not user_max.isdigit():
-                raise ValueError('Введите корректный фильтр по зарплате')
-            filtered_vacancies = filter(lambda x: int(user_min) <= x.salary_min <= int(user_max), vacancies)
+        user_min, user_max = JSONSaver.parse_salary(salary)
+        if isinstance(vacancies, VacancyTable):
+            return vacancies.filter_salary(user_min, user_max)
+
+        # сравнивается зарплата на руки в рублях, рассчитанная при создании вакансии
+        if user_max is not None:
+            filtered_vacancies = filter(lambda x: x.salary_min_norm is not None
+                                        and user_min <= x.salary_min_norm <= user_max, vacancies)
 
         else:
-            user_min = salary
-            if not user_min.isdigit():
-                raise ValueError('Введите корректный фильтр по зарплате')
-            filtered_vacancies = filter(lambda x: int(user_min) <= x, vacancies)
+            filtered_vacancies = filter(lambda x: x.salary_min_norm is not None and user_min <= x, vacancies)
 
         return list(filtered_vacancies)
 
     @staticmethod
+    @Metrics.timed('json_saver.get_vacancies_by_region')
     def get_vacancies_by_region(region: str, vacancies: list[Vacancy]) -> list[Vacancy]:
         """
         Фильтрация вакансий по региону
@@ -100,30 +252,42 @@ class JSONSaver:
         :param region: регион
         :return: список с экземплярами класса Vacancy у которых в атрибуте area есть переданный регион
         """
+        if isinstance(vacancies, VacancyTable):
+            return vacancies.filter_region(region)
+
         filtered_vacancies = filter(lambda x: region.lower() in x.area.lower(), vacancies)
 
         return list(filtered_vacancies)
 
-    def save_results_to_json(self, vacancies: list[Vacancy]) -> None:
+    @Metrics.timed('json_saver.save_results_to_json')
+    def save_results_to_json(self, vacancies, fmt: str = 'json', compression: str | None = None) -> str:
         """
-        Запись отфильтрованных и отсортированных результатов в отдельный json файл
-        :param vacancies: Список экземпляров класса Vacansy
-        :return:
+        Потоковая запись отфильтрованных и отсортированных результатов в отдельный файл: вакансии записываются
+        по одной, без промежуточного списка словарей
+        :param vacancies: итерируемый объект с экземплярами класса Vacancy
+        :param fmt: формат файла: json, jsonl, csv или bin (см. VacancyExporter)
+        :param compression: сжатие gzip или zstd
+        :return: имя файла
         """
-        result = [vacancy.__dict__ for vacancy in vacancies]
-        with open(f'result_{self.__filename}', 'w', encoding='UTF-8') as result_file:
-            json.dump(result, result_file, indent=4, ensure_ascii=False)
+        filename = VacancyExporter.get_filename(f'result_{self.__filename}', fmt, compression)
+        with VacancyExporter(filename, fmt, compression) as exporter:
+            exporter.write_many(vacancies)
+        return filename
 
-    @staticmethod
-    def delete_vacancy(vac_id: int, vacancies: list[Vacancy]):
+    def delete_vacancy(self, vac_id: int | str, vacancies: list[Vacancy]):
         """
-        Удаление из списка экземпляра класса Vacancy по его ID
+        Удаление из списка экземпляра класса Vacancy по его ID (и из хранилища, если оно задано)
         :param vac_id: id вакансии
         :param vacancies: список экземпляров класса Vacancy
         :return: None
         """
+        vac_id = str(vac_id).strip()
+        deleted = self.__store is not None and self.__store.delete(vac_id)
+
         for vacancy in vacancies:
-            if vacancy.id == vac_id:
+            if str(vacancy.id) == vac_id:
                 vacancies.remove(vacancy)
                 break
-        print('Не найдено вакансий по переданному id')
+        else:
+            if not deleted:
+                print('Не найдено вакансий по переданному id')
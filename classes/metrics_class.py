@@ -0,0 +1,317 @@
+import bisect
+import cProfile
+import functools
+import json
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from collections import deque
+from threading import Lock, local
+
+
+class NullSpan:
+    """Участок кода, который не замеряется (метрики выключены)"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    """Замеряемый участок кода: длительность записывается в гистограмму <name> при выходе из блока with"""
+
+    __slots__ = ('metrics', 'name', 'labels', 'parent', 'started')
+
+    def __init__(self, metrics: 'Metrics', name: str, labels: dict):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.parent = None
+        self.started = 0.0
+
+    def __enter__(self):
+        stack = self.metrics.get_stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        elapsed = time.perf_counter() - self.started
+        self.metrics.get_stack().pop()
+        self.metrics.finish_span(self, elapsed)
+        return False
+
+
+class Metrics:
+    """
+    Сбор метрик работы программы: участки кода (spans), счетчики и гистограммы, а также профилирование
+    через cProfile и tracemalloc. Пока сбор выключен, методы сразу возвращаются, и замеры почти не влияют
+    на скорость работы. Результаты выгружаются в json или в текстовом формате Prometheus
+    """
+
+    # границы корзин гистограмм длительности (в секундах)
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+    # количество последних участков кода, сохраняемых для выгрузки
+    MAX_SPANS = 10000
+    # префикс имен метрик в формате Prometheus
+    PREFIX = 'vacancies_'
+
+    __default = None
+    __default_lock = Lock()
+
+    def __init__(self, enabled: bool = False):
+        """
+        Инициализатор класса
+        :param enabled: включить сбор метрик
+        """
+        self.enabled = enabled
+        self.__lock = Lock()
+        self.__local = local()
+        self.__counters = {}  # (имя, метки) -> значение
+        self.__histograms = {}  # (имя, метки) -> [количество по корзинам, количество, сумма]
+        self.__spans = deque(maxlen=self.MAX_SPANS)
+        self.__profilers = []  # профилировщики cProfile (первый - потока, включившего профилирование)
+        self.__memory = None
+
+    @classmethod
+    def get_default(cls) -> 'Metrics':
+        """Общий для всей программы сборщик метрик (по умолчанию выключен)"""
+        with Metrics.__default_lock:
+            if Metrics.__default is None:
+                Metrics.__default = cls()
+            return Metrics.__default
+
+    @staticmethod
+    def make_key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted(labels.items()))
+
+    def get_stack(self) -> list:
+        """Стек открытых участков кода текущего потока"""
+        stack = getattr(self.__local, 'stack', None)
+        if stack is None:
+            stack = self.__local.stack = []
+        return stack
+
+    def span(self, name: str, **labels):
+        """
+        Замер участка кода: with metrics.span('engine.get_request', platform='hh'): ...
+        :param name: имя участка
+        :param labels: метки (платформа, хост и т.д.)
+        :return: контекстный менеджер
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, labels)
+
+    def finish_span(self, span: Span, elapsed: float) -> None:
+        self.observe(span.name, elapsed, **span.labels)
+        self.__spans.append({'name': span.name, 'labels': span.labels, 'parent': span.parent,
+                             'start': round(time.time() - elapsed, 6), 'duration': round(elapsed, 6)})
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """
+        Увеличение счетчика
+        :param name: имя счетчика
+        :param value: величина увеличения
+        :param labels: метки
+        """
+        if not self.enabled:
+            return
+        key = self.make_key(name, labels)
+        with self.__lock:
+            self.__counters[key] = self.__counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """
+        Добавление значения в гистограмму
+        :param name: имя гистограммы
+        :param value: значение (для длительностей - в секундах)
+        :param labels: метки
+        """
+        if not self.enabled:
+            return
+        key = self.make_key(name, labels)
+        with self.__lock:
+            histogram = self.__histograms.get(key)
+            if histogram is None:
+                histogram = self.__histograms[key] = [[0] * (len(self.BUCKETS) + 1), 0, 0.0]
+            histogram[0][bisect.bisect_left(self.BUCKETS, value)] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    @staticmethod
+    def timed(name: str):
+        """
+        Декоратор для замера функции общим сборщиком метрик: @Metrics.timed('utils.sort_vacancies').
+        Пока сбор выключен, добавляется только проверка флага
+        :param name: имя участка кода
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                metrics = Metrics.get_default()
+                if not metrics.enabled:
+                    return func(*args, **kwargs)
+                with Span(metrics, name, {}):
+                    return func(*args, **kwargs)
+            return wrapper
+
+        return decorator
+
+    def timed_iter(self, iterable, name: str, **labels):
+        """
+        Замер генератора: в участок кода входит только время получения элементов, без времени их обработки
+        вызывающим кодом. Пока сбор выключен, возвращается исходный объект
+        :param iterable: итерируемый объект
+        :param name: имя участка
+        :param labels: метки
+        :return: итерируемый объект с теми же элементами
+        """
+        if not self.enabled:
+            return iterable
+        return self.__timed_iter(iterable, name, labels)
+
+    def __timed_iter(self, iterable, name: str, labels: dict):
+        iterator = iter(iterable)
+        elapsed, count = 0.0, 0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    elapsed += time.perf_counter() - started
+                    break
+                elapsed += time.perf_counter() - started
+                count += 1
+                yield item
+        finally:
+            self.observe(name, elapsed, **labels)
+            self.inc(f'{name}.items', count, **labels)
+
+    def start_profiling(self, cpu: bool = True, memory: bool = False) -> None:
+        """
+        Включение профилирования
+        :param cpu: профилирование функций через cProfile (текущий поток и потоки, запущенные после включения,
+        например пулы запросов к API)
+        :param memory: отслеживание выделения памяти через tracemalloc
+        """
+        if cpu and not self.__profilers:
+            self.__profilers.append(cProfile.Profile())
+            self.__profilers[0].enable()
+            threading.setprofile(self.__profile_thread)
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__memory = True
+
+    def __profile_thread(self, *args) -> None:
+        """Включение отдельного профилировщика в новом потоке (вызывается при первом событии потока)"""
+        profiler = cProfile.Profile()
+        with self.__lock:
+            self.__profilers.append(profiler)
+        profiler.enable()
+
+    def stop_profiling(self, profile_path: str | None = None, top: int = 20) -> None:
+        """
+        Выключение профилирования
+        :param profile_path: файл для результатов cProfile всех потоков (формат pstats, например для snakeviz)
+        :param top: количество строк кода с наибольшим выделением памяти, сохраняемых в метриках
+        """
+        if self.__profilers:
+            threading.setprofile(None)
+            self.__profilers[0].disable()
+            if profile_path:
+                stats = pstats.Stats(*self.__profilers)
+                stats.dump_stats(profile_path)
+            self.__profilers = []
+        if self.__memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.__memory = {'current_bytes': current, 'peak_bytes': peak,
+                             'top': [{'location': str(statistic.traceback[0]), 'bytes': statistic.size,
+                                      'count': statistic.count}
+                                     for statistic in snapshot.statistics('lineno')[:top]]}
+
+    def reset(self) -> None:
+        """Очистка собранных метрик"""
+        with self.__lock:
+            self.__counters.clear()
+            self.__histograms.clear()
+            self.__spans.clear()
+
+    def to_dict(self) -> dict:
+        """Собранные метрики в виде словаря"""
+        def labelled(name, labels, **values):
+            return {'name': name, 'labels': dict(labels), **values}
+
+        with self.__lock:
+            counters = [labelled(name, labels, value=value) for (name, labels), value in self.__counters.items()]
+            histograms = [labelled(name, labels, count=count, sum=round(total, 6),
+                                   mean=round(total / count, 6) if count else 0,
+                                   buckets={str(bound): value for bound, value in zip(self.BUCKETS + ('+Inf',), buckets)})
+                          for (name, labels), (buckets, count, total) in self.__histograms.items()]
+            spans = list(self.__spans)
+        result = {'counters': counters, 'histograms': histograms, 'spans': spans}
+        if isinstance(self.__memory, dict):
+            result['memory'] = self.__memory
+        return result
+
+    def to_json(self) -> str:
+        """Метрики в формате json"""
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=4)
+
+    @classmethod
+    def get_metric_name(cls, name: str) -> str:
+        """Имя метрики в формате Prometheus: engine.get_request -> vacancies_engine_get_request"""
+        return cls.PREFIX + re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+    @staticmethod
+    def format_labels(labels, **extra) -> str:
+        items = [*labels, *extra.items()]
+        if not items:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in items)
+        return '{' + ','.join(f'{label}="{value}"' for (label, _), value in zip(items, escaped)) + '}'
+
+    def to_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus (счетчики - counter, гистограммы и участки кода - histogram)"""
+        lines = []
+        with self.__lock:
+            counters = sorted(self.__counters.items())
+            histograms = sorted(self.__histograms.items())
+
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f'{self.get_metric_name(name)}_total'
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{self.format_labels(labels)} {value}')
+
+        for (name, labels), (buckets, count, total) in histograms:
+            metric = self.get_metric_name(name)
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f'# TYPE {metric} histogram')
+            cumulative = 0
+            for bound, value in zip(self.BUCKETS + ('+Inf',), buckets):
+                cumulative += value
+                lines.append(f'{metric}_bucket{self.format_labels(labels, le=bound)} {cumulative}')
+            lines.append(f'{metric}_sum{self.format_labels(labels)} {total}')
+            lines.append(f'{metric}_count{self.format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: str) -> None:
+        """Запись метрик в файл: .prom или .txt - формат Prometheus, иначе json"""
+        text = self.to_prometheus() if path.endswith(('.prom', '.txt')) else self.to_json()
+        with open(path, 'w', encoding='UTF-8') as metrics_file:
+            metrics_file.write(text)
@@ -0,0 +1,139 @@
+import json
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from classes.vacansy_class import Vacancy
+
+try:
+    import orjson
+except ImportError:  # orjson не обязателен: без него используется стандартный модуль json
+    orjson = None
+
+
+def loads(data: str | bytes):
+    """Разбор json (через orjson, если он установлен)"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class Normalizer(ABC):
+    """Абстрактный класс для приведения исходной вакансии платформы к экземпляру класса Vacancy"""
+
+    PLATFORM = None
+
+    @abstractmethod
+    def normalize(self, vacancy: dict) -> Vacancy:
+        pass
+
+    def normalize_many(self, vacancies) -> list[Vacancy]:
+        """Приведение списка исходных вакансий"""
+        normalize = self.normalize
+        return [normalize(vacancy) for vacancy in vacancies]
+
+    def normalize_lines(self, lines: list[str | bytes]) -> list[Vacancy]:
+        """Разбор и приведение строк json lines"""
+        normalize = self.normalize
+        return [normalize(loads(line)) for line in lines if line.strip()]
+
+
+class HHNormalizer(Normalizer):
+    """Приведение вакансий headhunter"""
+
+    PLATFORM = 'hh'
+
+    def normalize(self, vacancy: dict) -> Vacancy:
+        salary = vacancy['salary']
+        snippet = vacancy['snippet']
+        salary_from, salary_to = salary['from'], salary['to']
+        salary_min = salary_from or salary_to
+        return Vacancy(vacancy['name'],
+                       salary_min,
+                       salary_to or salary_min,
+                       vacancy['alternate_url'],
+                       salary['currency'],
+                       vacancy['area']['name'],
+                       snippet['requirement'] or 'Нет требований',
+                       snippet['responsibility'] or 'Нет описания',
+                       vacancy['experience']['name'],
+                       vacancy_id=vacancy['id'],
+                       platform='hh',
+                       published_at=vacancy['published_at'],
+                       gross=salary.get('gross'),
+                       employer=(vacancy.get('employer') or {}).get('name'))
+
+
+class SJNormalizer(Normalizer):
+    """Приведение вакансий superjob"""
+
+    PLATFORM = 'sj'
+
+    def normalize(self, vacancy: dict) -> Vacancy:
+        # superjob обозначает отсутствующую границу вилки нулем (payment_to = 0 - "от payment_from"),
+        # границы приводятся к виду hh: без указанной границы берется известная
+        salary_min = vacancy['payment_from'] or vacancy['payment_to'] or None
+        salary_max = vacancy['payment_to'] or salary_min
+        return Vacancy(vacancy['profession'],
+                       salary_min,
+                       salary_max,
+                       vacancy['link'],
+                       vacancy['currency'],
+                       vacancy['town']['title'],
+                       vacancy['candidat'] or 'Нет требований',
+                       vacancy['work'] or 'Нет описания',
+                       vacancy['experience']['title'],
+                       vacancy_id=vacancy['id'],
+                       platform='sj',
+                       published_at=vacancy['date_published'],
+                       employer=vacancy.get('firm_name'))
+
+
+# зарегистрированные обработчики платформ
+NORMALIZERS = {'hh': HHNormalizer(), 'sj': SJNormalizer()}
+
+
+def register_normalizer(normalizer: Normalizer) -> None:
+    """Регистрация обработчика для новой платформы (или замена существующего)"""
+    NORMALIZERS[normalizer.PLATFORM] = normalizer
+
+
+def get_normalizer(platform: str) -> Normalizer:
+    """Обработчик вакансий платформы"""
+    try:
+        return NORMALIZERS[platform]
+    except KeyError:
+        raise ValueError(f'Нет обработчика вакансий для платформы {platform}') from None
+
+
+def _normalize_chunk(task: tuple) -> list[Vacancy]:
+    """Обработка части вакансий: (платформа, признак строк json lines, данные)"""
+    platform, raw_lines, chunk = task
+    normalizer = get_normalizer(platform)
+    return normalizer.normalize_lines(chunk) if raw_lines else normalizer.normalize_many(chunk)
+
+
+def _normalize_chunk_to_tuples(task: tuple) -> list[tuple]:
+    """Обработка части вакансий в отдельном процессе, результат - кортежи (быстрее передаются между процессами)"""
+    return [vacancy.to_tuple() for vacancy in _normalize_chunk(task)]
+
+
+def normalize_chunks(tasks, workers: int | None = None):
+    """
+    Параллельное приведение частей исходных вакансий в пуле процессов с сохранением порядка частей
+    :param tasks: итерируемый объект с кортежами (платформа, признак строк json lines, список вакансий или строк)
+    :param workers: количество процессов (None или 1 - обработка в текущем процессе)
+    :return: генератор экземпляров класса Vacancy
+    """
+    if not workers or workers <= 1:
+        for task in tasks:
+            yield from _normalize_chunk(task)
+        return
+
+    # в обработке одновременно не больше 2 частей на процесс, чтобы не читать весь файл в память заранее
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(_normalize_chunk_to_tuples, task))
+            if len(pending) >= workers * 2:
+                yield from map(Vacancy.from_tuple, pending.popleft().result())
+        while pending:
+            yield from map(Vacancy.from_tuple, pending.popleft().result())
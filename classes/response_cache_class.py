@@ -0,0 +1,197 @@
+import atexit
+import hashlib
+import json
+import os
+import time
+import weakref
+from threading import Lock, get_ident
+
+
+class CacheMissError(LookupError):
+    """Ответа нет в кэше, а запросы к API запрещены (офлайн-режим)"""
+
+
+class ResponseCache:
+    """Класс для хранения ответов API на диске с ограничением по времени жизни и общему размеру"""
+
+    # время жизни ответов по умолчанию (в секундах)
+    DEFAULT_TTL = 60 * 60
+    # максимальный суммарный размер кэша в байтах
+    MAX_BYTES = 200 * 1024 * 1024
+    # количество обращений к кэшу, после которого время последнего обращения сохраняется на диск
+    SAVE_EVERY = 50
+
+    def __init__(self, directory: str = '.cache/http', ttl: dict | None = None, default_ttl: int | None = None,
+                 max_bytes: int | None = None, offline: bool = False):
+        """
+        Инициализатор класса
+        :param directory: папка для хранения ответов
+        :param ttl: время жизни ответов для отдельных адресов API, например {'https://api.hh.ru/areas': 86400}
+        :param default_ttl: время жизни для остальных адресов (по умолчанию DEFAULT_TTL)
+        :param max_bytes: максимальный суммарный размер кэша (по умолчанию MAX_BYTES)
+        :param offline: если True, ответы берутся только из кэша, запросы к API не отправляются
+        """
+        self.directory = directory
+        self.ttl = ttl or {}
+        self.default_ttl = self.DEFAULT_TTL if default_ttl is None else default_ttl
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0  # найденные, но устаревшие ответы
+        self.__lock = Lock()
+        self.__index_path = os.path.join(directory, 'index.json')
+        self.__unsaved = 0  # обращения, время которых еще не сохранено в индекс на диске
+
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self.__index_path, 'r', encoding='UTF-8') as index_file:
+                self.__index = json.load(index_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.__index = {}
+        # время обращений, накопленное после последнего сохранения, записывается при завершении программы
+        # (по слабой ссылке, чтобы регистрация не удерживала кэш в памяти до конца работы программы)
+        atexit.register(self.flush_reference, weakref.ref(self))
+
+    @staticmethod
+    def flush_reference(reference: weakref.ref) -> None:
+        """Сохранение времени обращений для кэша, на который указывает слабая ссылка (если он еще существует)"""
+        cache = reference()
+        if cache is not None:
+            cache.flush()
+
+    @staticmethod
+    def make_key(engine: str, url: str, params: dict | None = None) -> str:
+        """
+        Ключ кэша по платформе, адресу и параметрам запроса
+        :param engine: название платформы (класса API)
+        :param url: адрес запроса
+        :param params: параметры запроса
+        :return: хэш запроса
+        """
+        raw = json.dumps([engine, url, params or {}], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode('UTF-8')).hexdigest()
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.json')
+
+    def __save_index(self) -> None:
+        self.__unsaved = 0
+        tmp_path = f'{self.__index_path}.tmp'
+        with open(tmp_path, 'w', encoding='UTF-8') as index_file:
+            json.dump(self.__index, index_file)
+        os.replace(tmp_path, self.__index_path)
+
+    def get_ttl(self, url: str) -> int:
+        """Время жизни ответа для переданного адреса"""
+        return self.ttl.get(url, self.default_ttl)
+
+    def lookup(self, key: str, url: str):
+        """
+        Поиск ответа в кэше
+        :param key: ключ запроса
+        :param url: адрес запроса (для определения времени жизни)
+        :return: кортеж (данные, свежесть, метаданные) или None, если ответа нет
+        """
+        with self.__lock:
+            meta = self.__index.get(key)
+            if meta is None:
+                self.misses += 1
+                return None
+
+        # чтение и разбор ответа - без блокировки, чтобы потоки не ждали друг друга на диске
+        # (store записывает файл целиком через os.replace, поэтому частично записанный файл не читается)
+        try:
+            with open(self.__path(key), 'r', encoding='UTF-8') as data_file:
+                data = json.load(data_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = None
+
+        with self.__lock:
+            if data is None:
+                if self.__index.get(key) is meta:
+                    del self.__index[key]
+                    self.__unsaved += 1
+                self.misses += 1
+                return None
+
+            meta['last_access'] = time.time()
+            fresh = time.time() - meta['stored_at'] < self.get_ttl(url)
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale += 1
+            # время обращений нужно для вытеснения давно неиспользуемых ответов и после перезапуска,
+            # поэтому индекс сохраняется пакетно, раз в SAVE_EVERY обращений
+            self.__unsaved += 1
+            if self.__unsaved >= self.SAVE_EVERY:
+                self.__save_index()
+            return data, fresh, dict(meta)
+
+    def flush(self) -> None:
+        """Сохранение на диск времени обращений, накопленного после последней записи индекса"""
+        with self.__lock:
+            if self.__unsaved and os.path.isdir(self.directory):
+                self.__save_index()
+
+    def close(self) -> None:
+        """Завершение работы с кэшем: сохранение времени обращений"""
+        self.flush()
+
+    def store(self, key: str, data, etag: str | None = None, last_modified: str | None = None) -> None:
+        """
+        Сохранение ответа в кэш с вытеснением давно неиспользуемых ответов при превышении размера
+        :param key: ключ запроса
+        :param data: данные ответа (json)
+        :param etag: заголовок ETag ответа
+        :param last_modified: заголовок Last-Modified ответа
+        """
+        body = json.dumps(data, ensure_ascii=False).encode('UTF-8')
+        path = self.__path(key)
+        tmp_path = f'{path}.{os.getpid()}.{get_ident()}.tmp'
+        with open(tmp_path, 'wb') as data_file:
+            data_file.write(body)
+        with self.__lock:
+            os.replace(tmp_path, path)
+            now = time.time()
+            self.__index[key] = {'size': len(body), 'stored_at': now, 'last_access': now,
+                                 'etag': etag, 'last_modified': last_modified}
+            self.__evict()
+            self.__save_index()
+
+    def touch(self, key: str) -> None:
+        """Продление времени жизни ответа после успешной проверки актуальности (304 Not Modified)"""
+        with self.__lock:
+            if key in self.__index:
+                self.__index[key]['stored_at'] = self.__index[key]['last_access'] = time.time()
+                self.__save_index()
+
+    def __evict(self) -> None:
+        total = sum(meta['size'] for meta in self.__index.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(self.__index, key=lambda k: self.__index[k]['last_access']):
+            total -= self.__index.pop(key)['size']
+            try:
+                os.remove(self.__path(key))
+            except FileNotFoundError:
+                pass
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        """Удаление всех ответов из кэша"""
+        with self.__lock:
+            for key in self.__index:
+                try:
+                    os.remove(self.__path(key))
+                except FileNotFoundError:
+                    pass
+            self.__index.clear()
+            self.__save_index()
+
+    @property
+    def size(self) -> int:
+        """Суммарный размер ответов в кэше в байтах"""
+        with self.__lock:
+            return sum(meta['size'] for meta in self.__index.values())
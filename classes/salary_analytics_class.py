@@ -0,0 +1,412 @@
+import bisect
+import hashlib
+import json
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from classes.metrics_class import Metrics
+from classes.vacansy_class import Vacancy
+
+try:
+    import numpy as np
+except ImportError:  # numpy не обязателен: без него значения добавляются в скетчи обычными циклами
+    np = None
+
+
+class QuantileSketch:
+    """
+    Приближенный расчет процентилей за один проход с фиксированной памятью (логарифмические корзины, как в DDSketch):
+    значение v попадает в корзину ceil(log(v) / log(gamma)), и любой процентиль вычисляется с относительной
+    погрешностью не больше alpha. Скетчи можно объединять, поэтому части архива обрабатываются независимо
+    """
+
+    # относительная погрешность процентилей
+    ALPHA = 0.01
+
+    __slots__ = ('alpha', 'gamma', 'log_gamma', 'buckets', 'zeros', 'count', 'total', 'min', 'max')
+
+    def __init__(self, alpha: float = ALPHA):
+        """
+        Инициализатор класса
+        :param alpha: относительная погрешность процентилей
+        """
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}  # номер корзины -> количество значений
+        self.zeros = 0  # количество значений <= 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        """Добавление одного значения"""
+        if value > 0:
+            index = math.ceil(math.log(value) / self.log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+        else:
+            self.zeros += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def add_many(self, values) -> None:
+        """Добавление списка значений (с numpy - без цикла по значениям)"""
+        if not len(values):
+            return
+        if np is None:
+            for value in values:
+                self.add(value)
+            return
+
+        values = np.asarray(values, dtype=np.float64)
+        positive = values[values > 0]
+        indexes, counts = np.unique(np.ceil(np.log(positive) / self.log_gamma).astype(np.int64), return_counts=True)
+        buckets = self.buckets
+        for index, count in zip(indexes.tolist(), counts.tolist()):
+            buckets[index] = buckets.get(index, 0) + count
+        self.zeros += len(values) - len(positive)
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """Добавление значений другого скетча с той же погрешностью"""
+        if other.alpha != self.alpha:
+            raise ValueError('Объединять можно только скетчи с одинаковой погрешностью')
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, fraction: float) -> float | None:
+        """
+        Процентиль
+        :param fraction: доля от 0 до 1 (0.5 - медиана)
+        :return: значение или None, если значений нет
+        """
+        if not self.count:
+            return None
+        rank = fraction * (self.count - 1)
+        if rank < self.zeros:
+            return self.min
+        seen = self.zeros
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def to_dict(self) -> dict:
+        """Скетч в виде словаря для сохранения в json"""
+        return {'alpha': self.alpha, 'buckets': [[index, count] for index, count in self.buckets.items()],
+                'zeros': self.zeros, 'count': self.count, 'total': self.total,
+                'min': self.min if self.count else None, 'max': self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'QuantileSketch':
+        """Скетч из словаря, созданного методом to_dict"""
+        sketch = cls(data['alpha'])
+        sketch.buckets = {index: count for index, count in data['buckets']}
+        sketch.zeros, sketch.count, sketch.total = data['zeros'], data['count'], data['total']
+        if sketch.count:
+            sketch.min, sketch.max = data['min'], data['max']
+        return sketch
+
+
+class SalaryAnalytics:
+    """
+    Статистика зарплат по сохраненным вакансиям: процентили, медиана, среднее и гистограмма зарплаты на руки
+    в рублях (середина вилки, см. get_salary) по регионам, опыту, валюте и платформе, а также
+    динамика по дате публикации. Вакансии читаются частями за один проход, группы хранят только скетчи
+    процентилей и счетчики, поэтому объем архива не ограничен памятью. Результат сохраняется на диск
+    для каждого состояния хранилища (см. from_snapshot)
+    """
+
+    DIMENSIONS = ('area', 'experience', 'currency', 'platform')
+    # периоды для динамики по дате публикации (границы периодов - по UTC)
+    PERIODS = ('day', 'week', 'month')
+    PERCENTILES = (10, 25, 50, 75, 90)
+    # левые границы столбцов гистограммы зарплаты (последний столбец - без верхней границы)
+    HISTOGRAM_BINS = (0, 25000, 50000, 75000, 100000, 150000, 200000, 300000, 500000)
+    # количество вакансий, обрабатываемых за один шаг
+    CHUNK_SIZE = 10000
+    CACHE_DIR = '.cache/analytics'
+    # версия формата сохраненных результатов (при изменении расчетов старые результаты не используются)
+    VERSION = 1
+
+    def __init__(self, dimensions=DIMENSIONS, period: str = 'week', alpha: float = QuantileSketch.ALPHA):
+        """
+        Инициализатор класса
+        :param dimensions: признаки для группировки (поля класса Vacancy)
+        :param period: период динамики: day, week или month
+        :param alpha: относительная погрешность процентилей
+        """
+        if period not in self.PERIODS:
+            raise ValueError(f'Период должен быть одним из: {", ".join(self.PERIODS)}')
+        self.dimensions = tuple(dimensions)
+        self.period = period
+        self.alpha = alpha
+        self.__total = self.__new_group()
+        self.__groups = {dimension: {} for dimension in self.dimensions}  # признак -> значение -> группа
+        self.__trend = {}  # начало периода -> группа
+        self.__period_keys = {}  # номер дня -> начало периода
+
+    def __new_group(self) -> dict:
+        return {'vacancies': 0, 'sketch': QuantileSketch(self.alpha), 'histogram': [0] * len(self.HISTOGRAM_BINS)}
+
+    @staticmethod
+    def get_salary(vacancy: Vacancy) -> float | None:
+        """
+        Середина вилки зарплаты на руки в рублях (или известная граница, если вторая не указана).
+        Граница 0 считается не указанной (так superjob обозначает вилку без верхней границы)
+        """
+        low, high = vacancy.salary_min_norm or None, vacancy.salary_max_norm or None
+        if low is None:
+            return high
+        if high is None:
+            return low
+        return (low + high) / 2
+
+    def get_period(self, published_at: int | None) -> str | None:
+        """Начало периода публикации: 2024-05-13 для дня и недели (понедельник), 2024-05 для месяца"""
+        if published_at is None:
+            return None
+        day = published_at // 86400
+        key = self.__period_keys.get(day)
+        if key is None:
+            date = datetime.fromtimestamp(day * 86400, timezone.utc).date()
+            if self.period == 'week':
+                key = (date - timedelta(days=date.weekday())).isoformat()
+            elif self.period == 'month':
+                key = date.isoformat()[:7]
+            else:
+                key = date.isoformat()
+            self.__period_keys[day] = key
+        return key
+
+    def __add_chunk(self, group: dict, count: int, salaries: list) -> None:
+        """Добавление в группу части вакансий: количество и зарплаты (скетч и гистограмма - одной операцией)"""
+        group['vacancies'] += count
+        if not salaries:
+            return
+        group['sketch'].add_many(salaries)
+        histogram = group['histogram']
+        if np is not None:
+            positions = np.searchsorted(self.HISTOGRAM_BINS, salaries, side='right') - 1
+            counts = np.bincount(np.maximum(positions, 0), minlength=len(histogram))
+            for position, value in enumerate(counts.tolist()):
+                histogram[position] += value
+        else:
+            for salary in salaries:
+                histogram[max(bisect.bisect_right(self.HISTOGRAM_BINS, salary) - 1, 0)] += 1
+
+    def update(self, vacancies) -> 'SalaryAnalytics':
+        """
+        Добавление вакансий за один проход
+        :param vacancies: итерируемый объект с экземплярами класса Vacancy (например, генератор select хранилища)
+        :return: текущий экземпляр
+        """
+        iterator = iter(vacancies)
+        get_salary, get_period = self.get_salary, self.get_period
+        with Metrics.get_default().span('analytics.update'):
+            while True:
+                chunk = list(islice(iterator, self.CHUNK_SIZE))
+                if not chunk:
+                    break
+                # в группах части копятся количество вакансий и список зарплат
+                parts = {dimension: {} for dimension in self.dimensions}
+                trend = {}
+                salaries = []
+                for vacancy in chunk:
+                    salary = get_salary(vacancy)
+                    if salary is not None:
+                        salaries.append(salary)
+                    for dimension in self.dimensions:
+                        part = parts[dimension].get(getattr(vacancy, dimension))
+                        if part is None:
+                            part = parts[dimension][getattr(vacancy, dimension)] = [0, []]
+                        part[0] += 1
+                        if salary is not None:
+                            part[1].append(salary)
+                    period = get_period(vacancy.published_at)
+                    part = trend.get(period)
+                    if part is None:
+                        part = trend[period] = [0, []]
+                    part[0] += 1
+                    if salary is not None:
+                        part[1].append(salary)
+
+                self.__add_chunk(self.__total, len(chunk), salaries)
+                for dimension, groups in parts.items():
+                    for value, (count, values) in groups.items():
+                        group = self.__groups[dimension].get(value)
+                        if group is None:
+                            group = self.__groups[dimension][value] = self.__new_group()
+                        self.__add_chunk(group, count, values)
+                for period, (count, values) in trend.items():
+                    group = self.__trend.get(period)
+                    if group is None:
+                        group = self.__trend[period] = self.__new_group()
+                    self.__add_chunk(group, count, values)
+        return self
+
+    def merge(self, other: 'SalaryAnalytics') -> 'SalaryAnalytics':
+        """
+        Добавление статистики другого экземпляра (например, по другой части архива)
+        :return: текущий экземпляр
+        """
+        if other.dimensions != self.dimensions or other.period != self.period:
+            raise ValueError('Объединять можно только статистику с одинаковыми признаками и периодом')
+
+        def merge_group(target: dict, source: dict) -> None:
+            target['vacancies'] += source['vacancies']
+            target['sketch'].merge(source['sketch'])
+            target['histogram'] = [first + second for first, second in zip(target['histogram'], source['histogram'])]
+
+        merge_group(self.__total, other.__total)
+        for dimension, groups in other.__groups.items():
+            for value, group in groups.items():
+                merge_group(self.__groups[dimension].setdefault(value, self.__new_group()), group)
+        for period, group in other.__trend.items():
+            merge_group(self.__trend.setdefault(period, self.__new_group()), group)
+        return self
+
+    def get_stats(self, group: dict) -> dict:
+        """Показатели группы: количество вакансий, среднее, минимум, максимум, процентили и гистограмма"""
+        sketch = group['sketch']
+        stats = {'vacancies': group['vacancies'], 'with_salary': sketch.count,
+                 'mean': None if sketch.mean is None else round(sketch.mean, 2),
+                 'min': sketch.min if sketch.count else None, 'max': sketch.max if sketch.count else None}
+        for percent in self.PERCENTILES:
+            value = sketch.quantile(percent / 100)
+            stats[f'p{percent}'] = None if value is None else round(value, 2)
+        median = sketch.quantile(0.5)
+        stats['median'] = None if median is None else round(median, 2)
+        bounds = [*self.HISTOGRAM_BINS, None]
+        stats['histogram'] = [{'from': low, 'to': high, 'count': count}
+                              for low, high, count in zip(bounds, bounds[1:], group['histogram'])]
+        return stats
+
+    def summary(self, dimension: str | None = None) -> dict | list[dict]:
+        """
+        Показатели всех вакансий или групп по признаку
+        :param dimension: признак группировки (None - все вакансии)
+        :return: словарь показателей или список {'value': значение признака, ...} по убыванию количества вакансий
+        """
+        if dimension is None:
+            return self.get_stats(self.__total)
+        if dimension not in self.__groups:
+            raise ValueError(f'Группировка возможна только по признакам: {", ".join(self.dimensions)}')
+        rows = [{'value': value, **self.get_stats(group)} for value, group in self.__groups[dimension].items()]
+        rows.sort(key=lambda row: row['vacancies'], reverse=True)
+        return rows
+
+    def trend(self) -> list[dict]:
+        """Динамика по периодам публикации: {'period': начало периода, ...} по возрастанию дат"""
+        return [{'period': period, **self.get_stats(self.__trend[period])}
+                for period in sorted(self.__trend, key=lambda period: (period is None, period or ''))]
+
+    def to_report(self) -> dict:
+        """Все показатели в виде словаря (для выгрузки в json)"""
+        return {'total': self.summary(),
+                'groups': {dimension: self.summary(dimension) for dimension in self.dimensions},
+                'trend': {'period': self.period, 'rows': self.trend()}}
+
+    def to_dict(self) -> dict:
+        """Состояние (скетчи и счетчики) для сохранения и последующего объединения"""
+        def dump(group):
+            return {'vacancies': group['vacancies'], 'sketch': group['sketch'].to_dict(),
+                    'histogram': group['histogram']}
+
+        return {'version': self.VERSION, 'dimensions': self.dimensions, 'period': self.period, 'alpha': self.alpha,
+                'total': dump(self.__total),
+                'groups': {dimension: [[value, dump(group)] for value, group in groups.items()]
+                           for dimension, groups in self.__groups.items()},
+                'trend': [[period, dump(group)] for period, group in self.__trend.items()]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SalaryAnalytics':
+        """Экземпляр из словаря, созданного методом to_dict"""
+        if data.get('version') != cls.VERSION:
+            raise ValueError('Сохраненная статистика создана другой версией программы')
+
+        def load(group):
+            return {'vacancies': group['vacancies'], 'sketch': QuantileSketch.from_dict(group['sketch']),
+                    'histogram': group['histogram']}
+
+        analytics = cls(data['dimensions'], data['period'], data['alpha'])
+        analytics.__total = load(data['total'])
+        analytics.__groups = {dimension: {value: load(group) for value, group in groups}
+                              for dimension, groups in data['groups'].items()}
+        analytics.__trend = {period: load(group) for period, group in data['trend']}
+        return analytics
+
+    @classmethod
+    def from_snapshot(cls, snapshot: str, source, cache_dir: str = CACHE_DIR, **options) -> 'SalaryAnalytics':
+        """
+        Статистика для состояния хранилища: если она уже рассчитана для этого состояния, берется с диска
+        без чтения вакансий, иначе рассчитывается и сохраняется
+        :param snapshot: идентификатор состояния хранилища (метод get_snapshot JSONSaver или SQLiteSaver)
+        :param source: функция без параметров, возвращающая вакансии (например, saver.select)
+        :param cache_dir: папка для сохраненных результатов
+        :param options: параметры инициализатора (dimensions, period, alpha)
+        :return: экземпляр класса SalaryAnalytics
+        """
+        metrics = Metrics.get_default()
+        analytics = cls(**options)
+        key = json.dumps([snapshot, analytics.dimensions, analytics.period, analytics.alpha, cls.VERSION],
+                         ensure_ascii=False)
+        path = os.path.join(cache_dir, f'{hashlib.sha1(key.encode("UTF-8")).hexdigest()}.json')
+        try:
+            with open(path, 'r', encoding='UTF-8') as cache_file:
+                cached = cls.from_dict(json.load(cache_file))
+            metrics.inc('analytics.cache_hits')
+            return cached
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, ValueError):
+            metrics.inc('analytics.cache_misses')
+
+        analytics.update(source())
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='UTF-8') as cache_file:
+            json.dump(analytics.to_dict(), cache_file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return analytics
+
+    @staticmethod
+    def format_report(report: dict, top: int = 10) -> str:
+        """
+        Таблицы показателей для вывода в консоль
+        :param report: результат метода to_report
+        :param top: количество групп по каждому признаку (самые многочисленные)
+        """
+        def line(name, stats):
+            values = [stats['vacancies'], stats['with_salary'],
+                      *('-' if stats[field] is None else round(stats[field])
+                        for field in ('p10', 'p25', 'median', 'p75', 'p90', 'mean'))]
+            return f'{str(name)[:30]:<30} ' + ' '.join(f'{value:>9}' for value in values)
+
+        header = f'{"":<30} ' + ' '.join(f'{title:>9}' for title in ('вакансий', 'с з/п', 'p10', 'p25', 'медиана',
+                                                                         'p75', 'p90', 'среднее'))
+        titles = {'area': 'Регион', 'experience': 'Опыт', 'currency': 'Валюта', 'platform': 'Платформа'}
+        lines = [header, line('Все вакансии', report['total'])]
+        for dimension, rows in report['groups'].items():
+            lines.append(f'\n{titles.get(dimension, dimension)}')
+            lines.extend(line(row['value'], row) for row in rows[:top])
+        lines.append(f'\nДинамика по дате публикации ({report["trend"]["period"]})')
+        lines.extend(line(row['period'], row) for row in report['trend']['rows'])
+        return '\n'.join(lines)
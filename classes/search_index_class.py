@@ -0,0 +1,220 @@
+import hashlib
+import json
+import math
+import os
+import re
+
+
+class SearchIndex:
+    """Инвертированный индекс для поиска вакансий по ключевым словам в названии, требованиях и описании"""
+
+    # вес слова в зависимости от поля вакансии
+    FIELD_WEIGHTS = {'title': 3, 'requirement': 1, 'responsibility': 1}
+    # окончания русских слов, отбрасываемые при поиске (от длинных к коротким)
+    ENDINGS = sorted(('иями', 'ями', 'ами', 'иях', 'ией', 'ого', 'его', 'ему', 'ому', 'ыми', 'ими', 'ать', 'ять',
+                      'ить', 'еть', 'ей', 'ий', 'ый', 'ой', 'ая', 'яя', 'ое', 'ее', 'ие', 'ые', 'ах', 'ях', 'ам',
+                      'ям', 'ов', 'ев', 'ом', 'ем', 'ию', 'ью', 'ия', 'ья', 'ую', 'юю', 'а', 'я', 'о', 'е', 'и',
+                      'ы', 'у', 'ю', 'ь', 'й'), key=len, reverse=True)
+    # минимальная длина основы слова после отбрасывания окончания
+    MIN_STEM = 3
+
+    TAG_RE = re.compile(r'<[^>]+>')
+    WORD_RE = re.compile(r'[a-zа-я0-9+#]+')
+    CYRILLIC_RE = re.compile(r'[а-я]')
+
+    def __init__(self):
+        self.__postings = {}  # слово -> {id вакансии: вес}
+        self.__documents = {}  # id вакансии -> список слов (для удаления из индекса)
+        self.__digests = {}  # id вакансии -> хэш проиндексированного текста (для пропуска неизменившихся вакансий)
+        self.snapshot = None  # состояние хранилища вакансий, по которому построен индекс
+
+    def __len__(self) -> int:
+        return len(self.__documents)
+
+    def __contains__(self, vacancy_id) -> bool:
+        return str(vacancy_id) in self.__documents
+
+    @classmethod
+    def stem(cls, word: str) -> str:
+        """Отбрасывание окончания русского слова"""
+        if not cls.CYRILLIC_RE.search(word):
+            return word
+        for ending in cls.ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= cls.MIN_STEM:
+                return word[:-len(ending)]
+        return word
+
+    @classmethod
+    def tokenize(cls, text: str | None) -> list[str]:
+        """
+        Разбиение текста на основы слов: удаляется разметка (<highlighttext> в hh), текст приводится
+        к нижнему регистру, у русских слов отбрасываются окончания
+        :param text: текст
+        :return: список основ слов
+        """
+        if not text:
+            return []
+        text = cls.TAG_RE.sub(' ', text).lower().replace('ё', 'е')
+        return [cls.stem(word) for word in cls.WORD_RE.findall(text)]
+
+    @classmethod
+    def get_digest(cls, vacancy) -> str:
+        """Хэш индексируемых полей вакансии (считается намного быстрее разбиения текста на слова)"""
+        text = '\0'.join(getattr(vacancy, field) or '' for field in cls.FIELD_WEIGHTS)
+        return hashlib.md5(text.encode('UTF-8')).hexdigest()
+
+    def add(self, vacancy, digest: str | None = None) -> bool:
+        """
+        Добавление вакансии в индекс. Если вакансия с таким id уже есть и ее текст изменился,
+        слова прежнего текста заменяются новыми; вакансия с тем же хэшем пропускается без разбора текста
+        :param vacancy: экземпляр класса Vacancy
+        :param digest: хэш содержимого вакансии (по умолчанию get_digest)
+        :return: True, если индекс изменился (False, если вакансия уже есть в индексе с тем же текстом)
+        """
+        vacancy_id = str(vacancy.id)
+        digest = digest or self.get_digest(vacancy)
+        if self.__digests.get(vacancy_id) == digest:
+            return False
+        self.__digests[vacancy_id] = digest
+
+        weights = {}
+        for field, field_weight in self.FIELD_WEIGHTS.items():
+            for term in self.tokenize(getattr(vacancy, field)):
+                weights[term] = weights.get(term, 0) + field_weight
+
+        terms = self.__documents.get(vacancy_id)
+        if terms is not None:
+            if weights == {term: self.__postings[term][vacancy_id] for term in terms}:
+                return False
+            self.remove(vacancy_id)
+
+        for term, weight in weights.items():
+            self.__postings.setdefault(term, {})[vacancy_id] = weight
+        self.__documents[vacancy_id] = list(weights)
+        return True
+
+    def update(self, vacancies) -> int:
+        """
+        Добавление в индекс новых и обновление измененных вакансий
+        :param vacancies: итерируемый объект с экземплярами класса Vacancy
+        :return: количество добавленных и обновленных вакансий
+        """
+        return sum(self.add(vacancy) for vacancy in vacancies)
+
+    def sync(self, vacancies) -> int:
+        """
+        Приведение индекса к переданному набору вакансий: новые добавляются, измененные обновляются,
+        отсутствующие в наборе (удаленные из хранилища) удаляются из индекса
+        :param vacancies: итерируемый объект с экземплярами класса Vacancy
+        :return: количество изменений индекса
+        """
+        present = set()
+        changes = 0
+        for vacancy in vacancies:
+            present.add(str(vacancy.id))
+            changes += self.add(vacancy)
+        for vacancy_id in [vacancy_id for vacancy_id in self.__documents if vacancy_id not in present]:
+            changes += self.remove(vacancy_id)
+        return changes
+
+    def remove(self, vacancy_id) -> bool:
+        """
+        Удаление вакансии из индекса
+        :param vacancy_id: id вакансии
+        :return: True, если вакансия была в индексе
+        """
+        self.__digests.pop(str(vacancy_id), None)
+        terms = self.__documents.pop(str(vacancy_id), None)
+        if terms is None:
+            return False
+        for term in terms:
+            postings = self.__postings[term]
+            del postings[str(vacancy_id)]
+            if not postings:
+                del self.__postings[term]
+        return True
+
+    def sync_digests(self, digests: dict[str, str], load) -> int:
+        """
+        Приведение индекса к набору вакансий по их хэшам, без чтения неизменившихся вакансий: отсутствующие
+        в наборе удаляются, а новые и измененные загружаются функцией load и добавляются
+        :param digests: словарь {id вакансии: хэш содержимого} (например, VacancyStore.get_digests)
+        :param load: функция, принимающая список id и возвращающая итерируемый объект с экземплярами Vacancy
+        :return: количество изменений индекса
+        """
+        changes = 0
+        for vacancy_id in [vacancy_id for vacancy_id in self.__documents if vacancy_id not in digests]:
+            changes += self.remove(vacancy_id)
+        changed = [vacancy_id for vacancy_id, digest in digests.items() if self.__digests.get(vacancy_id) != digest]
+        if changed:
+            for vacancy in load(changed):
+                changes += self.add(vacancy, digests[str(vacancy.id)])
+        return changes
+
+    @classmethod
+    def parse_query(cls, query: str) -> list[list[str]]:
+        """
+        Разбор запроса: группы, разделенные 'или'/'or'/'|', объединяются по ИЛИ,
+        слова внутри группы (через пробел, 'и'/'and'/'&') - по И
+        :param query: строка запроса
+        :return: список групп основ слов
+        """
+        groups = re.split(r'\s*\|\s*|\s+(?:или|or)\s+', query.lower())
+        result = []
+        for group in groups:
+            terms = cls.tokenize(re.sub(r'\s+(?:и|and)\s+|&', ' ', f' {group} '))
+            if terms:
+                result.append(terms)
+        return result
+
+    def search(self, query: str) -> list[tuple[str, float]]:
+        """
+        Поиск вакансий по запросу с ранжированием по сумме весов слов (tf-idf)
+        :param query: строка запроса, например 'django или flask', 'python sql'
+        :return: список кортежей (id вакансии, релевантность) по убыванию релевантности
+        """
+        total = len(self.__documents)
+        scores = {}
+        for terms in self.parse_query(query):
+            postings = [self.__postings.get(term, {}) for term in terms]
+            if not all(postings):
+                continue
+            postings.sort(key=len)
+            matched = set(postings[0]).intersection(*postings[1:])
+            for vacancy_id in matched:
+                score = sum(posting[vacancy_id] * math.log(1 + total / len(posting)) for posting in postings)
+                scores[vacancy_id] = max(scores.get(vacancy_id, 0), score)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def save(self, path: str) -> None:
+        """Сохранение индекса в json файл"""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='UTF-8') as index_file:
+            # json.dumps быстрее json.dump: строка собирается ускоренным кодировщиком, а не по частям
+            index_file.write(json.dumps({'snapshot': self.snapshot, 'digests': self.__digests,
+                                         'postings': self.__postings}, ensure_ascii=False))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'SearchIndex':
+        """
+        Загрузка индекса из json файла
+        :param path: путь к файлу индекса
+        :return: экземпляр класса SearchIndex (пустой, если файла нет)
+        """
+        index = cls()
+        try:
+            with open(path, 'r', encoding='UTF-8') as index_file:
+                data = json.load(index_file)
+            postings = data['postings']
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return index
+
+        index.snapshot = data.get('snapshot')
+        index.__digests = data.get('digests') or {}
+        index.__postings = postings
+        for term, posting in postings.items():
+            for vacancy_id in posting:
+                index.__documents.setdefault(vacancy_id, []).append(term)
+        return index
@@ -0,0 +1,325 @@
+import os
+import sqlite3
+from threading import Lock
+
+from classes.exchange_rates_class import ExchangeRates
+from classes.json_saver_class import JSONSaver
+from classes.vacancy_exporter_class import VacancyExporter
+from classes.vacansy_class import Vacancy
+
+
+class SQLiteSaver:
+    """
+    Класс для хранения вакансий в базе SQLite с тем же интерфейсом, что и JSONSaver.
+    Фильтрация, сортировка и отбор топ N выполняются запросами к базе с использованием индексов
+    """
+
+    # поля вакансии в порядке аргументов Vacancy
+    FIELDS = ('title', 'salary_min', 'salary_max', 'link', 'currency', 'area',
+              'requirement', 'responsibility', 'experience')
+    # поля, добавленные после первой версии схемы (с типами колонок): зарплата на руки в рублях,
+    # рассчитанная при записи (см. Vacancy.salary_min_norm), и работодатель
+    EXTRA_FIELDS = {'gross': 'INTEGER', 'salary_min_norm': 'REAL', 'salary_max_norm': 'REAL', 'employer': 'TEXT'}
+    # поля, по которым разрешена сортировка -> колонки базы (зарплаты сравниваются в рублях)
+    ORDER_FIELDS = {'salary_min': 'salary_min_norm', 'salary_max': 'salary_max_norm', 'published_at': 'published_at'}
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS vacancies (
+            key TEXT PRIMARY KEY,
+            vacancy_id TEXT NOT NULL,
+            platform TEXT NOT NULL,
+            published_at INTEGER,
+            title TEXT,
+            salary_min INTEGER,
+            salary_max INTEGER,
+            link TEXT,
+            currency TEXT,
+            area TEXT,
+            area_lower TEXT,
+            requirement TEXT,
+            responsibility TEXT,
+            experience TEXT,
+            gross INTEGER,
+            salary_min_norm REAL,
+            salary_max_norm REAL,
+            employer TEXT
+        );
+        CREATE TABLE IF NOT EXISTS vacancy_keywords (
+            keyword TEXT NOT NULL,
+            key TEXT NOT NULL REFERENCES vacancies (key) ON DELETE CASCADE,
+            PRIMARY KEY (keyword, key)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS settings (
+            name TEXT PRIMARY KEY,
+            value
+        );
+        CREATE INDEX IF NOT EXISTS idx_vacancies_area ON vacancies (area_lower);
+        CREATE INDEX IF NOT EXISTS idx_vacancies_experience ON vacancies (experience);
+        CREATE INDEX IF NOT EXISTS idx_vacancies_currency ON vacancies (currency);
+        CREATE INDEX IF NOT EXISTS idx_vacancies_published_at ON vacancies (published_at);
+        CREATE INDEX IF NOT EXISTS idx_vacancy_keywords_key ON vacancy_keywords (key);
+    '''
+    # индексы по колонкам, которые могут отсутствовать в базе, созданной предыдущей версией
+    NORM_INDEXES = '''
+        CREATE INDEX IF NOT EXISTS idx_vacancies_salary_min_norm ON vacancies (salary_min_norm);
+        CREATE INDEX IF NOT EXISTS idx_vacancies_salary_max_norm ON vacancies (salary_max_norm);
+    '''
+
+    def __init__(self, keyword: str, path: str = 'vacancies.db'):
+        """
+        инициализатор класса
+        :param keyword: ключевое слово, по которому вакансии связываются с запросом (и имя файла результатов)
+        :param path: файл базы данных (общий для всех ключевых слов)
+        """
+        self.__keyword = keyword.title()
+        self.__filename = f'{keyword.title()}.json'  # имя файла для результатов
+        self.__path = path
+        self.__lock = Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__connection.execute('PRAGMA journal_mode = WAL')
+        self.__connection.execute('PRAGMA foreign_keys = ON')
+        self.__connection.executescript(self.SCHEMA)
+        self.__migrate()
+        self.__connection.executescript(self.NORM_INDEXES)
+        row = self.__connection.execute("SELECT value FROM settings WHERE name = 'rates_updated_at'").fetchone()
+        self.__rates_updated_at = row[0] if row else -1  # время обновления курсов, по которым рассчитаны зарплаты
+        self.__renormalize()
+
+    def __migrate(self) -> None:
+        """
+        Добавление новых колонок в базу предыдущей версии (зарплата в рублях для сохраненных вакансий
+        рассчитывается в __renormalize, так как у такой базы нет отметки о курсах)
+        """
+        columns = {row[1] for row in self.__connection.execute('PRAGMA table_info(vacancies)')}
+        missing = [field for field in self.EXTRA_FIELDS if field not in columns]
+        if not missing:
+            return
+
+        with self.__connection:
+            for field in missing:
+                self.__connection.execute(f'ALTER TABLE vacancies ADD COLUMN {field} {self.EXTRA_FIELDS[field]}')
+
+    def __renormalize(self) -> None:
+        """
+        Пересчет сохраненной зарплаты в рублях, если курсы валют обновились после последнего расчета.
+        Фильтрация и сортировка в базе выполняются по сохраненной зарплате, поэтому она должна соответствовать
+        текущим курсам, как у вакансий, созданных заново. Вызывается под блокировкой или при инициализации
+        """
+        rates = ExchangeRates.get_default()
+        if self.__rates_updated_at == rates.updated_at:
+            return
+
+        with self.__connection:
+            rows = self.__connection.execute(
+                'SELECT key, salary_min, salary_max, currency, gross FROM vacancies').fetchall()
+            self.__connection.executemany(
+                'UPDATE vacancies SET salary_min_norm = ?, salary_max_norm = ? WHERE key = ?',
+                [(rates.normalize(salary_min, currency, None if gross is None else bool(gross)),
+                  rates.normalize(salary_max, currency, None if gross is None else bool(gross)), key)
+                 for key, salary_min, salary_max, currency, gross in rows])
+            self.__connection.execute("INSERT OR REPLACE INTO settings (name, value) VALUES ('rates_updated_at', ?)",
+                                      (rates.updated_at,))
+            self.__bump_version()
+        self.__rates_updated_at = rates.updated_at
+
+    def __bump_version(self) -> None:
+        """
+        Увеличение номера версии базы (вызывается внутри транзакции, изменяющей вакансии). Обновление
+        сохраненной вакансии не меняет количество строк и rowid, поэтому состояние базы определяется по версии
+        """
+        self.__connection.execute("INSERT INTO settings (name, value) VALUES ('version', 1) "
+                                  "ON CONFLICT (name) DO UPDATE SET value = value + 1")
+
+    @property
+    def filename(self):
+        return self.__filename
+
+    def close(self) -> None:
+        """Закрытие соединения с базой"""
+        self.__connection.close()
+
+    def add_vacancies(self, hh_vacancies: list | None = None, sj_vacancies: list | None = None) -> None:
+        """Добавляет вакансии hh и sj в базу (с обновлением уже сохраненных по id вакансии)"""
+        self.append_vacancies(hh_vacancies, sj_vacancies)
+
+    def clear(self) -> None:
+        """Удаляет связь ключевого слова с сохраненными вакансиями (сами вакансии остаются в архиве)"""
+        with self.__lock, self.__connection:
+            self.__connection.execute('DELETE FROM vacancy_keywords WHERE keyword = ?', (self.__keyword,))
+            self.__bump_version()
+
+    def append_vacancies(self, hh_vacancies: list | None = None, sj_vacancies: list | None = None) -> None:
+        """
+        Пакетная запись страницы вакансий в базу. Более новая версия вакансии заменяет сохраненную
+        :param hh_vacancies: вакансии с сайта hh
+        :param sj_vacancies: вакансии с сайта sj
+        """
+        vacancies = [JSONSaver.from_hh(vacancy) for vacancy in hh_vacancies or []] + \
+                    [JSONSaver.from_sj(vacancy) for vacancy in sj_vacancies or []]
+        if not vacancies:
+            return
+
+        rows = [(vacancy.id, vacancy.id.split('_', 1)[1], vacancy.platform, vacancy.published_at,
+                 *(getattr(vacancy, field) for field in self.FIELDS), vacancy.area.lower(),
+                 *(getattr(vacancy, field) for field in self.EXTRA_FIELDS))
+                for vacancy in vacancies]
+        columns = ('key', 'vacancy_id', 'platform', 'published_at', *self.FIELDS, 'area_lower', *self.EXTRA_FIELDS)
+        updates = ', '.join(f'{column} = excluded.{column}' for column in columns[1:])
+
+        with self.__lock, self.__connection:
+            self.__renormalize()
+            self.__connection.executemany(
+                f'INSERT INTO vacancies ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))}) '
+                f'ON CONFLICT (key) DO UPDATE SET {updates} '
+                f'WHERE excluded.published_at >= vacancies.published_at', rows)
+            self.__connection.executemany('INSERT OR IGNORE INTO vacancy_keywords (keyword, key) VALUES (?, ?)',
+                                          [(self.__keyword, row[0]) for row in rows])
+            self.__bump_version()
+
+    def query(self, salary: str | None = None, region: str | None = None, area: str | None = None,
+              without_experience: bool = False, currency: str | None = None, order_by: str | None = None,
+              descending: bool = False, limit: int | None = None, all_keywords: bool = False):
+        """
+        Выборка вакансий с фильтрацией, сортировкой и ограничением количества на стороне базы
+        :param salary: фильтр по зарплате на руки в рублях в формате JSONSaver.get_vacancies_by_salary
+        :param region: часть названия региона (как в JSONSaver.get_vacancies_by_region)
+        :param area: точное название региона (поиск по индексу)
+        :param without_experience: только вакансии без опыта или с опытом от 1 года
+        :param currency: валюта
+        :param order_by: поле сортировки (salary_min, salary_max, published_at)
+        :param descending: сортировка по убыванию
+        :param limit: максимальное количество вакансий (топ N)
+        :param all_keywords: искать по всему архиву, а не только по вакансиям текущего ключевого слова
+        :return: генератор экземпляров класса Vacancy
+        """
+        conditions, params = [], []
+        if not all_keywords:
+            conditions.append('key IN (SELECT key FROM vacancy_keywords WHERE keyword = ?)')
+            params.append(self.__keyword)
+        if salary:
+            user_min, user_max = JSONSaver.parse_salary(salary)
+            if user_max is not None:
+                conditions.append('salary_min_norm BETWEEN ? AND ?')
+                params.extend((user_min, user_max))
+            else:
+                conditions.append('salary_min_norm >= ?')
+                params.append(user_min)
+        if region:
+            conditions.append('instr(area_lower, ?) > 0')
+            params.append(region.lower())
+        if area:
+            conditions.append('area_lower = ?')
+            params.append(area.lower())
+        if without_experience:
+            # то же условие, что Vacancy.is_without_experience
+            conditions.append(f'(experience IN ({", ".join("?" * len(Vacancy.NO_EXPERIENCE))}) '
+                              f'OR instr(experience, ?) > 0)')
+            params.extend((*Vacancy.NO_EXPERIENCE, Vacancy.MIN_EXPERIENCE))
+        if currency:
+            conditions.append('currency = ?')
+            params.append(currency)
+
+        # зарплата в рублях берется из базы (та же, по которой выполнены фильтрация и сортировка), а не
+        # рассчитывается заново при создании вакансий
+        columns = ('id', 'platform', 'published_at', *self.FIELDS, *self.EXTRA_FIELDS)
+        sql = f'SELECT key, {", ".join(columns[1:])} FROM vacancies'
+        if conditions:
+            sql += f' WHERE {" AND ".join(conditions)}'
+        if order_by:
+            if order_by not in self.ORDER_FIELDS:
+                raise ValueError(f'Сортировка возможна только по полям {", ".join(self.ORDER_FIELDS)}')
+            column = self.ORDER_FIELDS[order_by]
+            sql += f' ORDER BY {column} IS NULL, {column} {"DESC" if descending else "ASC"}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        with self.__lock:
+            self.__renormalize()
+            rows = self.__connection.execute(sql, params).fetchall()
+
+        for row in rows:
+            data = dict(zip(columns, row))
+            if data['gross'] is not None:
+                data['gross'] = bool(data['gross'])
+            yield Vacancy.from_dict(data)
+
+    def select(self):
+        """Генератор экземпляров класса Vacancy, сохраненных по текущему ключевому слову"""
+        return self.query()
+
+    def get_snapshot(self) -> str:
+        """
+        Идентификатор текущего состояния базы: версия (меняется при любой записи, в том числе при пересчете
+        зарплат по новым курсам) и время обновления курсов валют, по которым рассчитаны зарплаты в рублях
+        """
+        with self.__lock:
+            self.__renormalize()
+            row = self.__connection.execute("SELECT value FROM settings WHERE name = 'version'").fetchone()
+        parts = (os.path.abspath(self.__path), self.__keyword, row[0] if row else 0, self.__rates_updated_at)
+        return '|'.join(map(str, parts))
+
+    def get_vacancies_by_salary(self, salary: str, vacancies: list[Vacancy] | None = None) -> list[Vacancy]:
+        """
+        Фильтрация вакансий по зарплате. Если список не передан, фильтрация выполняется в базе
+        :param salary: параметры фильтрации в формате JSONSaver.get_vacancies_by_salary
+        :param vacancies: список с экземплярами класса Vacancy
+        :return: отфильтрованный список вакансий
+        """
+        if vacancies is not None:
+            return JSONSaver.get_vacancies_by_salary(salary, vacancies)
+        return list(self.query(salary=salary))
+
+    def get_vacancies_by_region(self, region: str, vacancies: list[Vacancy] | None = None) -> list[Vacancy]:
+        """
+        Фильтрация вакансий по региону. Если список не передан, фильтрация выполняется в базе
+        :param region: регион
+        :param vacancies: список с экземплярами класса Vacancy
+        :return: список с экземплярами класса Vacancy у которых в атрибуте area есть переданный регион
+        """
+        if vacancies is not None:
+            return JSONSaver.get_vacancies_by_region(region, vacancies)
+        return list(self.query(region=region))
+
+    def get_top_vacancies(self, top_n: int, order_by: str = 'salary_min') -> list[Vacancy]:
+        """
+        Топ N вакансий с самой большой зарплатой по текущему ключевому слову
+        :param top_n: количество вакансий
+        :param order_by: поле зарплаты для сортировки
+        :return: список вакансий, отсортированный по убыванию зарплаты
+        """
+        return list(self.query(order_by=order_by, descending=True, limit=top_n))
+
+    def save_results_to_json(self, vacancies, fmt: str = 'json', compression: str | None = None) -> str:
+        """
+        Потоковая запись отфильтрованных и отсортированных результатов в отдельный файл: вакансии записываются
+        по одной, без промежуточного списка словарей
+        :param vacancies: итерируемый объект с экземплярами класса Vacancy
+        :param fmt: формат файла: json, jsonl, csv или bin (см. VacancyExporter)
+        :param compression: сжатие gzip или zstd
+        :return: имя файла
+        """
+        filename = VacancyExporter.get_filename(f'result_{self.__filename}', fmt, compression)
+        with VacancyExporter(filename, fmt, compression) as exporter:
+            exporter.write_many(vacancies)
+        return filename
+
+    def delete_vacancy(self, vac_id: int | str, vacancies: list[Vacancy]):
+        """
+        Удаление вакансии по ее ID из базы и из переданного списка
+        :param vac_id: id вакансии
+        :param vacancies: список экземпляров класса Vacancy
+        """
+        vac_id = str(vac_id).strip()
+        with self.__lock, self.__connection:
+            deleted = self.__connection.execute('DELETE FROM vacancies WHERE key = ?', (vac_id,)).rowcount
+            if deleted:
+                self.__bump_version()
+
+        for vacancy in vacancies:
+            if str(vacancy.id) == vac_id:
+                vacancies.remove(vacancy)
+                break
+        else:
+            if not deleted:
+                print('Не найдено вакансий по переданному id')
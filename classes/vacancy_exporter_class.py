@@ -0,0 +1,244 @@
+import csv
+import gzip
+import io
+import json
+import struct
+import sys
+
+from classes.vacansy_class import Vacancy
+
+try:
+    import zstandard
+except ImportError:  # zstandard не обязателен: без него доступно только сжатие gzip
+    zstandard = None
+
+
+class VacancyExporter:
+    """
+    Потоковая выгрузка вакансий в файл или в консоль: каждая вакансия записывается сразу после получения,
+    без сборки списка отформатированных копий. Форматы: json (массив), jsonl (json lines), csv и bin
+    (компактный двоичный формат, читается методом read_binary), с необязательным сжатием gzip или zstd
+    """
+
+    FORMATS = ('json', 'jsonl', 'csv', 'bin')
+    COMPRESSIONS = ('gzip', 'zstd')
+    EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+    # выгружаемые поля вакансии
+    FIELDS = Vacancy.__slots__
+    # после скольких вакансий данные сбрасываются из буфера (первая вакансия сбрасывается сразу)
+    FLUSH_EVERY = 500
+
+    # двоичный формат: сигнатура, затем json-заголовок с полями и записи из значений с байтом типа
+    MAGIC = b'VAC1'
+    NONE, INT, FLOAT, STR, FALSE, TRUE, JSON = range(7)
+    INT_STRUCT = struct.Struct('<q')
+    FLOAT_STRUCT = struct.Struct('<d')
+    LENGTH_STRUCT = struct.Struct('<I')
+
+    def __init__(self, path: str = '-', fmt: str | None = None, compression: str | None = None,
+                 extra_fields: tuple = ()):
+        """
+        Инициализатор класса
+        :param path: путь к файлу или '-' для вывода в консоль
+        :param fmt: формат (по умолчанию определяется по расширению файла, для консоли - jsonl)
+        :param compression: gzip или zstd (по умолчанию определяется по расширению .gz/.zst)
+        :param extra_fields: дополнительные поля перед полями вакансии (например, ключевое слово запроса),
+        значения передаются в write
+        """
+        name = path.lower()
+        if compression is None:
+            compression = next((method for method, extension in self.EXTENSIONS.items()
+                                if name.endswith(extension)), None)
+            if compression:
+                name = name[:-len(self.EXTENSIONS[compression])]
+        if fmt is None:
+            fmt = next((extension for extension in self.FORMATS if name.endswith(f'.{extension}')), 'jsonl')
+        if fmt not in self.FORMATS:
+            raise ValueError(f'Формат выгрузки должен быть одним из: {", ".join(self.FORMATS)}')
+        if compression is not None and compression not in self.COMPRESSIONS:
+            raise ValueError(f'Сжатие должно быть одним из: {", ".join(self.COMPRESSIONS)}')
+        if compression == 'zstd' and zstandard is None:
+            raise ValueError('Для сжатия zstd установите пакет zstandard')
+
+        self.path = path
+        self.format = fmt
+        self.compression = compression
+        self.fields = (*extra_fields, *self.FIELDS)
+        self.extra_fields = tuple(extra_fields)
+        self.count = 0
+        self.__raw = None
+        self.__stream = None
+        self.__text = None
+        self.__csv = None
+
+    @classmethod
+    def get_filename(cls, name: str, fmt: str, compression: str | None = None) -> str:
+        """Имя файла выгрузки: result_Python.json -> result_Python.csv.gz"""
+        base = name.rsplit('.', 1)[0] if name.endswith('.json') else name
+        return f'{base}.{fmt}{cls.EXTENSIONS.get(compression, "")}'
+
+    def open(self) -> 'VacancyExporter':
+        """Открытие файла и запись заголовка формата"""
+        if self.path == '-':
+            sys.stdout.flush()
+            self.__raw = sys.stdout.buffer
+        else:
+            self.__raw = open(self.path, 'wb')
+
+        if self.compression == 'gzip':
+            self.__stream = gzip.GzipFile(fileobj=self.__raw, mode='wb')
+        elif self.compression == 'zstd':
+            self.__stream = zstandard.ZstdCompressor().stream_writer(self.__raw, closefd=False)
+        else:
+            self.__stream = self.__raw
+
+        if self.format != 'bin':
+            self.__text = io.TextIOWrapper(self.__stream, encoding='UTF-8', newline='', write_through=True)
+        if self.format == 'csv':
+            self.__csv = csv.writer(self.__text)
+            self.__csv.writerow(self.fields)
+        elif self.format == 'json':
+            self.__text.write('[')
+        elif self.format == 'bin':
+            header = json.dumps({'fields': self.fields}).encode('UTF-8')
+            self.__stream.write(self.MAGIC + self.LENGTH_STRUCT.pack(len(header)) + header)
+        return self
+
+    def write(self, vacancy: Vacancy, *extra) -> None:
+        """
+        Запись одной вакансии
+        :param vacancy: экземпляр класса Vacancy
+        :param extra: значения дополнительных полей (extra_fields)
+        """
+        if self.format in ('jsonl', 'json'):
+            record = vacancy.to_dict()
+            if extra:
+                record = {**dict(zip(self.extra_fields, extra)), **record}
+            data = json.dumps(record, ensure_ascii=False)
+            if self.format == 'jsonl':
+                self.__text.write(f'{data}\n')
+            else:
+                self.__text.write((',\n' if self.count else '\n') + data)
+        elif self.format == 'csv':
+            self.__csv.writerow([*extra, *(self.format_csv(getattr(vacancy, field)) for field in self.FIELDS)])
+        else:
+            self.__stream.write(self.encode((*extra, *vacancy.to_tuple())))
+
+        self.count += 1
+        if self.count == 1 or self.count % self.FLUSH_EVERY == 0:
+            self.flush()
+
+    def write_many(self, vacancies, *extra) -> int:
+        """
+        Запись вакансий по одной
+        :param vacancies: итерируемый объект с экземплярами класса Vacancy (в том числе генератор)
+        :param extra: значения дополнительных полей, общие для всех вакансий
+        :return: общее количество записанных вакансий
+        """
+        write = self.write
+        for vacancy in vacancies:
+            write(vacancy, *extra)
+        return self.count
+
+    def flush(self) -> None:
+        """Сброс буферов (для gzip и zstd - с завершением текущего блока сжатия)"""
+        if self.__text is not None:
+            self.__text.flush()
+        if self.compression == 'gzip':
+            self.__stream.flush()
+        elif self.compression == 'zstd':
+            self.__stream.flush(zstandard.FLUSH_BLOCK)
+        self.__raw.flush()
+
+    def close(self) -> None:
+        """Запись окончания формата и закрытие файла (консоль не закрывается)"""
+        if self.__stream is None:
+            return
+        if self.format == 'json':
+            self.__text.write('\n]\n' if self.count else ']\n')
+        if self.__text is not None:
+            self.__text.flush()
+            self.__text.detach()
+        if self.__stream is not self.__raw:
+            self.__stream.close()
+        if self.__raw is sys.stdout.buffer:
+            self.__raw.flush()
+        else:
+            self.__raw.close()
+        self.__stream = self.__text = self.__csv = None
+
+    def __enter__(self) -> 'VacancyExporter':
+        return self.open()
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @staticmethod
+    def format_csv(value):
+        """Значение для ячейки csv: списки (ссылки на дубликаты) - в виде json"""
+        if isinstance(value, (list, dict)):
+            return json.dumps(value, ensure_ascii=False)
+        return '' if value is None else value
+
+    @classmethod
+    def encode(cls, values: tuple) -> bytes:
+        """Запись двоичного формата: для каждого значения байт типа и данные"""
+        parts = []
+        for value in values:
+            if value is None:
+                parts.append(bytes((cls.NONE,)))
+            elif value is True or value is False:
+                parts.append(bytes((cls.TRUE if value else cls.FALSE,)))
+            elif isinstance(value, int) and -2 ** 63 <= value < 2 ** 63:
+                parts.append(bytes((cls.INT,)) + cls.INT_STRUCT.pack(value))
+            elif isinstance(value, float):
+                parts.append(bytes((cls.FLOAT,)) + cls.FLOAT_STRUCT.pack(value))
+            else:
+                kind = cls.STR if isinstance(value, str) else cls.JSON
+                data = (value if kind == cls.STR else json.dumps(value, ensure_ascii=False)).encode('UTF-8')
+                parts.append(bytes((kind,)) + cls.LENGTH_STRUCT.pack(len(data)) + data)
+        return b''.join(parts)
+
+    @classmethod
+    def read_binary(cls, path: str):
+        """
+        Чтение вакансий из двоичного файла (с учетом сжатия по расширению .gz/.zst)
+        :param path: путь к файлу
+        :return: генератор экземпляров класса Vacancy
+        """
+        raw = open(path, 'rb')
+        if path.endswith('.gz'):
+            file = gzip.GzipFile(fileobj=raw, mode='rb')
+        elif path.endswith('.zst'):
+            if zstandard is None:
+                raise ValueError('Для чтения файлов zstd установите пакет zstandard')
+            file = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw))
+        else:
+            file = raw
+
+        with raw, file:
+            if file.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f'{path} не является файлом вакансий в двоичном формате')
+            fields = json.loads(file.read(cls.LENGTH_STRUCT.unpack(file.read(cls.LENGTH_STRUCT.size))[0]))['fields']
+            while True:
+                record = {}
+                for field in fields:
+                    kind = file.read(1)
+                    if not kind:
+                        if record:
+                            raise ValueError(f'{path}: неполная запись в конце файла')
+                        return
+                    kind = kind[0]
+                    if kind == cls.NONE:
+                        value = None
+                    elif kind in (cls.TRUE, cls.FALSE):
+                        value = kind == cls.TRUE
+                    elif kind == cls.INT:
+                        value = cls.INT_STRUCT.unpack(file.read(cls.INT_STRUCT.size))[0]
+                    elif kind == cls.FLOAT:
+                        value = cls.FLOAT_STRUCT.unpack(file.read(cls.FLOAT_STRUCT.size))[0]
+                    else:
+                        data = file.read(cls.LENGTH_STRUCT.unpack(file.read(cls.LENGTH_STRUCT.size))[0])
+                        value = data.decode('UTF-8') if kind == cls.STR else json.loads(data)
+                    record[field] = value
+                yield Vacancy.from_dict(record)
@@ -0,0 +1,153 @@
+from classes.json_saver_class import JSONSaver
+from classes.search_index_class import SearchIndex
+from classes.sqlite_saver_class import SQLiteSaver
+from classes.vacancy_table_class import VacancyTable
+from classes.vacansy_class import Vacancy
+
+
+class VacancyQuery:
+    """
+    Составной фильтр вакансий. Условия добавляются цепочкой, подготавливаются один раз при добавлении
+    и проверяются за один проход по вакансиям; первыми проверяются условия, отсеивающие больше вакансий
+    """
+
+    # через сколько вакансий пересчитывается порядок проверки условий
+    REORDER_EVERY = 256
+
+    def __init__(self):
+        # условия: [название, функция проверки, доля прошедших вакансий (оценка), параметры для базы/таблицы]
+        self.__predicates = []
+
+    def __len__(self) -> int:
+        return len(self.__predicates)
+
+    def __add(self, name: str, predicate, selectivity: float, pushdown: tuple | None = None) -> 'VacancyQuery':
+        self.__predicates.append([name, predicate, selectivity, pushdown])
+        return self
+
+    def where(self, predicate, name: str = 'custom', selectivity: float = 0.5) -> 'VacancyQuery':
+        """
+        Произвольное условие
+        :param predicate: функция, принимающая экземпляр Vacancy и возвращающая True/False
+        :param name: название условия
+        :param selectivity: ожидаемая доля вакансий, удовлетворяющих условию
+        """
+        return self.__add(name, predicate, selectivity)
+
+    def salary(self, salary: str) -> 'VacancyQuery':
+        """Фильтр по зарплате в формате JSONSaver.get_vacancies_by_salary (50000-70000 или 80000)"""
+        return self.salary_between(*JSONSaver.parse_salary(salary))
+
+    def salary_between(self, user_min: int, user_max: int | None = None) -> 'VacancyQuery':
+        """Фильтр по минимальной зарплате на руки в рублях: от user_min до user_max (или без верхней границы)"""
+        if user_max is None:
+            predicate = lambda vacancy: vacancy.salary_min_norm is not None and vacancy.salary_min_norm >= user_min
+        else:
+            predicate = lambda vacancy: vacancy.salary_min_norm is not None \
+                and user_min <= vacancy.salary_min_norm <= user_max
+        return self.__add('salary', predicate, 0.3, ('salary', (user_min, user_max)))
+
+    def region(self, region: str) -> 'VacancyQuery':
+        """Фильтр по вхождению названия региона"""
+        region_lower = region.lower()
+        return self.__add('region', lambda vacancy: region_lower in vacancy.area.lower(), 0.3, ('region', region))
+
+    def without_experience(self) -> 'VacancyQuery':
+        """Вакансии без опыта работы или с опытом от 1 года"""
+        is_without_experience = Vacancy.is_without_experience
+        return self.__add('experience', lambda vacancy: is_without_experience(vacancy.experience), 0.5,
+                          ('experience', None))
+
+    def currency(self, currency: str) -> 'VacancyQuery':
+        """Фильтр по валюте"""
+        return self.__add('currency', lambda vacancy: vacancy.currency == currency, 0.8, ('currency', currency))
+
+    def keyword(self, filter_word: str, index: SearchIndex | None = None) -> 'VacancyQuery':
+        """
+        Фильтр по ключевому слову в требованиях или описании (или по запросу к поисковому индексу, если он передан)
+        """
+        if index is not None:
+            matched = {vacancy_id for vacancy_id, _ in index.search(filter_word)}
+            return self.__add('keyword', lambda vacancy: str(vacancy.id) in matched, 0.1)
+
+        word = filter_word.lower()
+        return self.__add('keyword', lambda vacancy: word in vacancy.requirement.lower()
+                          or word in vacancy.responsibility.lower(), 0.1)
+
+    def matches(self, vacancy) -> bool:
+        """Проверка одной вакансии по всем условиям"""
+        return all(predicate(vacancy) for _, predicate, _, _ in self.__predicates)
+
+    def apply(self, vacancies, predicates: list | None = None):
+        """
+        Ленивая фильтрация за один проход. Порядок проверки условий периодически пересчитывается
+        по фактической доле прошедших вакансий
+        :param vacancies: итерируемый объект с экземплярами класса Vacancy (в том числе генератор)
+        :param predicates: условия для проверки (по умолчанию все условия запроса)
+        :return: генератор вакансий, удовлетворяющих всем условиям
+        """
+        entries = [list(entry) for entry in (self.__predicates if predicates is None else predicates)]
+        if not entries:
+            yield from vacancies
+            return
+
+        # счетчики [проверено, прошло] с начальной оценкой по ожидаемой доле
+        stats = [[10, 10 * entry[2]] for entry in entries]
+        order = sorted(range(len(entries)), key=lambda i: entries[i][2])
+        checks = [entries[i][1] for i in order]
+        seen = 0
+        for vacancy in vacancies:
+            seen += 1
+            for position, check in enumerate(checks):
+                counters = stats[order[position]]
+                counters[0] += 1
+                if not check(vacancy):
+                    break
+                counters[1] += 1
+            else:
+                yield vacancy
+
+            if seen % self.REORDER_EVERY == 0:
+                order.sort(key=lambda i: stats[i][1] / stats[i][0])
+                checks = [entries[i][1] for i in order]
+
+    def run(self, source):
+        """
+        Выполнение запроса над источником вакансий. Для SQLiteSaver условия по зарплате, региону, опыту и валюте
+        передаются в базу, для VacancyTable выполняются по колонкам, остальные условия проверяются за один проход
+        :param source: итерируемый объект с вакансиями, VacancyTable или SQLiteSaver
+        :return: VacancyTable для таблицы, иначе генератор вакансий
+        """
+        if isinstance(source, SQLiteSaver):
+            params = {}
+            rest = []
+            for entry in self.__predicates:
+                kind, value = entry[3] or (None, None)
+                if kind == 'salary' and 'salary' not in params:
+                    user_min, user_max = value
+                    params['salary'] = str(user_min) if user_max is None else f'{user_min}-{user_max}'
+                elif kind == 'region' and 'region' not in params:
+                    params['region'] = value
+                elif kind == 'experience':
+                    params['without_experience'] = True
+                elif kind == 'currency' and 'currency' not in params:
+                    params['currency'] = value
+                else:
+                    rest.append(entry)
+            return self.apply(source.query(**params), rest)
+
+        if isinstance(source, VacancyTable):
+            rest = []
+            for entry in self.__predicates:
+                kind, value = entry[3] or (None, None)
+                if kind == 'salary':
+                    source = source.filter_salary(*value)
+                elif kind == 'region':
+                    source = source.filter_region(value)
+                elif kind == 'experience':
+                    source = source.filter_experience(Vacancy.is_without_experience)
+                else:
+                    rest.append(entry)
+            return VacancyTable(self.apply(source, rest)) if rest else source
+
+        return self.apply(source)
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import re
+from threading import Lock
+
+from classes.vacansy_class import Vacancy
+
+
+class VacancyStore:
+    """
+    Постоянное хранилище исходных вакансий hh и sj без дублей, с ключом по id вакансии на платформе.
+    Записи дописываются в конец файла json lines, в памяти хранится только индекс: ключ -> смещение в файле
+    """
+
+    # поле с датой публикации для каждой платформы
+    PUBLISHED_FIELDS = {'hh': 'published_at', 'sj': 'date_published'}
+    # доля устаревших строк в файле, после которой файл перезаписывается
+    COMPACT_RATIO = 0.5
+    # поля исходной вакансии, изменение которых считается изменением вакансии (для каждой платформы)
+    DIGEST_FIELDS = {'hh': ('name', 'salary', 'alternate_url', 'area', 'snippet', 'experience', 'employer',
+                            'published_at'),
+                     'sj': ('profession', 'payment_from', 'payment_to', 'link', 'currency', 'town', 'candidat',
+                            'work', 'experience', 'firm_name', 'date_published')}
+    # подсветка слов поискового запроса в описании вакансии hh (зависит от ключевого слова, а не от вакансии)
+    HIGHLIGHT = re.compile(r'</?highlighttext>')
+
+    def __init__(self, path: str = 'vacancies_store.jsonl'):
+        """
+        Инициализатор класса
+        :param path: файл хранилища
+        """
+        self.path = path
+        self.__lock = Lock()
+        self.__index = {}  # ключ -> (смещение, дата публикации, хэш записи, ключевые слова)
+        self.__lines = 0  # количество строк в файле, включая устаревшие
+        self.__load()
+
+    @staticmethod
+    def make_key(platform: str, vacancy_id) -> str:
+        """Ключ вакансии, совпадающий с Vacancy.id, например hh_80123456"""
+        return f'{platform}_{vacancy_id}'
+
+    @classmethod
+    def get_digest(cls, platform: str, vacancy: dict) -> str:
+        """
+        Хэш содержимого вакансии для определения изменений: считается по полям DIGEST_FIELDS без подсветки
+        слов запроса, поэтому та же вакансия, найденная по другому ключевому слову, не считается измененной
+        :param platform: платформа (hh или sj)
+        :param vacancy: исходная вакансия с API
+        """
+        fields = cls.DIGEST_FIELDS.get(platform)
+        content = vacancy if fields is None else {field: vacancy.get(field) for field in fields}
+        raw = cls.HIGHLIGHT.sub('', json.dumps(content, sort_keys=True, ensure_ascii=False))
+        return hashlib.md5(raw.encode('UTF-8')).hexdigest()
+
+    def __load(self) -> None:
+        try:
+            file = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+
+        with file:
+            offset = 0
+            for line in file:
+                if line.strip():
+                    record = json.loads(line)
+                    if record.get('deleted'):
+                        self.__index.pop(record['key'], None)
+                    else:
+                        self.__index[record['key']] = (offset, record['published_at'], record['digest'],
+                                                       tuple(record['keywords']))
+                    self.__lines += 1
+                offset += len(line)
+
+    def __len__(self) -> int:
+        return len(self.__index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__index
+
+    def __append(self, file, record: dict) -> int:
+        offset = file.tell()
+        file.write(f'{json.dumps(record, ensure_ascii=False)}\n'.encode('UTF-8'))
+        self.__lines += 1
+        return offset
+
+    def upsert(self, platform: str, vacancies: list | None, keyword: str | None = None) -> int:
+        """
+        Добавление или обновление вакансий. Вакансия записывается, только если она новая, изменилась
+        или у нее появилось новое ключевое слово; более старые версии (по дате публикации) пропускаются
+        :param platform: платформа (hh или sj)
+        :param vacancies: исходные вакансии с API
+        :param keyword: ключевое слово, по которому найдены вакансии
+        :return: количество записанных вакансий
+        """
+        written = 0
+        with self.__lock, open(self.path, 'ab') as file:
+            for vacancy in vacancies or []:
+                key = self.make_key(platform, vacancy['id'])
+                published_at = Vacancy.parse_published_at(vacancy[self.PUBLISHED_FIELDS[platform]])
+                digest = self.get_digest(platform, vacancy)
+                keywords = ()
+                if key in self.__index:
+                    _, stored_published_at, stored_digest, keywords = self.__index[key]
+                    if published_at < stored_published_at:
+                        continue
+                    if digest == stored_digest and (keyword is None or keyword in keywords):
+                        continue
+                if keyword is not None and keyword not in keywords:
+                    keywords += (keyword,)
+
+                record = {'key': key, 'platform': platform, 'published_at': published_at, 'digest': digest,
+                          'keywords': list(keywords), 'data': vacancy}
+                self.__index[key] = (self.__append(file, record), published_at, digest, keywords)
+                written += 1
+
+        self.__compact_if_needed()
+        return written
+
+    def __read(self, file, offset: int) -> dict:
+        file.seek(offset)
+        return json.loads(file.readline())
+
+    def get(self, key: str) -> dict | None:
+        """
+        Получение записи по ключу
+        :param key: ключ вакансии (Vacancy.id)
+        :return: запись {'key', 'platform', 'published_at', 'keywords', 'data'} или None
+        """
+        entry = self.__index.get(key)
+        if entry is None:
+            return None
+        with open(self.path, 'rb') as file:
+            return self.__read(file, entry[0])
+
+    def delete(self, key: str) -> bool:
+        """
+        Удаление вакансии по ключу
+        :param key: ключ вакансии (Vacancy.id)
+        :return: True, если вакансия была в хранилище
+        """
+        with self.__lock:
+            if self.__index.pop(key, None) is None:
+                return False
+            with open(self.path, 'ab') as file:
+                self.__append(file, {'key': key, 'deleted': True})
+        self.__compact_if_needed()
+        return True
+
+    def get_digests(self, keyword: str | None = None) -> dict[str, str]:
+        """
+        Хэши содержимого вакансий без чтения файла (из индекса в памяти)
+        :param keyword: если задано, только вакансии, найденные по этому ключевому слову
+        :return: словарь {ключ вакансии: хэш}
+        """
+        with self.__lock:
+            return {key: entry[2] for key, entry in self.__index.items() if keyword is None or keyword in entry[3]}
+
+    def records(self, keyword: str | None = None, keys=None):
+        """
+        Генератор записей хранилища в порядке их записи
+        :param keyword: если задано, выдаются только вакансии, найденные по этому ключевому слову
+        :param keys: если задано, выдаются только вакансии с этими ключами
+        """
+        # индекс меняется при одновременной записи из других потоков, поэтому записи отбираются под блокировкой;
+        # файл открывается там же, чтобы смещения соответствовали ему и после перезаписи файла в compact
+        with self.__lock:
+            if keys is None:
+                entries = [entry for entry in self.__index.values() if keyword is None or keyword in entry[3]]
+            else:
+                entries = [self.__index[key] for key in keys if key in self.__index]
+                entries = [entry for entry in entries if keyword is None or keyword in entry[3]]
+            file = open(self.path, 'rb') if entries else None
+        if file is None:
+            return
+        entries.sort()
+        with file:
+            for entry in entries:
+                yield self.__read(file, entry[0])
+
+    def __compact_if_needed(self) -> None:
+        if self.__lines > 100 and len(self.__index) < self.__lines * (1 - self.COMPACT_RATIO):
+            self.compact()
+
+    def compact(self) -> None:
+        """Перезапись файла хранилища без устаревших версий и удаленных вакансий"""
+        with self.__lock:
+            tmp_path = f'{self.path}.tmp'
+            index = {}
+            with open(self.path, 'rb') as source, open(tmp_path, 'wb') as target:
+                for key, (offset, published_at, digest, keywords) in sorted(self.__index.items(),
+                                                                            key=lambda item: item[1][0]):
+                    source.seek(offset)
+                    index[key] = (target.tell(), published_at, digest, keywords)
+                    target.write(source.readline())
+            os.replace(tmp_path, self.path)
+            self.__index = index
+            self.__lines = len(index)
@@ -0,0 +1,224 @@
+import heapq
+import math
+import sys
+from array import array
+
+from classes.vacansy_class import Vacancy
+
+try:
+    import numpy as np
+except ImportError:  # numpy не обязателен: без него используются массивы array и обычные циклы
+    np = None
+
+
+class VacancyTable:
+    """
+    Компактное колоночное хранилище вакансий: зарплаты и даты в массивах чисел, регион, валюта, опыт и платформа
+    как коды повторяющихся строк. Экземпляры Vacancy создаются только при обращении к строке таблицы
+    """
+
+    # числовые колонки (отсутствующее значение хранится как NaN)
+    NUMBER_COLUMNS = ('salary_min', 'salary_max', 'published_at', 'salary_min_norm', 'salary_max_norm')
+    # колонки с зарплатой на руки в рублях, по которым фильтруются и сортируются зарплаты
+    SALARY_COLUMNS = {'salary_min': 'salary_min_norm', 'salary_max': 'salary_max_norm'}
+    # вычисляемые колонки для сортировки
+    COMPUTED_COLUMNS = ('midpoint',)
+    # колонки с небольшим набором повторяющихся значений
+    CATEGORY_COLUMNS = ('currency', 'area', 'experience', 'platform', 'gross', 'employer')
+    # текстовые колонки (и ссылки на дубликаты вакансии на других платформах)
+    TEXT_COLUMNS = ('title', 'link', 'requirement', 'responsibility', 'duplicates')
+
+    def __init__(self, vacancies=None):
+        """
+        Инициализатор класса
+        :param vacancies: итерируемый объект с экземплярами класса Vacancy
+        """
+        self.__numbers = {column: array('d') for column in self.NUMBER_COLUMNS}
+        self.__codes = {column: array('I') for column in self.CATEGORY_COLUMNS}
+        self.__categories = {column: [] for column in self.CATEGORY_COLUMNS}  # код -> значение
+        self.__category_codes = {column: {} for column in self.CATEGORY_COLUMNS}  # значение -> код
+        self.__texts = {column: [] for column in self.TEXT_COLUMNS}
+        self.__ids = []
+        for vacancy in vacancies or []:
+            self.append(vacancy)
+
+    @classmethod
+    def from_vacancies(cls, vacancies) -> 'VacancyTable':
+        """Создание таблицы из итерируемого объекта с экземплярами класса Vacancy"""
+        return cls(vacancies)
+
+    def __encode(self, column: str, value) -> int:
+        codes = self.__category_codes[column]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.__categories[column])
+            self.__categories[column].append(sys.intern(value) if isinstance(value, str) else value)
+        return code
+
+    def append(self, vacancy: Vacancy) -> None:
+        """Добавление вакансии в конец таблицы"""
+        for column in self.NUMBER_COLUMNS:
+            value = getattr(vacancy, column)
+            self.__numbers[column].append(math.nan if value is None else value)
+        for column in self.CATEGORY_COLUMNS:
+            self.__codes[column].append(self.__encode(column, getattr(vacancy, column)))
+        for column in self.TEXT_COLUMNS:
+            self.__texts[column].append(getattr(vacancy, column))
+        self.__ids.append(vacancy.id)
+
+    def __len__(self) -> int:
+        return len(self.__ids)
+
+    def __bool__(self) -> bool:
+        return bool(self.__ids)
+
+    def row(self, position: int) -> Vacancy:
+        """
+        Создание экземпляра класса Vacancy для строки таблицы
+        :param position: номер строки
+        :return: экземпляр класса Vacancy
+        """
+        data = {'id': self.__ids[position]}
+        for column in self.NUMBER_COLUMNS:
+            value = self.__numbers[column][position]
+            if math.isnan(value):
+                data[column] = None
+            else:
+                data[column] = value if column in self.SALARY_COLUMNS.values() else int(value)
+        for column in self.CATEGORY_COLUMNS:
+            data[column] = self.__categories[column][self.__codes[column][position]]
+        for column in self.TEXT_COLUMNS:
+            data[column] = self.__texts[column][position]
+        return Vacancy.from_dict(data)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self.take(range(len(self))[item])
+        return self.row(item)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self.row(position)
+
+    def column(self, name: str):
+        """
+        Значения колонки
+        :param name: название колонки
+        :return: массив чисел для числовых колонок (numpy.ndarray, если numpy установлен), иначе список значений
+        """
+        if name in self.__numbers:
+            return np.array(self.__numbers[name], dtype=np.float64) if np is not None else list(self.__numbers[name])
+        if name in self.__codes:
+            categories = self.__categories[name]
+            return [categories[code] for code in self.__codes[name]]
+        if name == 'id':
+            return list(self.__ids)
+        return list(self.__texts[name])
+
+    def __values(self, column: str):
+        """
+        Числовая колонка для вычислений внутри методов: numpy.ndarray без копирования (если numpy установлен)
+        или array. Вместо salary_min и salary_max берутся зарплаты на руки в рублях, колонка midpoint - середина
+        вилки (или известная граница, если вторая не указана)
+        """
+        column = self.SALARY_COLUMNS.get(column, column)
+        if column == 'midpoint':
+            if np is not None:
+                low, high = self.__values('salary_min'), self.__values('salary_max')
+                return np.where(np.isnan(low), high, np.where(np.isnan(high), low, (low + high) / 2))
+            return array('d', (high if math.isnan(low) else low if math.isnan(high) else (low + high) / 2
+                               for low, high in zip(self.__numbers['salary_min_norm'],
+                                                    self.__numbers['salary_max_norm'])))
+        if np is not None:
+            return np.frombuffer(self.__numbers[column], dtype=np.float64)
+        return self.__numbers[column]
+
+    def take(self, positions) -> 'VacancyTable':
+        """
+        Новая таблица из переданных строк (в переданном порядке)
+        :param positions: номера строк
+        :return: экземпляр класса VacancyTable
+        """
+        table = VacancyTable()
+        positions = [int(position) for position in positions]
+        for column in self.NUMBER_COLUMNS:
+            source = self.__numbers[column]
+            table.__numbers[column] = array('d', (source[position] for position in positions))
+        for column in self.CATEGORY_COLUMNS:
+            source = self.__codes[column]
+            table.__codes[column] = array('I', (source[position] for position in positions))
+            table.__categories[column] = self.__categories[column]
+            table.__category_codes[column] = self.__category_codes[column]
+        for column in self.TEXT_COLUMNS:
+            source = self.__texts[column]
+            table.__texts[column] = [source[position] for position in positions]
+        table.__ids = [self.__ids[position] for position in positions]
+        return table
+
+    def __category_mask(self, column: str, predicate) -> list[int]:
+        """Номера строк, у которых значение категории удовлетворяет условию (условие проверяется один раз на значение)"""
+        matched = [predicate(value) for value in self.__categories[column]]
+        return [position for position, code in enumerate(self.__codes[column]) if matched[code]]
+
+    def filter_salary(self, user_min: int, user_max: int | None = None, column: str = 'salary_min') -> 'VacancyTable':
+        """
+        Фильтрация по зарплате на руки в рублях
+        :param user_min: минимальное значение
+        :param user_max: максимальное значение (None - без ограничения)
+        :param column: колонка зарплаты
+        :return: отфильтрованная таблица
+        """
+        upper = math.inf if user_max is None else user_max
+        values = self.__values(column)
+        if np is not None:
+            return self.take(np.flatnonzero((values >= user_min) & (values <= upper)))
+        return self.take(position for position, value in enumerate(values) if user_min <= value <= upper)
+
+    def filter_region(self, region: str) -> 'VacancyTable':
+        """Фильтрация по вхождению названия региона"""
+        region = region.lower()
+        return self.take(self.__category_mask('area', lambda area: region in area.lower()))
+
+    def filter_experience(self, predicate) -> 'VacancyTable':
+        """Фильтрация по требованиям к опыту работы"""
+        return self.take(self.__category_mask('experience', predicate))
+
+    def argsort(self, column: str = 'salary_min', descending: bool = False) -> list[int]:
+        """
+        Номера строк в порядке сортировки по числовой колонке (строки без значения - в конце)
+        :param column: колонка для сортировки (salary_min, salary_max, published_at, midpoint)
+        :param descending: сортировка по убыванию
+        :return: список номеров строк
+        """
+        values = self.__values(column)
+        if np is not None:
+            return np.argsort(-values if descending else values, kind='stable').tolist()
+        present = [position for position, value in enumerate(values) if not math.isnan(value)]
+        missing = [position for position, value in enumerate(values) if math.isnan(value)]
+        present.sort(key=values.__getitem__, reverse=descending)
+        return present + missing
+
+    def sort(self, column: str = 'salary_min', descending: bool = False) -> 'VacancyTable':
+        """Новая таблица, отсортированная по числовой колонке"""
+        return self.take(self.argsort(column, descending))
+
+    def top(self, top_n: int, column: str = 'salary_min') -> 'VacancyTable':
+        """
+        Новая таблица из top_n строк с наибольшим значением колонки (по убыванию, строки без значения - в конце).
+        Отбор выполняется без полной сортировки таблицы
+        """
+        values = self.__values(column)
+        top_n = max(0, min(top_n, len(self)))
+        if np is not None:
+            ranked = np.where(np.isnan(values), -np.inf, values)
+            if top_n < len(self):
+                candidates = np.argpartition(-ranked, top_n - 1)[:top_n] if top_n else np.array([], dtype=int)
+            else:
+                candidates = np.arange(len(self))
+            return self.take(candidates[np.argsort(-ranked[candidates], kind='stable')])
+
+        present = (position for position, value in enumerate(values) if not math.isnan(value))
+        positions = heapq.nlargest(top_n, present, key=values.__getitem__)
+        if len(positions) < top_n:
+            positions += [position for position, value in enumerate(values) if math.isnan(value)][:top_n - len(positions)]
+        return self.take(positions)
@@ -1,9 +1,24 @@
+from datetime import datetime
+
+from classes.exchange_rates_class import ExchangeRates
+
+
 class Vacancy:
     """Класс для определения вакансии"""
     __vacancy_id = 0  # счетчик id вакансий
 
+    # атрибуты хранятся в слотах, без словаря __dict__ у каждого экземпляра
+    __slots__ = ('title', 'salary_min', 'salary_max', 'link', 'currency', 'area', 'requirement',
+                 'responsibility', 'experience', 'platform', 'published_at', 'id',
+                 'gross', 'salary_min_norm', 'salary_max_norm', 'employer', 'duplicates')
+
+    # фильтр "без опыта или с опытом от 1 года": значения опыта работы без опыта и признак опыта от 1 года
+    NO_EXPERIENCE = ('Нет опыта', 'без опыта')
+    MIN_EXPERIENCE = '1'
+
     def __init__(self, title, salary_min, salary_max, link, currency, area,
-                 requirement, responsibility, experience):
+                 requirement, responsibility, experience, vacancy_id=None, platform=None, published_at=None,
+                 gross=None, employer=None, rates: ExchangeRates | None = None):
         self.title = title  # vacancy['name']  Название вакансии
         self.salary_min = salary_min  # vacancy['salary']['from']  минимальная планка вакансии
         self.salary_max = salary_max  # vacancy['salary']['to']  максимальная планка вакансии
@@ -13,42 +28,126 @@ class Vacancy:
         self.requirement = requirement  # vacancy['snippet']['requirement']
         self.responsibility = responsibility  # vacancy['snippet']['responsibility']  описание
         self.experience = experience  # vacancy['experience']['name']  # требования к опыту работы
-        Vacancy.__vacancy_id += 1  # увеличение счетчика экземпляров класса на 1
-        self.id = Vacancy.__vacancy_id  # id вакансии
+        self.platform = platform  # платформа (hh или sj)
+        self.published_at = self.parse_published_at(published_at)  # дата публикации (unixtime)
+        self.gross = gross  # vacancy['salary']['gross']  зарплата указана до вычета налогов
+        self.employer = employer  # vacancy['employer']['name']  работодатель
+        self.duplicates = None  # [{'id', 'platform', 'link'}] - та же вакансия на других платформах (Deduplicator)
+
+        # зарплата на руки в базовой валюте (рублях) рассчитывается один раз при создании вакансии,
+        # по ней выполняются фильтрация, сортировка и сравнение вакансий
+        rates = rates or ExchangeRates.get_default()
+        self.salary_min_norm = rates.normalize(salary_min, currency, gross)
+        self.salary_max_norm = rates.normalize(salary_max, currency, gross)
+
+        if vacancy_id is not None:
+            self.id = f'{platform}_{vacancy_id}'  # id вакансии на платформе, например hh_80123456
+        else:
+            Vacancy.__vacancy_id += 1  # увеличение счетчика экземпляров класса на 1
+            self.id = Vacancy.__vacancy_id  # id вакансии
+
+    @classmethod
+    def is_without_experience(cls, experience: str) -> bool:
+        """Проверка, что вакансия без опыта работы или с опытом от 1 года"""
+        return experience in cls.NO_EXPERIENCE or cls.MIN_EXPERIENCE in experience
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Vacancy':
+        """
+        Восстановление вакансии из словаря (to_dict) без изменения ее id
+        :param data: словарь с атрибутами вакансии
+        :return: экземпляр класса Vacancy
+        """
+        vacancy = cls.__new__(cls)
+        for attribute in cls.__slots__:
+            setattr(vacancy, attribute, data.get(attribute))
+        if 'salary_min_norm' not in data:  # словарь, сохраненный до появления зарплаты в рублях
+            rates = ExchangeRates.get_default()
+            vacancy.salary_min_norm = rates.normalize(vacancy.salary_min, vacancy.currency, vacancy.gross)
+            vacancy.salary_max_norm = rates.normalize(vacancy.salary_max, vacancy.currency, vacancy.gross)
+        return vacancy
+
+    @classmethod
+    def from_tuple(cls, values: tuple) -> 'Vacancy':
+        """Восстановление вакансии из кортежа (to_tuple), например после передачи между процессами"""
+        vacancy = cls.__new__(cls)
+        for attribute, value in zip(cls.__slots__, values):
+            setattr(vacancy, attribute, value)
+        return vacancy
+
+    def to_tuple(self) -> tuple:
+        """Кортеж значений атрибутов в порядке __slots__ (компактнее словаря при передаче между процессами)"""
+        return tuple(getattr(self, attribute) for attribute in self.__slots__)
+
+    def to_dict(self) -> dict:
+        """Словарь с атрибутами вакансии (для записи в json)"""
+        return {attribute: getattr(self, attribute) for attribute in self.__slots__}
+
+    @staticmethod
+    def parse_published_at(value) -> int | None:
+        """
+        Приведение даты публикации к unixtime
+        :param value: unixtime (sj, vacancy['date_published']) или строка ISO 8601 (hh, vacancy['published_at'])
+        :return: unixtime или None
+        """
+        if value is None or isinstance(value, int):
+            return value
+        if isinstance(value, float):
+            return int(value)
+        # hh отдает смещение без двоеточия (+0300), которое fromisoformat понимает только с Python 3.11
+        if value[-5] in '+-' and value[-3] != ':':
+            value = f'{value[:-2]}:{value[-2:]}'
+        return int(datetime.fromisoformat(value).timestamp())
 
     def __str__(self) -> str:
         """Строковое представление вакансии"""
         return f'Вакансия в регионе {self.area}: {self.title}\n' \
-               f'Зарплата от {self.salary_min} до {self.salary_max} {self.currency}\n' \
+               f'Зарплата от {self.salary_min} до {self.salary_max} {self.currency}' \
+               f'{self.__format_norm()}\n' \
                f'Требования к кандидату: {self.requirement}\n' \
                f'Описание вакансии: {self.responsibility}\n' \
                f'Требования к опыту: {self.experience}\n' \
                f'Ссылка на вакансию: {self.link}\n' \
+               f'{self.__format_duplicates()}' \
                f'Id вакансии: {self.id}'
 
+    def __format_duplicates(self) -> str:
+        """Ссылки на эту же вакансию на других платформах"""
+        if not self.duplicates:
+            return ''
+        return f'Также опубликована: {", ".join(duplicate["link"] for duplicate in self.duplicates)}\n'
+
+    def __format_norm(self) -> str:
+        """Зарплата на руки в рублях, если она отличается от указанной в вакансии"""
+        if ExchangeRates.get_code(self.currency) in (None, ExchangeRates.BASE) and not self.gross:
+            return ''
+        if self.salary_min_norm is None and self.salary_max_norm is None:
+            return ' (курс валюты неизвестен)'
+        return f' (на руки от {self.salary_min_norm} до {self.salary_max_norm} руб.)'
+
     def __gt__(self, other):
         if isinstance(other, Vacancy):
-            return self.salary_min > other.salary_min
+            return self.salary_min_norm > other.salary_min_norm
         else:
-            return self.salary_min > other
+            return self.salary_min_norm > other
 
     def __ge__(self, other):
         if isinstance(other, Vacancy):
-            return self.salary_min >= other.salary_min
+            return self.salary_min_norm >= other.salary_min_norm
         else:
-            return self.salary_min >= other
+            return self.salary_min_norm >= other
 
     def __lt__(self, other):
         if isinstance(other, Vacancy):
-            return self.salary_min < other.salary_min
+            return self.salary_min_norm < other.salary_min_norm
         else:
-            return self.salary_min < other
+            return self.salary_min_norm < other
 
     def __le__(self, other):
         if isinstance(other, Vacancy):
-            return self.salary_min <= other.salary_min
+            return self.salary_min_norm <= other.salary_min_norm
         else:
-            return self.salary_min <= other
+            return self.salary_min_norm <= other
 
 
 
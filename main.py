@@ -1,3 +1,14 @@
+import argparse
+import json
+import os
+import sys
+
+from classes.batch_runner_class import BatchRunner
+from classes.incremental_crawler_class import IncrementalCrawler
+from classes.metrics_class import Metrics
+from classes.response_cache_class import ResponseCache
+from classes.salary_analytics_class import SalaryAnalytics
+from classes.vacancy_exporter_class import VacancyExporter
 from utils.utils import *
 
 
@@ -29,13 +40,16 @@ def user_interaction():
 
     json_saver = JSONSaver(keyword)  # Создание экземпляра класса JSONSaver
     json_saver.add_vacancies(hh_vacancies, sj_vacancies)  # Добавление вакансий в json файлы (отдельно hh и sj)
-    vacancies_classes = json_saver.select()  # Создание списка с экземплярами класса Vacancy
+    vacancies_classes = json_saver.select()  # Генератор экземпляров класса Vacancy
+    if hh_vacancies and sj_vacancies:
+        vacancies_classes = deduplicate_vacancies(vacancies_classes)  # одна вакансия с обеих платформ - один раз
 
     filter_word = input("Введите ключевое слово для поиска в описании вакансий"
                         "Для пропуска данного фильтра нажмите Enter -> ")  # ключевое слово для поиска
 
     if filter_word:
-        filtered_vacancies = filter_vacancies(filter_word, vacancies_classes)  # отфильтрованные вакансии
+        search_index = json_saver.load_search_index()  # поисковый индекс, сохраненный рядом с файлами вакансий
+        filtered_vacancies = filter_vacancies(filter_word, vacancies_classes, search_index)  # отфильтрованные вакансии
 
         if filtered_vacancies:
             print(f'По Вашему запросу найдено {len(filtered_vacancies)} вакансий')
@@ -67,13 +81,13 @@ def user_interaction():
             print('Нет вакансий, соответствующих заданным критериям')
             break
 
-    sorted_vacancies = sort_vacancies(filtered_vacancies)  # Сортировка вакансий по минимальному окладу
-
     query = input('Хотите отфильтровать топ N вакансий с максимальным уровнем оклада?(Да/Нет) -> ')
 
     if query.lower() == 'да':
         top_n = int(input("Введите количество вакансий для вывода в топ N: "))
-        sorted_vacancies = get_top_vacancies(sorted_vacancies, top_n)
+        sorted_vacancies = get_top_vacancies(filtered_vacancies, top_n)  # топ N по убыванию оклада без полной сортировки
+    else:
+        sorted_vacancies = sort_vacancies(filtered_vacancies)  # Сортировка вакансий по минимальному окладу
 
     while True:
         # Запрос у пользователя какие операции произвести с вакансиями
@@ -89,7 +103,7 @@ def user_interaction():
         # Удаление вакансии из списка
         elif query == '2':
             del_id = input('Введите ID вакансии для ее удаления из списка -> ')
-            json_saver.delete_vacancy(int(del_id), sorted_vacancies)
+            json_saver.delete_vacancy(del_id, sorted_vacancies)
 
         elif query == '3':
             print_vacancies(sorted_vacancies)  # вывод в консоль результатов
@@ -98,5 +112,141 @@ def user_interaction():
             break
 
 
+def build_parser() -> argparse.ArgumentParser:
+    """Параметры командной строки для пакетного режима"""
+    parser = argparse.ArgumentParser(description='Парсинг вакансий с headhunter и superjob. '
+                                                 'Без параметров запускается в интерактивном режиме')
+    parser.add_argument('keywords', nargs='+', help='поисковые запросы (названия профессий)')
+    parser.add_argument('--platforms', nargs='+', choices=BatchRunner.PLATFORMS, default=list(BatchRunner.PLATFORMS),
+                        help='платформы для парсинга (по умолчанию обе)')
+    parser.add_argument('--pages', type=int, default=1,
+                        help='количество страниц (1 страница - 100 вакансий). Больше 20 страниц hh и 5 страниц sj '
+                             'загружаются через деление запроса по датам публикации, регионам и окладу')
+    parser.add_argument('--all', dest='pages', action='store_const', const=None,
+                        help='загрузить все найденные вакансии')
+    parser.add_argument('--area', help='регион hh: id из справочника или название (по умолчанию вся Россия)')
+    parser.add_argument('--storage', choices=BatchRunner.STORAGES, default='json', help='способ хранения вакансий')
+    parser.add_argument('--filter', dest='filter_word', help='запрос для поиска в описании вакансий')
+    parser.add_argument('--salary', help='фильтр по окладу, например 50000-70000 или 80000')
+    parser.add_argument('--region', help='фильтр по региону вакансии')
+    parser.add_argument('--no-experience', dest='without_experience', action='store_true',
+                        help='только вакансии без опыта или с опытом от 1 года')
+    parser.add_argument('--top', dest='top_n', type=int, help='топ N вакансий с максимальным окладом')
+    parser.add_argument('--sort-key', choices=list(SORT_KEYS), default='salary_min', help='поле сортировки')
+    parser.add_argument('--output', choices=('files', 'stdout'), default='files',
+                        help='files - файлы result_<запрос>.<формат>, stdout - вывод в консоль')
+    parser.add_argument('--format', dest='fmt', choices=VacancyExporter.FORMATS,
+                        help='формат результатов (по умолчанию json для файлов и jsonl для консоли)')
+    parser.add_argument('--compress', dest='compression', choices=VacancyExporter.COMPRESSIONS,
+                        help='сжатие результатов (zstd требует пакет zstandard)')
+    parser.add_argument('--keep-duplicates', dest='dedup', action='store_false',
+                        help='не объединять одинаковые вакансии с разных платформ')
+    parser.add_argument('--cache', metavar='DIR', help='папка для кэша ответов API')
+    parser.add_argument('--offline', action='store_true', help='брать ответы API только из кэша')
+    parser.add_argument('--workers', type=int, help='количество одновременных запросов к каждой платформе')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='сохранить метрики (время этапов, запросы, кэш) в FILE: .prom - формат Prometheus, '
+                             'иначе json')
+    parser.add_argument('--profile', metavar='FILE', help='профилировать запуск через cProfile и сохранить в FILE')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='вместе с --metrics: добавить в метрики строки кода с наибольшим выделением памяти')
+    parser.add_argument('--analytics', metavar='FILE',
+                        help='статистика зарплат по сохраненным вакансиям (процентили, гистограммы, динамика): '
+                             'json в FILE или таблицы в консоль, если FILE - "-"')
+    parser.add_argument('--period', choices=SalaryAnalytics.PERIODS, default='week',
+                        help='период динамики зарплат для --analytics')
+    parser.add_argument('--sync', action='store_true',
+                        help='загрузить только вакансии, опубликованные после предыдущего запуска, в хранилище '
+                             '(для --storage json используется vacancies_store.jsonl)')
+    parser.add_argument('--interval', type=float, help='вместе с --sync: повторять загрузку каждые INTERVAL секунд')
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Точка входа: интерактивный режим без параметров, пакетный режим с параметрами командной строки"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        user_interaction()
+        return
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.trace_memory and not args.metrics:
+        parser.error('--trace-memory используется вместе с --metrics')
+    try:
+        VacancyExporter('-', args.fmt, args.compression)  # проверка формата и сжатия до начала загрузки
+    except ValueError as error:
+        parser.error(str(error))
+
+    metrics = Metrics.get_default()
+    if args.metrics or args.profile:
+        metrics.enabled = True
+        metrics.start_profiling(cpu=bool(args.profile), memory=args.trace_memory)
+    try:
+        run_batch(args)
+    finally:
+        if metrics.enabled:
+            metrics.stop_profiling(args.profile)
+            if args.metrics:
+                metrics.export(args.metrics)
+
+
+def run_batch(args: argparse.Namespace) -> None:
+    """Пакетный режим или загрузка новых вакансий (--sync) по параметрам командной строки"""
+    cache = ResponseCache(args.cache or '.cache/http', offline=args.offline) if args.cache or args.offline else None
+    runner = BatchRunner(args.platforms, args.pages, args.area, args.storage, cache, args.workers, dedup=args.dedup)
+
+    try:
+        if args.sync:
+            crawler = IncrementalCrawler([runner.hh_api, runner.sj_api],
+                                         saver_factory=runner.get_saver if args.storage != 'json' else None)
+            if args.interval:
+                try:
+                    crawler.run_forever(args.keywords, args.interval, runner.area)
+                except KeyboardInterrupt:
+                    crawler.stop()
+            else:
+                for keyword in args.keywords:
+                    print(f'{keyword}: новых вакансий {crawler.sync(keyword, runner.area)}', file=sys.stderr)
+                # статистика по тому же хранилищу, в которое загружены новые вакансии
+                write_analytics(runner, args.keywords, args, crawler.saver_factory)
+            return
+
+        results = runner.run(args.keywords, filter_word=args.filter_word, salary=args.salary, region=args.region,
+                             without_experience=args.without_experience, top_n=args.top_n, sort_key=args.sort_key,
+                             save=args.output == 'files', fmt=args.fmt or 'json', compression=args.compression)
+
+        if args.output == 'stdout':
+            try:
+                BatchRunner.write_results(results, '-', args.fmt or 'jsonl', args.compression)
+            except BrokenPipeError:
+                # вывод передан программе, которая закрылась раньше (например head): остаток вывода не нужен
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        else:
+            for keyword, vacancies in results.items():
+                print(f'{keyword}: {len(vacancies)} вакансий', file=sys.stderr)
+        write_analytics(runner, results, args)
+    finally:
+        runner.close()
+
+
+def write_analytics(runner: BatchRunner, keywords, args: argparse.Namespace, saver_factory=None) -> None:
+    """
+    Статистика зарплат по сохраненным вакансиям каждого ключевого слова (параметр --analytics)
+    :param saver_factory: функция, создающая хранилище для ключевого слова (по умолчанию BatchRunner.get_saver)
+    """
+    if not args.analytics:
+        return
+    saver_factory = saver_factory or runner.get_saver
+    reports = {keyword: runner.analyze(keyword, args.period, saver_factory(keyword)).to_report()
+               for keyword in keywords}
+    if args.analytics == '-':
+        for keyword, report in reports.items():
+            print(f'\n{keyword}\n{SalaryAnalytics.format_report(report)}')
+    else:
+        with open(args.analytics, 'w', encoding='UTF-8') as analytics_file:
+            json.dump(reports, analytics_file, ensure_ascii=False, indent=4)
+
+
 if __name__ == '__main__':
-    user_interaction()
+    main()
@@ -1,55 +1,152 @@
+import heapq
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
 from classes import hh_sj_classes
+from classes.deduplicator_class import Deduplicator
 from classes.hh_sj_classes import HeadHunterAPI, SuperJobAPI
 from classes.json_saver_class import JSONSaver
+from classes.metrics_class import Metrics
+from classes.search_index_class import SearchIndex
+from classes.vacancy_query_class import VacancyQuery
+from classes.vacancy_table_class import VacancyTable
 from classes.vacansy_class import Vacancy
 
 
-def sort_vacancies(vacancies: list[Vacancy]) -> list[Vacancy]:
+def get_salary_midpoint(vacancy: Vacancy) -> float | None:
+    """Середина вилки зарплаты на руки в рублях (или известная граница, если вторая не указана)"""
+    if vacancy.salary_min_norm is None:
+        return vacancy.salary_max_norm
+    if vacancy.salary_max_norm is None:
+        return vacancy.salary_min_norm
+    return (vacancy.salary_min_norm + vacancy.salary_max_norm) / 2
+
+
+# поля, по которым можно сортировать вакансии (зарплаты сравниваются на руки в рублях)
+SORT_KEYS = {'salary_min': lambda vacancy: vacancy.salary_min_norm,
+             'salary_max': lambda vacancy: vacancy.salary_max_norm,
+             'midpoint': get_salary_midpoint,
+             'published_at': lambda vacancy: vacancy.published_at}
+
+
+def get_sort_key(key: str | tuple = 'salary_min', descending: bool = False):
+    """
+    Функция-ключ для sorted/heapq, вычисляемая один раз для каждой вакансии (без вызова Vacancy.__lt__).
+    Вакансии без значения поля всегда оказываются в конце
+    :param key: поле или кортеж полей из SORT_KEYS
+    :param descending: ключ для сортировки по убыванию (sorted(..., reverse=True), heapq.nlargest)
+    :return: функция, возвращающая кортеж для сравнения
+    """
+    keys = (key,) if isinstance(key, str) else tuple(key)
+    for name in keys:
+        if name not in SORT_KEYS:
+            raise ValueError(f'Сортировка возможна только по полям {", ".join(SORT_KEYS)}')
+    getters = [SORT_KEYS[name] for name in keys]
+
+    def sort_key(vacancy):
+        result = []
+        for getter in getters:
+            value = getter(vacancy)
+            result.append((value is not None) if descending else (value is None))
+            result.append(value or 0)
+        return tuple(result)
+
+    return sort_key
+
+
+@Metrics.timed('utils.sort_vacancies')
+def sort_vacancies(vacancies: list[Vacancy], key: str | tuple = 'salary_min', descending: bool = False) -> list[Vacancy]:
     """
     Функция для сортировки списка вакансий по зарплате
-    :param vacancies: список с экземплярами класса Vacancy
+    :param vacancies: список (или любой итерируемый объект) с экземплярами класса Vacancy
+    :param key: поле сортировки или кортеж полей: salary_min, salary_max, midpoint, published_at
+    :param descending: сортировка по убыванию
     :return: отсортированный по минимальной зарплате список с экземплярами класса Vacancy
     """
-    sorted_vacancies = sorted(vacancies)
+    if isinstance(vacancies, VacancyTable) and isinstance(key, str):
+        return vacancies.sort(key, descending)
+
+    sorted_vacancies = sorted(vacancies, key=get_sort_key(key, descending), reverse=descending)
 
     return sorted_vacancies
 
 
-def filter_vacancies(filter_word: str, vacancies: list[Vacancy]) -> list[Vacancy]:
+@Metrics.timed('utils.filter_vacancies')
+def filter_vacancies(filter_word: str, vacancies: list[Vacancy], index: SearchIndex | None = None) -> list[Vacancy]:
     """
     Поиск вакансий по ключевому слову. Ключевое слово ищется в описании вакансии, или в требованиях к вакансии
-    :param filter_word: ключевое слово
+    :param filter_word: ключевое слово (при поиске по индексу - запрос, например 'django или flask')
     :param vacancies: список с экземплярами класса Vacancy
+    :param index: поисковый индекс (JSONSaver.load_search_index). Если передан, поиск ведется по индексу
+    с учетом форм слов, а вакансии возвращаются в порядке релевантности
     :return: список с экземплярами класса Vacancy, в описании у которых найдено ключевое слово
     """
+    if index is not None:
+        by_id = {str(vacancy.id): vacancy for vacancy in vacancies}
+        return [by_id[vacancy_id] for vacancy_id, _ in index.search(filter_word) if vacancy_id in by_id]
+
+    filter_word = filter_word.lower()
     filtered_vac = []
     for vacancy in vacancies:
-        if filter_word.lower() in vacancy.requirement.lower() or filter_word.lower() in vacancy.responsibility.lower():
+        if filter_word in vacancy.requirement.lower() or filter_word in vacancy.responsibility.lower():
             filtered_vac.append(vacancy)
 
     return filtered_vac
 
 
-def get_top_vacancies(vacancies: list[Vacancy], top_n: int) -> list[Vacancy]:
+@Metrics.timed('utils.deduplicate_vacancies')
+def deduplicate_vacancies(vacancies) -> list[Vacancy]:
+    """
+    Удаление одинаковых вакансий, опубликованных и на headhunter, и на superjob (см. Deduplicator).
+    У оставшейся вакансии в атрибуте duplicates сохраняются ссылки на удаленные
+    :param vacancies: итерируемый объект с экземплярами класса Vacancy
+    :return: список вакансий без дубликатов
+    """
+    return Deduplicator().collapse(vacancies)
+
+
+@Metrics.timed('utils.get_top_vacancies')
+def get_top_vacancies(vacancies: list[Vacancy], top_n: int, key: str | tuple = 'salary_min') -> list[Vacancy]:
     """
-    Функция для возврата top_n вакансий с самой большой зарплатой
-    :param vacancies: отсортированный по возрастанию з/п список с экземплярами класса Vacancy
+    Функция для возврата top_n вакансий с самой большой зарплатой. Отбор через кучу за O(n log top_n),
+    поэтому вакансии можно передавать генератором, не загружая все в память
+    :param vacancies: итерируемый объект с экземплярами класса Vacancy (сортировать заранее не нужно)
     :param top_n: количество вакансий для вывода
-    :return: список с top_n экземплярами класса Vacancy с самой большой зарплатой
+    :param key: поле или кортеж полей для ранжирования: salary_min, salary_max, midpoint, published_at
+    :return: список с top_n экземплярами класса Vacancy с самой большой зарплатой, по убыванию
     """
-    return vacancies[-1:-top_n:-1]
+    if isinstance(vacancies, VacancyTable) and isinstance(key, str):
+        return vacancies.top(top_n, key)
 
+    return heapq.nlargest(top_n, vacancies, key=get_sort_key(key, descending=True))
 
+
+@Metrics.timed('utils.get_vacancies_without_experience')
 def get_vacancies_without_experience(vacancies: list[Vacancy]):
-    filtered_vacancies = filter(lambda x: x.experience == 'Нет опыта' or x.experience == 'без опыта'
-                                          or '1' in x.experience, vacancies)
+    if isinstance(vacancies, VacancyTable):
+        return vacancies.filter_experience(Vacancy.is_without_experience)
+
+    filtered_vacancies = filter(lambda x: Vacancy.is_without_experience(x.experience), vacancies)
 
     return list(filtered_vacancies)
 
 
-def print_vacancies(vacancies: list[Vacancy]) -> None:
-    """Функция для вывода в консоль списка вакансий"""
-    print(*vacancies, sep='\n++++++++++++++++++++++++++++++++++++++\n')
+def print_vacancies(vacancies, page_size: int = 10) -> None:
+    """
+    Функция для постраничного вывода в консоль списка вакансий: каждая вакансия форматируется непосредственно
+    перед выводом, после каждой страницы запрашивается продолжение (если вывод идет в терминал)
+    :param vacancies: итерируемый объект с экземплярами класса Vacancy
+    :param page_size: количество вакансий на странице (0 - без остановок)
+    """
+    paged = page_size > 0 and sys.stdin.isatty() and sys.stdout.isatty()
+    for number, vacancy in enumerate(vacancies, 1):
+        if number > 1:
+            print('++++++++++++++++++++++++++++++++++++++')
+        print(vacancy)
+        if paged and number % page_size == 0:
+            answer = input(f'Показано вакансий: {number}. Enter - следующая страница, q - завершить вывод -> ')
+            if answer.strip().lower() in ('q', 'й'):
+                break
 
 
 def choose_platform(keyword: str) -> tuple:
@@ -78,33 +175,64 @@ def choose_platform(keyword: str) -> tuple:
     return hh_api, sj_api
 
 
-def parse(api_hh: None | HeadHunterAPI, api_sj: None | SuperJobAPI, keyword: str, count: str) -> tuple:
+@Metrics.timed('utils.parse')
+def parse(api_hh: None | HeadHunterAPI, api_sj: None | SuperJobAPI, keyword: str, count: str,
+          area: int | str | None = None) -> tuple:
     """
     Функция для отправки запросов на api
     :param api_hh: Экземпляр класса HeadHunterAPI или None
     :param api_sj: Экземпляр класс SuperJobAPI или None
     :param keyword: Ключевое слово, по которому будут искаться вакансии
     :param count: Количество страниц с вакансиями (1 страница - 100 вакансий)
+    :param area: ID региона hh из справочника (по умолчанию вся Россия)
     :return: список с экземплярами классов Vacancy для HeadHunterAPI и SuperJobAPI
     """
-    # если есть экземпляр класса HeadHunterAPI() и нет экземпляра класса SuperJobAPI()
-    if api_hh is None:
-        hh_vacancies = None  # Вакансии с сайта hh
-        sj_vacancies = api_sj.get_vacancies(keyword, count)
+    hh_args = (keyword, count) if area is None else (keyword, count, area)
 
-        # если есть экземпляр класса SuperJobAPI() и нет экземпляра класса HeadHunterAPI()
-    elif api_sj is None:
-        sj_vacancies = None  # вакансии с сайта sj
-        hh_vacancies = api_hh.get_vacancies(keyword, count)  # Вакансии с сайта hh
+    # запросы к headhunter и superjob выполняются одновременно, время парсинга определяется самой медленной платформой
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        hh_future = executor.submit(api_hh.get_vacancies, *hh_args) if api_hh is not None else None
+        sj_future = executor.submit(api_sj.get_vacancies, keyword, count) if api_sj is not None else None
 
-        # во всех остальных случаях должны создаться два экземпляра: HeadHunterAPI() и SuperJobAPI()
-    else:
-        hh_vacancies = api_hh.get_vacancies(keyword, count)  # Вакансии с сайта hh
-        sj_vacancies = api_sj.get_vacancies(keyword, count)  # вакансии с сайта sj
+    hh_vacancies = hh_future.result() if hh_future else None  # Вакансии с сайта hh
+    sj_vacancies = sj_future.result() if sj_future else None  # вакансии с сайта sj
 
     return hh_vacancies, sj_vacancies
 
 
+@Metrics.timed('utils.parse_to_storage')
+def parse_to_storage(api_hh: None | HeadHunterAPI, api_sj: None | SuperJobAPI, keyword: str, count: int,
+                     json_saver: JSONSaver, area: int | str | None = None) -> tuple:
+    """
+    Функция для отправки запросов на api с дозаписью страниц в файлы по мере их загрузки (потоковый режим JSONSaver)
+    :param api_hh: Экземпляр класса HeadHunterAPI или None
+    :param api_sj: Экземпляр класс SuperJobAPI или None
+    :param keyword: Ключевое слово, по которому будут искаться вакансии
+    :param count: Количество страниц с вакансиями (1 страница - 100 вакансий)
+    :param json_saver: экземпляр класса JSONSaver в потоковом режиме
+    :param area: ID региона hh из справочника (по умолчанию вся Россия)
+    :return: количество сохраненных вакансий с hh и sj
+    """
+    json_saver.clear()
+
+    def save_pages(api, platform):
+        saved = 0
+        args = (keyword, count) if area is None or platform == 'sj' else (keyword, count, area)
+        for page in api.iter_vacancy_pages(*args):
+            json_saver.append_vacancies(**{f'{platform}_vacancies': page})
+            saved += len(page)
+        return saved
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        hh_future = executor.submit(save_pages, api_hh, 'hh') if api_hh is not None else None
+        sj_future = executor.submit(save_pages, api_sj, 'sj') if api_sj is not None else None
+
+    hh_count = hh_future.result() if hh_future else 0
+    sj_count = sj_future.result() if sj_future else 0
+
+    return hh_count, sj_count
+
+
 def user_filter(query, vacancies) -> list[Vacancy]:
     """
     Функция для выбора каким образом отфильтровать вакансии
@@ -112,18 +240,21 @@ def user_filter(query, vacancies) -> list[Vacancy]:
     :param vacancies: список с экземплярами классов Vacancy
     :return: отфильтрованный список с экземплярами классов Vacancy
     """
+    vacancy_query = VacancyQuery()
+
     # Фильтрация по зарплате
     if query == '1':
         salary = input('Введите желаемый уровень оклада в рублях, например 40000-60000, или 80000 -> ')
-        vacancies = JSONSaver.get_vacancies_by_salary(salary, vacancies)
+        vacancy_query.salary(salary)
 
     # Фильтрация по региону
     elif query == '2':
         region = input('Введите регион -> ')
-        vacancies = JSONSaver.get_vacancies_by_region(region, vacancies)
+        vacancy_query.region(region)
 
     # Фильтрация по опыту работы
     elif query == '3':
-        vacancies = get_vacancies_without_experience(vacancies)
+        vacancy_query.without_experience()
 
-    return vacancies
+    filtered_vacancies = vacancy_query.run(vacancies)
+    return filtered_vacancies if isinstance(filtered_vacancies, VacancyTable) else list(filtered_vacancies)